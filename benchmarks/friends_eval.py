@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_scale_teams
+from src.evaluation_store import EvaluationStore
+from src.modules.friends_evals import FriendsEval
+
+
+def iterrows_as_corrector(as_corrector_df: pd.DataFrame) -> dict:
+    """
+    The row-by-row aggregation FriendsEval used before it was vectorized, kept as a reference.
+    """
+    login_marks = {}
+    for _, row in as_corrector_df.iterrows():
+        for corrected in row.get("correcteds", []):
+            login_marks.setdefault(corrected.get("login"), []).append(
+                row.get("final_mark", np.nan)
+            )
+    return {login: (len(m), np.nanmean(m)) for login, m in login_marks.items()}
+
+
+def iterrows_as_corrected(as_corrected_df: pd.DataFrame) -> dict:
+    """
+    The row-by-row aggregation FriendsEval used before it was vectorized, kept as a reference.
+    """
+    corrector_marks = {}
+    for _, row in as_corrected_df.iterrows():
+        login = row.get("corrector", {}).get("login")
+        if login:
+            corrector_marks.setdefault(login, []).append(row.get("final_mark", np.nan))
+    return {login: (len(m), np.nanmean(m)) for login, m in corrector_marks.items()}
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(sizes=(1_000, 10_000, 100_000)):
+    """
+    Compares the vectorized FriendsEval aggregations, on normalized columns, with
+    the row-by-row reference on raw scale_teams.
+
+    Run with `python -m benchmarks.friends_eval`.
+    """
+    module = FriendsEval(api=None)
+
+    print(
+        f"{'rows':>8} {'aggregation':<14} {'iterrows':>10} {'vectorized':>11} {'speedup':>8}"
+    )
+    for size in sizes:
+        scale_teams = make_scale_teams(size)
+        raw = pd.DataFrame(scale_teams)
+        normalized = EvaluationStore.normalize(scale_teams).to_pandas()
+        for name, reference, vectorized in (
+            ("as_corrector", iterrows_as_corrector, module.process_as_corrector_data),
+            ("as_corrected", iterrows_as_corrected, module.process_as_corrected_data),
+        ):
+            before = timed(reference, raw)
+            after = timed(vectorized, normalized)
+            print(
+                f"{size:>8} {name:<14} {before:>9.3f}s {after:>10.3f}s {before / after:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from benchmarks.synthetic import make_scale_teams
+from src.config import get_api_url
+from src.utils import Utils
+
+
+def make_world(users: int = 200, evaluations: int = 20_000, seed: int = 42) -> dict:
+    """
+    Generates the fixtures of a synthetic campus.
+
+    Args:
+        users (int, optional): The number of users of the campus. Defaults to 200.
+        evaluations (int, optional): The number of scale_teams between them. Defaults to 20000.
+        seed (int, optional): The seed of the random generator. Defaults to 42.
+
+    Returns:
+        dict: The records served for each path, as expected by MockIntraAPI.
+    """
+    rng = random.Random(seed)
+    fixtures = {
+        "/v2/campus/1/users": [
+            {"id": id, "login": f"user{id}", "active?": rng.random() < 0.9}
+            for id in range(users)
+        ]
+    }
+
+    for id in range(users):
+        fixtures[f"/v2/users/{id}/scale_teams/as_corrector"] = []
+        fixtures[f"/v2/users/{id}/scale_teams/as_corrected"] = []
+        fixtures[f"/v2/users/{id}/projects_users"] = [
+            {
+                "id": id * 100 + project,
+                "occurrence": rng.choice([0, 0, 0, 1, 2]),
+                "final_mark": rng.choice([None, 0, 50, 100, 100, 125]),
+                "status": rng.choice(["finished"] * 9 + ["in_progress"]),
+                "validated?": rng.random() < 0.8,
+                "project": {"id": project, "name": f"project{project}"},
+                "created_at": f"2023-{1 + project % 12:02d}-01T00:00:00.000Z",
+                "marked_at": f"2023-{1 + project % 12:02d}-01T00:00:00.000Z",
+            }
+            for project in rng.sample(range(1, 60), rng.randint(5, 30))
+        ]
+
+    for scale_team in make_scale_teams(evaluations, users, seed):
+        corrector = scale_team["corrector"]["id"]
+        fixtures[f"/v2/users/{corrector}/scale_teams/as_corrector"].append(scale_team)
+        for corrected in scale_team["correcteds"]:
+            fixtures[f"/v2/users/{corrected['id']}/scale_teams/as_corrected"].append(
+                scale_team
+            )
+
+    return fixtures
+
+
+def load_fixtures(directory: str) -> dict:
+    """
+    Loads fixtures saved by `save_fixtures`.
+
+    Args:
+        directory (str): The directory of the fixtures.
+
+    Returns:
+        dict: The records served for each path.
+    """
+    with open(os.path.join(directory, "fixtures.json")) as f:
+        return json.load(f)
+
+
+def record_fixtures(api, paths: list[str]) -> dict:
+    """
+    Records fixtures from the API at API_URL.
+
+    Args:
+        api (IntraSession): An authenticated API client.
+        paths (list[str]): The paginated paths to record, e.g. "/v2/campus/1/users".
+
+    Returns:
+        dict: The records served for each path.
+    """
+    return {path: Utils.get_all_pages(api, f"{get_api_url()}{path}") for path in paths}
+
+
+def save_fixtures(fixtures: dict, directory: str):
+    """
+    Saves fixtures, e.g. recorded from the live API, so they can be served again offline.
+
+    Args:
+        fixtures (dict): The records served for each path.
+        directory (str): The directory to save them to.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "fixtures.json"), "w") as f:
+        json.dump(fixtures, f)
+
+
+class MockIntraAPI:
+    """
+    A local stand-in for api.intra.42.fr, serving fixtures over HTTP.
+
+    Lists are paginated like the real API (page, per_page, X-Total and X-Per-Page),
+    `range[updated_at]`, `filter[login]` and `sort` are honored, and any token is accepted
+    unless it was revoked.
+    The users of each campus are also served by ID and login, with their campus_users.
+    Every response can be delayed, and a share of the requests can be answered
+    with a 429 and a Retry-After header. With `etags`, responses carry an ETag and
+    If-None-Match is answered with a 304.
+
+    Attributes:
+        fixtures (dict): The records served for each path.
+        latency (float): The delay of every response, in seconds.
+        jitter (float): The maximum random delay added to `latency`, in seconds.
+        rate_limit_ratio (float): The share of requests answered with a 429.
+        retry_after (float): The Retry-After of injected 429s, in seconds.
+        etags (bool): Whether responses carry an ETag and conditional requests are honored.
+        requests (int): The number of requests served so far.
+        bytes_sent (int): The number of body bytes served so far.
+        not_modified (int): The number of requests answered with a 304.
+        url (str): The base URL of the server, once started.
+        revoked (set[str]): The access tokens answered with a 401.
+        tokens (int): The number of access tokens issued so far.
+    """
+
+    def __init__(
+        self,
+        fixtures: dict,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limit_ratio: float = 0.0,
+        retry_after: float = 0.1,
+        seed: int = 42,
+        etags: bool = False,
+    ):
+        """
+        Initializes a new instance of the MockIntraAPI class.
+
+        Args:
+            fixtures (dict): The records served for each path.
+            latency (float, optional): The delay of every response, in seconds. Defaults to 0.
+            jitter (float, optional): The maximum random delay added to `latency`, in seconds. Defaults to 0.
+            rate_limit_ratio (float, optional): The share of requests answered with a 429. Defaults to 0.
+            retry_after (float, optional): The Retry-After of injected 429s, in seconds. Defaults to 0.1.
+            seed (int, optional): The seed of the latency and 429 generator. Defaults to 42.
+            etags (bool, optional): Whether responses carry an ETag and conditional requests are honored. Defaults to False.
+        """
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.etags = etags
+        self.requests = 0
+        self.bytes_sent = 0
+        self.not_modified = 0
+        self.url: Optional[str] = None
+        self.revoked: set[str] = set()
+        self.tokens = 0
+        self.users = {}
+        for path, records in fixtures.items():
+            match = re.fullmatch(r"/v2/campus/(\d+)/users", path)
+            if match is None:
+                continue
+            campus_users = [{"campus_id": int(match.group(1)), "is_primary": True}]
+            for user in records:
+                user = {"campus_users": campus_users, **user}
+                self.users[user["login"]] = self.users[str(user["id"])] = user
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def __enter__(self) -> "MockIntraAPI":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """
+        Starts serving on a free local port, in a background thread.
+        """
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, headers, body = api.handle(
+                    self.path, self.headers.get("Authorization", "")
+                )
+                status, headers, body = api.revalidate(
+                    status, headers, body, self.headers.get("If-None-Match", "")
+                )
+                self.send(status, headers, body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, headers, body = api.handle_token()
+                self.send(status, headers, body)
+
+            def send(self, status: int, headers: dict, body: bytes):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        """
+        Stops the server.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def handle_token(self) -> tuple[int, dict, bytes]:
+        """
+        Returns:
+            tuple[int, dict, bytes]: A response with a new access token.
+        """
+        with self._lock:
+            self.tokens += 1
+            access_token = f"mock-{self.tokens}"
+        token = {
+            "access_token": access_token,
+            "token_type": "bearer",
+            "expires_in": 7200,
+            "scope": "public",
+            "created_at": int(time.time()),
+        }
+        return 200, {}, json.dumps(token).encode()
+
+    def handle(self, target: str, authorization: str = "") -> tuple[int, dict, bytes]:
+        """
+        Answers a GET request.
+
+        Args:
+            target (str): The path and query string of the request.
+            authorization (str, optional): The Authorization header of the request. Defaults to "".
+
+        Returns:
+            tuple[int, dict, bytes]: The status, headers and body of the response.
+        """
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._rng.random() * self.jitter
+            rate_limited = self._rng.random() < self.rate_limit_ratio
+        if delay:
+            time.sleep(delay)
+        if authorization.removeprefix("Bearer ") in self.revoked:
+            return 401, {}, b'{"error": "invalid_token"}'
+        if rate_limited:
+            return 429, {"Retry-After": f"{self.retry_after:g}"}, b"{}"
+
+        url = urlsplit(target)
+        params = dict(parse_qsl(url.query))
+        path = url.path
+
+        match = re.fullmatch(r"/v2/users/([^/]+)", path)
+        if match and match.group(1) in self.users:
+            return self.respond(200, {}, self.users[match.group(1)])
+        if path == "/v2/users" and "filter[login]" in params:
+            logins = params["filter[login]"].split(",")
+            records = [
+                self.users[login]
+                for login in logins
+                if login in self.users and self.users[login]["login"] == login
+            ]
+        elif path in self.fixtures:
+            records = self.fixtures[path]
+        else:
+            return self.respond(404, {}, {})
+
+        if "range[updated_at]" in params:
+            start, end = params["range[updated_at]"].split(",")
+            records = [r for r in records if start <= r.get("updated_at", "") <= end]
+
+        for field in reversed(params.get("sort", "").split(",")):
+            if field:
+                name = field.lstrip("-")
+                # Records without the field come first, like NULLs in the API.
+                present = [r for r in records if r.get(name) is not None]
+                present.sort(key=lambda r: r[name], reverse=field.startswith("-"))
+                records = [r for r in records if r.get(name) is None] + present
+
+        page = int(params.get("page", 1))
+        per_page = min(int(params.get("per_page", 30)), 100)
+        headers = {"X-Total": str(len(records)), "X-Per-Page": str(per_page)}
+        return self.respond(
+            200, headers, records[(page - 1) * per_page : page * per_page]
+        )
+
+    def revalidate(
+        self, status: int, headers: dict, body: bytes, if_none_match: str
+    ) -> tuple[int, dict, bytes]:
+        """
+        Adds the ETag of a response, with `etags`, and answers a 304 if it matches.
+
+        Args:
+            status (int): The status of the response.
+            headers (dict): The headers of the response.
+            body (bytes): The body of the response.
+            if_none_match (str): The If-None-Match header of the request.
+
+        Returns:
+            tuple[int, dict, bytes]: The status, headers and body to send.
+        """
+        if not self.etags or status != 200:
+            return status, headers, body
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        headers = {**headers, "ETag": etag}
+        if if_none_match != etag:
+            return status, headers, body
+        with self._lock:
+            self.bytes_sent -= len(body)
+            self.not_modified += 1
+        return 304, headers, b""
+
+    def respond(self, status: int, headers: dict, data) -> tuple[int, dict, bytes]:
+        body = json.dumps(data).encode()
+        with self._lock:
+            self.bytes_sent += len(body)
+        return status, headers, body
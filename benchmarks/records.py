@@ -0,0 +1,32 @@
+import pandas as pd
+
+from benchmarks.synthetic import make_scale_teams
+from src.evaluation_records import EvaluationRecords
+from src.evaluation_store import EvaluationStore
+
+
+def main(sizes=(10_000, 100_000, 500_000)):
+    """
+    Compares the memory held by scale_teams as raw dicts, as a normalized DataFrame
+    and as EvaluationRecords.
+
+    Run with `python -m benchmarks.records`.
+    """
+    print(f"{'rows':>8} {'raw frame':>10} {'normalized':>11} {'records':>8}")
+    for size in sizes:
+        scale_teams = make_scale_teams(size)
+        raw = pd.DataFrame(scale_teams).memory_usage(deep=True).sum()
+        normalized = (
+            EvaluationStore.normalize(scale_teams)
+            .to_pandas()
+            .memory_usage(deep=True)
+            .sum()
+        )
+        records = EvaluationRecords.from_scale_teams(scale_teams).nbytes
+        print(
+            f"{size:>8} {raw / 2**20:>8.1f}MB {normalized / 2**20:>9.1f}MB {records / 2**20:>6.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The time `import main` may take before the menu draws, in seconds.
+STARTUP_TARGET = 0.3
+
+# Dependencies that only the modules working on evaluations need, so they must not be
+# imported at startup.
+HEAVY_IMPORTS = ["numpy", "pandas", "pyarrow", "aiohttp"]
+
+
+def parse_importtime(output: str) -> dict:
+    """
+    Args:
+        output (str): The standard error of `python -X importtime`.
+
+    Returns:
+        dict[str, float]: The cumulative import time of every module, in seconds.
+    """
+    times = {}
+    for line in output.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$", line)
+        if match:
+            times[match.group(2)] = int(match.group(1)) / 1e6
+    return times
+
+
+def measure_startup(module: str = "main", repeat: int = 5) -> dict:
+    """
+    Imports a module in fresh interpreters with `-X importtime`.
+
+    Args:
+        module (str, optional): The module to import. Defaults to "main", the entry point of the CLI.
+        repeat (int, optional): The number of interpreters to start. Defaults to 5.
+
+    Returns:
+        dict: The median import time of `module` in seconds, and the HEAVY_IMPORTS it pulled in.
+    """
+    times, heavy = [], set()
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        imported = parse_importtime(result.stderr)
+        times.append(imported[module])
+        heavy.update(name for name in HEAVY_IMPORTS if name in imported)
+
+    return {"seconds": statistics.median(times), "heavy_imports": sorted(heavy)}
+
+
+def main() -> int:
+    """
+    Measures the startup time of the CLI. Returns 1 if it misses STARTUP_TARGET.
+
+    Run with `python -m benchmarks.startup`.
+    """
+    startup = measure_startup()
+    print(f"import main: {startup['seconds']:.3f}s (target {STARTUP_TARGET:g}s)")
+    for name in startup["heavy_imports"]:
+        print(f"imported at startup: {name}", file=sys.stderr)
+    if startup["seconds"] > STARTUP_TARGET or startup["heavy_imports"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
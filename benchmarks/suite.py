@@ -0,0 +1,373 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+from benchmarks.mock_api import MockIntraAPI, load_fixtures, make_world
+from benchmarks.startup import STARTUP_TARGET, measure_startup
+from benchmarks.synthetic import make_scale_teams
+from src.cache import ResponseCache
+from src.evaluation_store import EvaluationStore
+from src.modules.campus_leaderboard import CampusLeaderboard
+from src.modules.evaluation_trends import EvaluationTrends
+from src.modules.evaluator_score import EvaluatorScore
+from src.modules.friends_evals import FriendsEval
+from src.modules.odds_of_failing import OddsOfFailing
+from src.modules.project_odds import ProjectOdds
+from src.request import Request
+from src.session_data import SessionData
+from src.sharded_aggregator import ShardedAggregator
+from src.user_index import UserIndex
+from src.utils import Utils
+
+
+def get_cases(
+    api, campus_id: int, login: str, user_id: int, logins: list, project: str
+) -> dict:
+    """
+    Args:
+        api (IntraSession): The API client, connected to the mock.
+        campus_id (int): The campus of the fixtures.
+        login (str): The login the per-user cases run for.
+        user_id (int): The ID of `login`.
+        logins (list): The logins of the campus.
+        project (str): The name of a project of `login`.
+
+    Returns:
+        dict[str, Callable]: The benchmarked code paths, by name.
+    """
+
+    def compute_all():
+        # Like picking the per-user modules one after the other in the menu.
+        data = SessionData(api)
+        for module in (EvaluatorScore, OddsOfFailing, FriendsEval):
+            module(api, data).compute(login)
+
+    return {
+        "Utils.get_campus_users": lambda: Utils.get_campus_users(api, campus_id),
+        "Utils.get_user_ids": lambda: Utils.get_user_ids(api, logins),
+        "Utils.get_all_pages": lambda: Utils.get_all_pages(
+            api, Utils.get_evaluations_url(user_id, "as_corrected")
+        ),
+        "Utils.get_evaluations_for_user": lambda: Utils.get_evaluations_for_user(
+            api, user_id, "as_corrected"
+        ),
+        "Utils.get_teams_for_user": lambda: Utils.get_teams_for_user(api, user_id),
+        "EvaluatorScore.compute": lambda: EvaluatorScore(api).compute(login),
+        "OddsOfFailing.compute": lambda: OddsOfFailing(api).compute(login),
+        "FriendsEval.compute": lambda: FriendsEval(api).compute(login),
+        "EvaluationTrends.compute": lambda: EvaluationTrends(api).compute(login),
+        "CampusLeaderboard.build_table": lambda: CampusLeaderboard(api).build_table(
+            campus_id
+        ),
+        "ProjectOdds.build_table": lambda: ProjectOdds(api).build_table(campus_id),
+        "ProjectOdds.compute": lambda: ProjectOdds(api).compute(login, project=project),
+        "SessionData (3 modules)": compute_all,
+    }
+
+
+def reset_state(warm_dir: str = None):
+    """
+    Resets the caches of Utils, so every run starts cold, or from the caches in `warm_dir`.
+    """
+    Utils.user_index = UserIndex(":memory:")
+    Utils.cache = None
+    Utils.evaluation_store = None
+    if warm_dir is not None:
+        Utils.cache = ResponseCache(os.path.join(warm_dir, "responses.sqlite3"))
+        Utils.evaluation_store = EvaluationStore(os.path.join(warm_dir, "evaluations"))
+
+
+def measure(
+    case: Callable, mock: MockIntraAPI, repeat: int, warm_dir: str = None
+) -> dict:
+    """
+    Runs a case `repeat` times for its wall time, then once more under tracemalloc for its peak memory.
+
+    Args:
+        case (Callable): The code path to run.
+        mock (MockIntraAPI): The mock the code path talks to.
+        repeat (int): The number of timed runs.
+        warm_dir (str, optional): The directory of the caches, for warm runs. Defaults to cold runs.
+
+    Returns:
+        dict: The median wall time in seconds, the number of requests and bytes of one run,
+              and the peak memory in bytes.
+    """
+    times = []
+    for _ in range(repeat):
+        reset_state(warm_dir)
+        requests, bytes_sent = mock.requests, mock.bytes_sent
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            case()
+        times.append(time.perf_counter() - start)
+        requests, bytes_sent = mock.requests - requests, mock.bytes_sent - bytes_sent
+
+    reset_state(warm_dir)
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        case()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "seconds": statistics.median(times),
+        "requests": requests,
+        "bytes": bytes_sent,
+        "peak_memory": peak,
+    }
+
+
+def write_store(directory: str, users: int, rows: int) -> list[tuple[int, str]]:
+    """
+    Writes a synthetic EvaluationStore, with the same evaluations for every user.
+
+    Args:
+        directory (str): The root of the store.
+        users (int): The number of users, one file each.
+        rows (int): The number of evaluations of each user.
+
+    Returns:
+        list[tuple[int, str]]: The ID of each user and the path of its as_corrector file.
+    """
+    import pyarrow.parquet as pq
+
+    store = EvaluationStore(directory)
+    table = EvaluationStore.normalize(make_scale_teams(rows))
+    files = []
+    for user_id in range(users):
+        path = store.get_path(user_id, "as_corrector")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(table, path)
+        files.append((user_id, path))
+    return files
+
+
+def measure_aggregation(
+    sizes: list[int], rows: int, repeat: int
+) -> list[tuple[int, int, float, float]]:
+    """
+    Times ShardedAggregator.moments on stores of growing size, with thread and with
+    process workers, to find the size from which processes pay off (MIN_PARALLEL_FILES).
+
+    Args:
+        sizes (list[int]): The number of users of each store.
+        rows (int): The number of evaluations of each user.
+        repeat (int): The number of timed runs, the median is kept.
+
+    Returns:
+        list[tuple[int, int, float, float]]: For each size, the bytes of the files and the
+                                             seconds taken with threads and with processes.
+    """
+    aggregator = ShardedAggregator()
+    results = []
+    for users in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            files = write_store(tmp, users, rows)
+            nbytes = sum(os.path.getsize(path) for _, path in files)
+            seconds = []
+            for processes in (False, True):
+                times = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    aggregator.moments(files, "final_mark", processes=processes)
+                    times.append(time.perf_counter() - start)
+                seconds.append(statistics.median(times))
+        results.append((users, nbytes, *seconds))
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Args:
+        results (dict): The results of this run.
+        baseline (dict): The results of an earlier run.
+        tolerance (float): The relative increase allowed before a metric counts as a regression.
+
+    Returns:
+        list[str]: A description of every regression.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        for metric in ("seconds", "requests", "peak_memory"):
+            before = baseline.get(name, {}).get(metric)
+            if before and metrics.get(metric, 0) > before * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {metric} went from {before:g} to {metrics[metric]:g}"
+                )
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the fetch and aggregation paths against a local mock of the intra API."
+    )
+    parser.add_argument(
+        "--fixtures", help="directory of recorded fixtures (default: synthetic)"
+    )
+    parser.add_argument("--users", type=int, default=200, help="synthetic campus size")
+    parser.add_argument(
+        "--evaluations", type=int, default=20_000, help="synthetic scale_teams"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="seconds per response"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.01, help="random extra latency"
+    )
+    parser.add_argument(
+        "--rate-limit-ratio",
+        type=float,
+        default=0.0,
+        help="share of requests answered 429",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case")
+    parser.add_argument(
+        "--warm", action="store_true", help="run with the caches filled"
+    )
+    parser.add_argument("--only", nargs="+", help="names of the cases to run")
+    parser.add_argument("--save", help="file to save the results to, as JSON")
+    parser.add_argument("--compare", help="results of an earlier run to compare with")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed relative regression"
+    )
+    parser.add_argument(
+        "--aggregation",
+        nargs="*",
+        type=int,
+        metavar="USERS",
+        help="time ShardedAggregator on stores of these sizes instead (default: 500 to 8000 users)",
+    )
+    parser.add_argument(
+        "--rows-per-user",
+        type=int,
+        default=300,
+        help="evaluations per user of --aggregation",
+    )
+    parser.add_argument(
+        "--startup-target",
+        type=float,
+        default=STARTUP_TARGET,
+        help="seconds `import main` may take",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    """
+    Runs the benchmark suite. Returns 1 if a regression was found against --compare,
+    or if the startup of the CLI misses --startup-target.
+
+    Run with `python -m benchmarks.suite`.
+    """
+    args = parse_args()
+    if args.aggregation is not None:
+        sizes = args.aggregation or [500, 1000, 2000, 4000, 8000]
+        print(f"{'users':>6} {'files':>9} {'threads':>9} {'processes':>10}")
+        for users, nbytes, threads, processes in measure_aggregation(
+            sizes, args.rows_per_user, args.repeat
+        ):
+            print(
+                f"{users:>6} {nbytes / 2**20:>7.1f}MB {threads:>8.3f}s {processes:>9.3f}s"
+            )
+        return 0
+
+    # Keeps the rate limit warnings of injected 429s out of the results.
+    logging.getLogger("logs").addHandler(logging.NullHandler())
+    fixtures = (
+        load_fixtures(args.fixtures)
+        if args.fixtures
+        else make_world(args.users, args.evaluations)
+    )
+
+    with MockIntraAPI(
+        fixtures, args.latency, args.jitter, args.rate_limit_ratio
+    ) as mock, tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(
+            {
+                "API_URL": mock.url,
+                "OAUTHLIB_INSECURE_TRANSPORT": "1",
+                "API_RATE_PER_SECOND": os.getenv("API_RATE_PER_SECOND", "10000"),
+                "API_RATE_PER_HOUR": os.getenv("API_RATE_PER_HOUR", "100000000"),
+                "STATS_CACHE_DIR": os.path.join(tmp, "cache"),
+            }
+        )
+        api = Request.create_session("benchmark")
+        api.authenticate("benchmark", "secret")
+
+        campus_path = next(path for path in fixtures if path.startswith("/v2/campus/"))
+        campus_id = int(campus_path.split("/")[3])
+        user_id, login = max(
+            ((user["id"], user["login"]) for user in fixtures[campus_path]),
+            key=lambda user: len(
+                fixtures.get(f"/v2/users/{user[0]}/scale_teams/as_corrected", [])
+            ),
+        )
+        logins = [user["login"] for user in fixtures[campus_path]]
+        project = fixtures[f"/v2/users/{user_id}/projects_users"][0]["project"]["name"]
+
+        cases = get_cases(api, campus_id, login, user_id, logins, project)
+        # Predictions read the per-project table of the campus, which is built once and cached.
+        reset_state()
+        ProjectOdds(api).get_table(campus_id)
+        warm_dir = None
+        if args.warm:
+            warm_dir = tmp
+            reset_state(warm_dir)
+            with contextlib.redirect_stdout(io.StringIO()):
+                for case in cases.values():
+                    case()
+
+        results = {}
+        print(
+            f"{'case':<32} {'time':>9} {'requests':>9} {'received':>10} {'peak memory':>12}"
+        )
+        if not args.only or "startup" in args.only:
+            startup = measure_startup(repeat=args.repeat)
+            results["startup"] = {"seconds": startup["seconds"]}
+            print(f"{'startup':<32} {startup['seconds']:>8.3f}s")
+        for name, case in cases.items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = metrics = measure(case, mock, args.repeat, warm_dir)
+            print(
+                f"{name:<32} {metrics['seconds']:>8.3f}s {metrics['requests']:>9} "
+                f"{metrics['bytes'] / 2**20:>8.1f}MB {metrics['peak_memory'] / 2**20:>10.1f}MB"
+            )
+
+    failed = False
+    if "startup" in results:
+        if results["startup"]["seconds"] > args.startup_target:
+            print(
+                f"startup: {results['startup']['seconds']:.3f}s, target is {args.startup_target:g}s",
+                file=sys.stderr,
+            )
+            failed = True
+        for name in startup["heavy_imports"]:
+            print(f"startup: {name} is imported before the menu", file=sys.stderr)
+            failed = True
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import random
+
+
+def make_scale_teams(count: int, users: int = 3000, seed: int = 42) -> list:
+    """
+    Generates scale_teams shaped like the ones returned by the intra API.
+
+    Args:
+        count (int): The number of scale_teams to generate.
+        users (int, optional): The number of distinct logins involved. Defaults to 3000.
+        seed (int, optional): The seed of the random generator. Defaults to 42.
+
+    Returns:
+        list: The generated scale_teams.
+    """
+    rng = random.Random(seed)
+    scale_teams = []
+
+    for id in range(1, count + 1):
+        corrector = rng.randrange(users)
+        correcteds = rng.sample(range(users), rng.randint(1, 4))
+        day = 1 + id % 28
+        month = 1 + (id // 28) % 12
+        timestamp = f"2023-{month:02d}-{day:02d}T{id % 24:02d}:00:00.000Z"
+
+        scale_teams.append(
+            {
+                "id": id,
+                "scale_id": rng.randrange(1, 500),
+                "comment": "Good job, clean code and a nice defense.",
+                "created_at": timestamp,
+                "updated_at": timestamp,
+                "feedback": "Thanks for the evaluation.",
+                "final_mark": rng.choice([None, 0, 80, 100, 100, 100, 115, 125]),
+                "flag": {"id": 1, "name": "Ok", "positive": True},
+                "begin_at": timestamp,
+                "correcteds": [
+                    {"id": user, "login": f"user{user}", "url": ""}
+                    for user in correcteds
+                ],
+                "corrector": {"id": corrector, "login": f"user{corrector}", "url": ""},
+                "truant": {},
+                "filled_at": timestamp,
+                "questions_with_answers": [],
+                "scale": {"id": 1, "name": "scale", "duration": 900},
+                "team": {
+                    "id": id,
+                    "name": f"team{id}",
+                    "project_id": rng.randrange(1, 60),
+                    "status": "finished",
+                    "users": [
+                        {"id": user, "login": f"user{user}"} for user in correcteds
+                    ],
+                },
+                "feedbacks": [],
+            }
+        )
+
+    return scale_teams
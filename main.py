@@ -1,27 +1,223 @@
+import argparse
+import logging
+import os
+import signal
+import sys
+
+from src.batch import BatchWriter, read_logins, resolve_user_ids, run_batch
 from src.CLInterface import Interface
-from src.modules.evaluator_score import EvaluatorScore
-from src.modules.feature_request import FeatureRequest
-from src.modules.friends_evals import FriendsEval
-from src.modules.odds_of_failing import OddsOfFailing
+from src.modules.registry import LazyModule, ModuleSpec, discover
+from src.prefetcher import Prefetcher
 from src.request import Request
+from src.session_data import SessionData
+from src.cache import ResponseCache
+from src.config import get_env_flag
+from src.credential_pool import CredentialPool
+from src.evaluation_store import EvaluationStore
+from src.fetch_job import CampusFetchJob
+from src.tracer import Tracer
+from src.user_index import UserIndex
+from src.utils import Utils
+
+
+def parse_args(specs: list[ModuleSpec]) -> argparse.Namespace:
+    """
+    Parses the command line. Without a subcommand, the interactive interface is started.
+
+    Args:
+        specs (list[ModuleSpec]): The discovered modules. Those with a COMMAND get a batch subcommand.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Statistics about 42 students.")
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="print the time spent per endpoint and per module phase when exiting",
+    )
+    parser.add_argument(
+        "--trace", help="file to save every request and phase timing to, as JSON"
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="log every request and phase"
+    )
+    parser.add_argument(
+        "--log-file", help="file to write logs to (default: standard error)"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    for spec in specs:
+        if spec.command is None:
+            continue
+        subparser = subparsers.add_parser(
+            spec.command,
+            help=f"compute {spec.command} for many logins without prompting",
+        )
+        subparser.set_defaults(handler=batch, spec=spec)
+        logins = subparser.add_mutually_exclusive_group(required=True)
+        logins.add_argument(
+            "--logins-file",
+            help='file with one login per line ("-" for standard input)',
+        )
+        logins.add_argument("--logins", nargs="+", help="logins to compute")
+        subparser.add_argument(
+            "--format", choices=BatchWriter.FORMATS, default="csv", help="output format"
+        )
+        subparser.add_argument(
+            "--output", help="file to write the results to (default: standard output)"
+        )
+        subparser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="number of logins processed at the same time (default: 4)",
+        )
+
+    subparser = subparsers.add_parser(
+        "fetch-campus",
+        help="fetch the evaluations of every active user of a campus, resuming where the last run stopped",
+    )
+    subparser.set_defaults(handler=fetch_campus)
+    subparser.add_argument("campus_id", type=int, help="ID of the campus")
+    subparser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="number of users fetched at the same time (default: 4)",
+    )
+    subparser.add_argument(
+        "--restart",
+        action="store_true",
+        help="forget the progress of previous runs and start over",
+    )
+
+    return parser.parse_args()
+
+
+def batch(api, args: argparse.Namespace) -> int:
+    """
+    Runs a module over many logins and streams the results out.
+
+    Args:
+        api (IntraSession): The API client shared by every worker.
+        args (argparse.Namespace): The parsed arguments of the batch subcommand.
+
+    Returns:
+        int: 0 if every login succeeded, 1 otherwise.
+    """
+    # Every login is processed once, so there is nothing to keep in memory between them.
+    module = args.spec.load()(api, SessionData(api, max_bytes=0))
+    logins = args.logins if args.logins else read_logins(args.logins_file)
+    if Utils.user_index is not None:
+        logins = resolve_user_ids(api, logins)
+
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        writer = BatchWriter(output, args.format, ["login", *module.FIELDS, "error"])
+        succeeded, failed = run_batch(module, logins, writer, args.workers)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"{succeeded} succeeded, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def fetch_campus(api, args: argparse.Namespace) -> int:
+    """
+    Fetches the evaluations of a campus into the evaluation store, resuming the previous
+    run if it did not finish. Interrupting it (Ctrl-C or SIGTERM) keeps the progress.
+
+    Args:
+        api (IntraSession): The API client shared by every worker.
+        args (argparse.Namespace): The parsed arguments of the fetch-campus subcommand.
+
+    Returns:
+        int: 0 once every task is finished, 1 otherwise.
+    """
+    job = CampusFetchJob(api, args.campus_id, workers=args.workers)
+    if args.restart:
+        job.checkpoint.reset(job.name)
+    signal.signal(signal.SIGTERM, lambda *_: job.cancel())
+
+    def progress(done: int, total: int):
+        print(f"\r{job.name}: {done}/{total} tasks", end="", file=sys.stderr)
+
+    try:
+        job.run(progress)
+    except KeyboardInterrupt:
+        pass
+    done, total = job.checkpoint.get_progress(job.name)
+    failed = job.checkpoint.get_failed(job.name)
+    print(f"\r{job.name}: {done}/{total} tasks", file=sys.stderr)
+
+    if done < total:
+        print(
+            f"{failed} failed, {total - done} left: run the same command to resume",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+def configure_logging(args: argparse.Namespace):
+    """
+    Configures the "logs" logger used by the modules and the tracer.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+    """
+    handler = (
+        logging.FileHandler(args.log_file) if args.log_file else logging.StreamHandler()
+    )
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(threadName)s %(message)s")
+    )
+    logs = logging.getLogger("logs")
+    logs.addHandler(handler)
+    logs.setLevel(logging.DEBUG if args.verbose else logging.WARNING)
 
 
 def main():
     """
     Entry point of the program.
 
-    This function initializes the necessary objects and modules, and starts the main interface loop.
+    This function initializes the necessary objects and modules, and starts the main interface loop,
+    or runs a batch subcommand if one was given.
     If any unhandled exception occurs, it prints an error message and returns 1.
     """
+    specs = discover()
+    args = parse_args(specs)
+    configure_logging(args)
+    if args.summary or args.trace or args.verbose:
+        Utils.tracer = Tracer()
+
+    api, prefetcher = None, None
     try:
         request = Request()
         api = request.api
 
+        if not get_env_flag("STATS_NO_CACHE"):
+            Utils.cache = ResponseCache()
+            Utils.evaluation_store = EvaluationStore()
+            Utils.user_index = UserIndex()
+        else:
+            Utils.user_index = UserIndex(":memory:")
+
+        if args.command is not None:
+            return args.handler(api, args)
+
+        data = SessionData(api)
+        if get_env_flag("STATS_PREFETCH"):
+            data.prefetcher = prefetcher = Prefetcher(data)
+            if os.getenv("STATS_LOGIN"):
+                data.prefetch(os.getenv("STATS_LOGIN"))
+
         modules = {
-            "average score as an evaluator": EvaluatorScore(api),
-            "odds of failing next project": OddsOfFailing(api),
-            "evaluation network analysis": FriendsEval(api),
-            "i have another question": FeatureRequest(api),
+            spec.title: LazyModule(spec, api, data)
+            for spec in specs
+            if spec.title is not None
         }
 
         interface = Interface("What would you like to know?", modules)
@@ -33,7 +229,16 @@ def main():
             "please open an issue at https://github.com/winstonallo/42-stats/issues",
         )
         return 1
+    finally:
+        if prefetcher is not None:
+            prefetcher.close()
+        if args.trace:
+            Utils.tracer.save(args.trace)
+        if args.summary:
+            print(Utils.tracer.summary(), file=sys.stderr)
+            if isinstance(api, CredentialPool):
+                print(api.summary(), file=sys.stderr)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
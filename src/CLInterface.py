@@ -1,7 +1,9 @@
 import logging
-from simple_term_menu import TerminalMenu
+from typing import Union
 from src.InterfaceResult import InterfaceResult
 from src.modules.base import BaseModule
+from src.modules.registry import LazyModule
+from src.tracer import Tracer
 import sys
 
 from src.utils import clear_terminal, prompt_select
@@ -14,17 +16,23 @@ class Interface:
     Attributes:
         can_go_back (bool): Indicates whether the interface allows going back to the previous menu.
         title (str): The title of the interface.
-        modules (dict[str, BaseModule]): A dictionary of modules available in the interface.
+        modules (dict[str, BaseModule | LazyModule]): A dictionary of modules available in the interface.
+                                                     Lazy modules are created when first selected.
         logs (logging.Logger): The logger used for logging interface events.
     """
 
-    def __init__(self, title: str, modules: dict[str, BaseModule], can_go_back=False):
+    def __init__(
+        self,
+        title: str,
+        modules: dict[str, Union[BaseModule, LazyModule]],
+        can_go_back=False,
+    ):
         """
         Initializes a new instance of the Interface class.
 
         Args:
             title (str): The title of the interface.
-            modules (dict[str, BaseModule]): A dictionary of modules available in the interface.
+            modules (dict[str, BaseModule | LazyModule]): A dictionary of modules available in the interface.
             can_go_back (bool, optional): Indicates whether the interface allows going back to the previous menu. Defaults to False.
         """
         self.can_go_back = can_go_back
@@ -62,7 +70,11 @@ class Interface:
                 sys.exit(1)
 
             try:
-                result = self.modules[selection].run()
+                module = self.modules[selection]
+                if isinstance(module, LazyModule):
+                    module = module.get()
+                with Tracer.module(type(module).__name__):
+                    result = module.run()
 
                 if result == InterfaceResult.Exit:
                     sys.exit(0)
@@ -0,0 +1,145 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class RunningStats:
+    """
+    Running count, mean and variance of a stream of numbers, using Welford's algorithm.
+
+    Values are added in batches, and batches are combined with the parallel form
+    of the algorithm, so the stream never has to be held in memory. NaN values are ignored.
+
+    Attributes:
+        count (int): The number of values seen.
+        mean (float): The mean of the values seen, NaN if there are none.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = math.nan
+        self._m2 = 0.0
+
+    def update(self, values: np.ndarray) -> "RunningStats":
+        """
+        Adds a batch of values.
+
+        Args:
+            values (np.ndarray): The values to add.
+
+        Returns:
+            RunningStats: The object itself.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            mean = values.mean()
+            self.merge(len(values), mean, float(((values - mean) ** 2).sum()))
+        return self
+
+    def merge(self, count: int, mean: float, m2: float) -> "RunningStats":
+        """
+        Adds the moments of another batch of values.
+
+        Args:
+            count (int): The number of values of the batch.
+            mean (float): The mean of the batch.
+            m2 (float): The sum of squared differences from the mean of the batch.
+
+        Returns:
+            RunningStats: The object itself.
+        """
+        if count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self._m2 = count, mean, m2
+            return self
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += m2 + delta**2 * self.count * count / total
+        self.count = total
+        return self
+
+    @property
+    def variance(self) -> float:
+        """
+        Returns:
+            float: The sample variance of the values seen, NaN if there are fewer than two.
+        """
+        if self.count < 2:
+            return math.nan
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self) -> float:
+        """
+        Returns:
+            float: The sample standard deviation of the values seen, NaN if there are fewer than two.
+        """
+        return math.sqrt(self.variance)
+
+
+class GroupedRunningStats:
+    """
+    Running RunningStats per key (e.g. per login), fed with batches of (key, value) pairs.
+
+    Each batch is reduced with a vectorized groupby before being merged into the
+    running totals. Rows whose value is NaN are counted per key but left out of
+    the mean and variance. Keys are kept in order of first appearance.
+
+    Attributes:
+        stats (dict[object, RunningStats]): The running statistics of each key.
+        rows (dict[object, int]): The number of rows seen for each key, including rows without a value.
+    """
+
+    def __init__(self):
+        self.stats: dict[object, RunningStats] = {}
+        self.rows: dict[object, int] = {}
+
+    def update(self, keys: pd.Series, values: pd.Series) -> "GroupedRunningStats":
+        """
+        Adds a batch of (key, value) pairs. Pairs without a key are skipped.
+
+        Args:
+            keys (pd.Series): The key of each pair.
+            values (pd.Series): The value of each pair.
+
+        Returns:
+            GroupedRunningStats: The object itself.
+        """
+        batch = pd.DataFrame(
+            {
+                "key": np.asarray(keys, dtype=object),
+                "value": pd.to_numeric(np.asarray(values)),
+            }
+        ).dropna(subset=["key"])
+        if batch.empty:
+            return self
+
+        moments = batch.groupby("key", sort=False)["value"].agg(
+            ["size", "count", "mean", "var"]
+        )
+        m2s = (moments["var"].fillna(0) * (moments["count"] - 1)).clip(lower=0)
+
+        for key, rows, count, mean, m2 in zip(
+            moments.index,
+            moments["size"].tolist(),
+            moments["count"].tolist(),
+            moments["mean"].tolist(),
+            m2s.tolist(),
+        ):
+            self.rows[key] = self.rows.get(key, 0) + rows
+            self.stats.setdefault(key, RunningStats()).merge(count, mean, m2)
+
+        return self
+
+    def to_counters(self) -> dict:
+        """
+        Returns:
+            dict: A dictionary with keys as keys and tuples of row counts and means as values,
+                  in order of first appearance.
+        """
+        return {key: (self.rows[key], self.stats[key].mean) for key in self.rows}
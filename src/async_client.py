@@ -0,0 +1,573 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import AsyncIterator, Optional
+
+import aiohttp
+import pandas as pd
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from src.config import get_api_url
+from src.credential_pool import CredentialPool
+from src.evaluation_records import EvaluationRecords
+from src.evaluation_store import EvaluationStore
+from src.rate_limiter import RateLimiter
+from src.request import IntraSession, Request
+from src.Spinner import Spinner
+from src.token_cache import TokenCache
+from src.utils import Utils
+
+
+class AsyncIntraClient:
+    """
+    An asyncio client for the intra API, implementing the same operations as Utils.
+
+    All requests are multiplexed on the event loop over one pooled aiohttp session,
+    so campus-wide jobs can keep thousands of requests in flight from a single thread.
+    It shares the rate limiter, token cache and Utils.cache / evaluation_store /
+    user_index with the blocking client, and backs off on 429 the same way
+    `Utils.make_request_with_backoff` does. Responses are returned as requests.Response
+    objects, so they can be handled with the same code as the blocking ones.
+
+    Use it as an async context manager:
+
+        async with AsyncIntraClient.from_session(api) as client:
+            df = await client.get_evaluations_for_user(user_id, "as_corrector")
+
+    Attributes:
+        PAGE_CONCURRENCY (int): The number of pages of one endpoint fetched at the same time.
+    """
+
+    PAGE_CONCURRENCY = 16
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        rate_limiter: RateLimiter,
+        max_connections: int = 100,
+        retries: int = 3,
+        token_cache: Optional[TokenCache] = None,
+        token: Optional[dict] = None,
+    ):
+        """
+        Initializes a new instance of the AsyncIntraClient class.
+
+        Args:
+            client_id (str): The UID of the intra application.
+            client_secret (str): The secret of the intra application.
+            rate_limiter (RateLimiter): The rate limiter every request waits on.
+            max_connections (int, optional): The maximum number of connections kept open. Defaults to 100.
+            retries (int, optional): The number of retries on connection errors and 5xx responses. Defaults to 3.
+            token_cache (TokenCache, optional): The cache access tokens are loaded from and saved to. Defaults to None.
+            token (dict, optional): An access token to start with, e.g. the one of a blocking session. Defaults to None.
+        """
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.rate_limiter = rate_limiter
+        self.max_connections = max_connections
+        self.retries = retries
+        self.token_cache = token_cache
+        self.token = token
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def from_session(
+        cls, api: IntraSession, max_connections: int = 100
+    ) -> "AsyncIntraClient":
+        """
+        Creates a client with the credentials, token, rate limiter and token cache of a blocking session.
+
+        Args:
+            api (IntraSession): An authenticated blocking session.
+            max_connections (int, optional): The maximum number of connections kept open. Defaults to 100.
+
+        Returns:
+            AsyncIntraClient: The client, not opened yet.
+        """
+        if isinstance(api, CredentialPool):
+            # The client has a single token and rate limiter, it uses one credential of the pool.
+            api = api.session
+        client_id, client_secret = api.credentials
+        return cls(
+            client_id,
+            client_secret,
+            rate_limiter=api.rate_limiter,
+            max_connections=max_connections,
+            token_cache=api.token_cache,
+            token=dict(api.token) if api.token else None,
+        )
+
+    async def __aenter__(self) -> "AsyncIntraClient":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        """
+        Opens the connection pool and gets an access token if the client does not hold a valid one.
+        """
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            headers={"Accept-Encoding": "gzip, deflate"},
+        )
+        self._refresh_lock = asyncio.Lock()
+
+        if self.token is None and self.token_cache is not None:
+            self.token = await asyncio.to_thread(self.token_cache.load, self.client_id)
+        if self._expires_in() < IntraSession.REFRESH_MARGIN / 10:
+            await self.refresh()
+
+    async def close(self):
+        """
+        Closes the connection pool.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def refresh(self):
+        """
+        Fetches a new access token with the client credentials and saves it.
+        """
+        await self.rate_limiter.acquire_async()
+        async with self._session.post(
+            f"{get_api_url()}{IntraSession.TOKEN_PATH}",
+            data={
+                "grant_type": "client_credentials",
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            },
+        ) as response:
+            response.raise_for_status()
+            token = await response.json()
+
+        token["expires_at"] = time.time() + token.get("expires_in", 7200)
+        self.token = token
+        if self.token_cache is not None:
+            await asyncio.to_thread(self.token_cache.save, self.client_id, token)
+
+    async def get(
+        self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None
+    ) -> requests.Response:
+        """
+        Makes a GET request, like IntraSession.request does for the blocking client.
+
+        Waits for the rate limiter, refreshes the access token if it is about to expire,
+        retries connection errors and Request.RETRY_STATUSES with an exponential delay,
+        and feeds the rate limit headers of the response back into the rate limiter.
+        A 401 (e.g. a revoked token) gets the token refreshed once, and the request sent again.
+
+        Args:
+            url (str): The URL to make the request to.
+            params (dict, optional): The parameters for the request. Defaults to None.
+            headers (dict, optional): Additional headers for the request. Defaults to None.
+
+        Returns:
+            requests.Response: The response object.
+        """
+        if self._expires_in() < IntraSession.REFRESH_MARGIN / 10:
+            async with self._refresh_lock:
+                # Another task may have refreshed it while we waited for the lock.
+                if self._expires_in() < IntraSession.REFRESH_MARGIN / 10:
+                    await self.refresh()
+
+        params = {str(k): str(v) for k, v in (params or {}).items()}
+        token = self.token
+        result = await self._send(url, params, headers)
+        if result.status_code == 401:
+            async with self._refresh_lock:
+                # Other tasks may have got a 401 with the same token and replaced it.
+                if self.token is token:
+                    await self.refresh()
+            result = await self._send(url, params, headers)
+        return result
+
+    async def _send(
+        self, url: str, params: dict, headers: Optional[dict]
+    ) -> requests.Response:
+        for attempt in range(self.retries + 1):
+            await self.rate_limiter.acquire_async()
+            try:
+                async with self._session.get(
+                    url,
+                    params=params,
+                    headers={
+                        **(headers or {}),
+                        "Authorization": f"Bearer {self.token['access_token']}",
+                    },
+                ) as response:
+                    result = await self._to_response(response)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(0.5 * 2**attempt)
+                continue
+
+            self.rate_limiter.update(result.headers)
+            if result.status_code == 429:
+                retry_after = RateLimiter.get_retry_after(result.headers)
+                self.rate_limiter.pause(retry_after if retry_after is not None else 1)
+            if result.status_code in Request.RETRY_STATUSES and attempt < self.retries:
+                retry_after = RateLimiter.get_retry_after(result.headers)
+                await asyncio.sleep(
+                    retry_after if retry_after is not None else 0.5 * 2**attempt
+                )
+                continue
+            return result
+
+    async def make_request_with_backoff(
+        self,
+        url: str,
+        params: dict,
+        max_retries: int = 5,
+        spinner: Optional[Spinner] = None,
+        revalidate: bool = False,
+    ) -> requests.Response:
+        """
+        Makes a request to the API with backoff for rate limiting. See Utils.make_request_with_backoff.
+
+        Args:
+            url (str): The URL to make the request to.
+            params (dict): The parameters for the request.
+            max_retries (int, optional): The maximum number of retries. Defaults to 5.
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+            revalidate (bool, optional): Whether a fresh cached response is revalidated too. Defaults to False.
+
+        Returns:
+            requests.Response: The response object.
+
+        Raises:
+            Exception: If the request fails after the maximum number of retries.
+        """
+        start = time.perf_counter()
+        # The cache and the tracer are SQLite and locks, kept off the event loop.
+        cached, fresh = await asyncio.to_thread(
+            Utils.lookup_cache, url, params, revalidate
+        )
+        if fresh:
+            Utils.trace_request(url, params, cached, start, cache="hit")
+            return cached
+
+        headers = Utils.get_revalidation_headers(cached)
+        retry_wait = 1
+        slept = 0.0
+        for attempt in range(max_retries):
+            response = await self.get(url, params=params, headers=headers)
+            result = await asyncio.to_thread(
+                Utils.accept_response,
+                url,
+                params,
+                response,
+                cached,
+                start,
+                attempt,
+                slept,
+            )
+            if result is not None:
+                return result
+            wait = Utils.get_backoff(response, retry_wait, spinner)
+            await asyncio.sleep(wait)
+            slept += wait
+            retry_wait *= 2
+        Utils.trace_request(url, params, response, start, max_retries - 1, slept)
+        raise Exception(f"Request {url} failed after max retries")
+
+    async def iter_pages(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        spinner: Optional[Spinner] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> AsyncIterator[list]:
+        """
+        Streams the pages of a paginated endpoint, in page order. See Utils.iter_pages.
+
+        Args:
+            url (str): The URL of the paginated endpoint.
+            params (dict, optional): Additional parameters for the request. Defaults to None.
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+            max_concurrency (int, optional): The maximum number of pages fetched at the same time.
+                                             Defaults to AsyncIntraClient.PAGE_CONCURRENCY.
+
+        Yields:
+            list: The records of each non-empty page.
+        """
+        params = {**(params or {}), "per_page": Utils.PER_PAGE}
+        first_page = await self.make_request_with_backoff(
+            url, params={**params, "page": 1}, spinner=spinner
+        )
+        first_page.raise_for_status()
+        # Cached later pages are only reused along with the page 1 they were cached with.
+        revalidate = not getattr(first_page, "from_cache", False)
+
+        async def fetch_page(page: int) -> list:
+            response = await self.make_request_with_backoff(
+                url,
+                params={**params, "page": page},
+                spinner=spinner,
+                revalidate=revalidate,
+            )
+            response.raise_for_status()
+            return response.json()
+
+        records = first_page.json()
+        if not records:
+            return
+        yield records
+
+        page_count = Utils.get_page_count(first_page)
+        if page_count is None:
+            page = 2
+            while data := await fetch_page(page):
+                yield data
+                page += 1
+            return
+
+        max_concurrency = max_concurrency or self.PAGE_CONCURRENCY
+        pages = iter(range(2, page_count + 1))
+        pending = deque(
+            asyncio.ensure_future(fetch_page(page))
+            for page in itertools.islice(pages, max_concurrency)
+        )
+        try:
+            while pending:
+                data = await pending.popleft()
+                for page in itertools.islice(pages, 1):
+                    pending.append(asyncio.ensure_future(fetch_page(page)))
+                if data:
+                    yield data
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get_all_pages(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        spinner: Optional[Spinner] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> list:
+        """
+        Retrieves every record of a paginated endpoint. See Utils.get_all_pages.
+
+        Args:
+            url (str): The URL of the paginated endpoint.
+            params (dict, optional): Additional parameters for the request. Defaults to None.
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+            max_concurrency (int, optional): The maximum number of pages fetched at the same time.
+                                             Defaults to AsyncIntraClient.PAGE_CONCURRENCY.
+
+        Returns:
+            list: The records of all pages.
+        """
+        records = []
+        async for page in self.iter_pages(url, params, spinner, max_concurrency):
+            records.extend(page)
+
+        return records
+
+    async def get_campus_users(self, campus_id: int) -> list:
+        """
+        Retrieves the active users of a given campus. See Utils.get_campus_users.
+
+        Args:
+            campus_id (int): The ID of the campus.
+
+        Returns:
+            list: The active users as returned by the API, including their ID and login.
+        """
+        data = await self.get_all_pages(f"{get_api_url()}/v2/campus/{campus_id}/users")
+        if Utils.user_index is not None:
+            await asyncio.to_thread(Utils.user_index.add, data)
+        return [user for user in data if user.get("active?", False)]
+
+    async def get_user_id(self, login: str) -> int:
+        """
+        Retrieves the ID of a user based on their login. See Utils.get_user_id.
+
+        Args:
+            login (str): The login of the user.
+
+        Returns:
+            int: The ID of the user.
+
+        Raises:
+            Exception: If the user is not found.
+        """
+        if not login or len(login) < 3:
+            raise Exception("user not found")
+
+        if Utils.user_index is not None:
+            id = await asyncio.to_thread(Utils.user_index.get_id, login)
+            if id is not None:
+                return id
+
+        response = await self.make_request_with_backoff(
+            f"{get_api_url()}/v2/users/{login}", params={}
+        )
+        user = response.json()
+        id = user.get("id")
+        if id is None:
+            raise Exception("user not found")
+
+        if Utils.user_index is not None:
+            await asyncio.to_thread(Utils.user_index.add, [user])
+        return id
+
+    async def get_user_ids(self, logins: list[str]) -> dict[str, int]:
+        """
+        Retrieves the IDs of many users at once. See Utils.get_user_ids.
+
+        Args:
+            logins (list[str]): The logins of the users.
+
+        Returns:
+            dict[str, int]: The IDs of the logins that exist. Unknown logins are left out.
+        """
+        logins = list(dict.fromkeys(logins))
+        ids = {}
+        if Utils.user_index is not None:
+            ids = await asyncio.to_thread(Utils.user_index.get_ids, logins)
+
+        missing = [login for login in logins if login not in ids]
+        chunks = [
+            missing[start : start + Utils.PER_PAGE]
+            for start in range(0, len(missing), Utils.PER_PAGE)
+        ]
+        results = await asyncio.gather(
+            *(
+                self.get_all_pages(
+                    f"{get_api_url()}/v2/users",
+                    params={"filter[login]": ",".join(chunk)},
+                )
+                for chunk in chunks
+            )
+        )
+        for chunk, users in zip(chunks, results):
+            if Utils.user_index is not None:
+                await asyncio.to_thread(Utils.user_index.add, users)
+            ids.update(
+                (user["login"], user["id"]) for user in users if user["login"] in chunk
+            )
+
+        return ids
+
+    async def get_evaluations_for_user(
+        self,
+        user_id: int,
+        side: str,
+        spinner: Optional[Spinner] = None,
+        columns: Optional[list[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Retrieves the evaluations for a user, normalized into the columns of EvaluationStore.SCHEMA.
+        See Utils.get_evaluations_for_user.
+
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+            columns (list[str], optional): The columns to return. Defaults to all of them.
+
+        Returns:
+            pd.DataFrame: The evaluations as a pandas DataFrame.
+        """
+        if Utils.evaluation_store is None:
+            evaluations = await self.get_all_pages(
+                Utils.get_evaluations_url(user_id, side), spinner=spinner
+            )
+            table = await asyncio.to_thread(EvaluationStore.normalize, evaluations)
+            return table.select(columns or table.column_names).to_pandas()
+
+        await self.sync_evaluations(user_id, side, spinner)
+        return await asyncio.to_thread(
+            Utils.evaluation_store.read, user_id, side, columns
+        )
+
+    async def get_evaluation_records(
+        self,
+        user_id: int,
+        side: str,
+        spinner: Optional[Spinner] = None,
+        keep_raw: bool = False,
+    ) -> EvaluationRecords:
+        """
+        Retrieves the evaluations for a user as compact EvaluationRecords. See Utils.get_evaluation_records.
+
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+            keep_raw (bool, optional): Whether to keep the raw scale_teams too, without
+                                       Utils.evaluation_store only. Defaults to False.
+
+        Returns:
+            EvaluationRecords: The evaluations.
+        """
+        if Utils.evaluation_store is None:
+            evaluations = await self.get_all_pages(
+                Utils.get_evaluations_url(user_id, side), spinner=spinner
+            )
+            return await asyncio.to_thread(
+                EvaluationRecords.from_scale_teams, evaluations, keep_raw
+            )
+
+        await self.sync_evaluations(user_id, side, spinner)
+        table = await asyncio.to_thread(
+            Utils.evaluation_store.read_table, user_id, side
+        )
+        return await asyncio.to_thread(EvaluationRecords.from_table, table)
+
+    async def sync_evaluations(
+        self, user_id: int, side: str, spinner: Optional[Spinner] = None
+    ):
+        """
+        Fetches the evaluations for a user updated since the last sync, and merges them
+        into Utils.evaluation_store. See Utils.sync_evaluations.
+
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+        """
+        params = await asyncio.to_thread(Utils.get_sync_params, user_id, side)
+        updated = await self.get_all_pages(
+            Utils.get_evaluations_url(user_id, side), params=params, spinner=spinner
+        )
+        # Rewrites the Parquet file of the user, which would stall every request in flight.
+        await asyncio.to_thread(Utils.evaluation_store.merge, user_id, side, updated)
+
+    async def get_teams_for_user(self, user_id: int) -> list:
+        """
+        Retrieves the teams for a user. See Utils.get_teams_for_user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list: The list of teams.
+        """
+        return await self.get_all_pages(
+            f"{get_api_url()}/v2/users/{user_id}/projects_users"
+        )
+
+    def _expires_in(self) -> float:
+        if not self.token:
+            return float("-inf")
+        return self.token.get("expires_at", float("inf")) - time.time()
+
+    @staticmethod
+    async def _to_response(response: aiohttp.ClientResponse) -> requests.Response:
+        result = requests.Response()
+        result.url = str(response.url)
+        result.status_code = response.status
+        result.headers = CaseInsensitiveDict(response.headers)
+        result._content = await response.read()
+        result.encoding = "utf-8"
+        return result
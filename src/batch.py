@@ -0,0 +1,172 @@
+import csv
+import json
+import logging
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, TextIO
+
+from requests_oauthlib import OAuth2Session
+
+from src.modules.base import BaseModule
+from src.tracer import Tracer
+from src.utils import Utils
+
+
+def read_logins(path: str) -> Iterator[str]:
+    """
+    Reads logins from a file, one per line, skipping blank lines and comments.
+
+    Args:
+        path (str): The path of the file, or "-" to read from standard input.
+
+    Yields:
+        str: The logins, in file order.
+    """
+    file = sys.stdin if path == "-" else open(path)
+    try:
+        for line in file:
+            login = line.split("#", 1)[0].strip()
+            if login:
+                yield login
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def resolve_user_ids(
+    api: OAuth2Session, logins: Iterable[str], chunk_size: int = Utils.PER_PAGE
+) -> Iterator[str]:
+    """
+    Resolves the IDs of logins in bulk ahead of processing them, so that workers find
+    them in Utils.user_index instead of looking every login up on its own.
+
+    A chunk that fails to resolve is only logged: its logins are still yielded, and
+    each one is then looked up by the worker processing it.
+
+    Args:
+        api (OAuth2Session): The OAuth2Session object for making API requests.
+        logins (Iterable[str]): The logins to resolve.
+        chunk_size (int, optional): The number of logins resolved at a time. Defaults to Utils.PER_PAGE.
+
+    Yields:
+        str: The logins, unchanged and in order.
+    """
+
+    def resolve(chunk: list[str]):
+        try:
+            Utils.get_user_ids(api, chunk)
+        except Exception as e:
+            logging.getLogger("logs").warning(
+                f"Failed to resolve {len(chunk)} logins at once, looking them up one by one: {e}"
+            )
+
+    chunk = []
+    for login in logins:
+        chunk.append(login)
+        if len(chunk) >= chunk_size:
+            resolve(chunk)
+            yield from chunk
+            chunk = []
+    if chunk:
+        resolve(chunk)
+        yield from chunk
+
+
+class BatchWriter:
+    """
+    Writes the results of a batch run as CSV or JSON lines, flushing after every row.
+
+    Attributes:
+        FORMATS (list[str]): The supported output formats.
+    """
+
+    FORMATS = ["csv", "jsonl"]
+
+    def __init__(self, output: TextIO, format: str, fields: list[str]):
+        """
+        Initializes a new instance of the BatchWriter class.
+
+        Args:
+            output (TextIO): The stream the results are written to.
+            format (str): One of BatchWriter.FORMATS.
+            fields (list[str]): The fields of each row, in output order.
+        """
+        if format not in self.FORMATS:
+            raise Exception(f"unknown output format: {format}")
+
+        self.output = output
+        self.format = format
+        self.fields = fields
+        if format == "csv":
+            self._csv = csv.DictWriter(output, fieldnames=fields)
+            self._csv.writeheader()
+
+    def write(self, row: dict):
+        """
+        Writes a row and flushes it.
+
+        Args:
+            row (dict): The row, with the keys listed in `fields`.
+        """
+        if self.format == "csv":
+            self._csv.writerow(row)
+        else:
+            self.output.write(json.dumps({f: row.get(f) for f in self.fields}) + "\n")
+        self.output.flush()
+
+
+def run_batch(
+    module: BaseModule,
+    logins: Iterable[str],
+    writer: BatchWriter,
+    workers: int = 4,
+) -> tuple[int, int]:
+    """
+    Runs a module over many logins in a thread pool, writing each result as soon as it is ready.
+
+    At most `2 * workers` logins are in flight at a time, so the logins can be read
+    lazily and results are streamed out instead of being buffered. Results are
+    written in completion order. A login that fails produces a row with its error.
+
+    Args:
+        module (BaseModule): The module to run. It must implement `compute`.
+        logins (Iterable[str]): The logins to run the module for.
+        writer (BatchWriter): The writer the results are written to. Its fields must start
+                              with "login" and end with "error".
+        workers (int, optional): The number of logins processed at the same time. Defaults to 4.
+
+    Returns:
+        tuple[int, int]: The number of logins that succeeded and failed.
+    """
+    succeeded, failed = 0, 0
+    pending: dict[Future, str] = {}
+    logins = iter(logins)
+
+    def collect(done: set):
+        nonlocal succeeded, failed
+        for future in done:
+            login = pending.pop(future)
+            try:
+                row = {"login": login, **future.result(), "error": None}
+                succeeded += 1
+            except Exception as e:
+                row = {"login": login, "error": str(e)}
+                failed += 1
+            writer.write(row)
+
+    def compute(login: str) -> dict:
+        with Tracer.module(type(module).__name__):
+            return module.compute(login)
+
+    with ThreadPoolExecutor(workers) as executor:
+        for login in logins:
+            pending[executor.submit(compute, login)] = login
+            if len(pending) >= 2 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    return succeeded, failed
@@ -0,0 +1,225 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from src.config import get_cache_dir
+
+
+class ResponseCache:
+    """
+    A persistent on-disk cache for API responses, backed by SQLite.
+
+    Responses are keyed by URL and query parameters and stored zlib-compressed.
+    Each endpoint has its own time to live, after which a cached response is
+    revalidated with If-None-Match if the API sent an ETag, or refetched otherwise.
+    When the cache grows past `max_bytes`, the least recently used responses are evicted.
+
+    Attributes:
+        TTLS (list[tuple[str, int]]): Time to live in seconds per endpoint, as (URL regex, seconds).
+                                      The first matching pattern wins.
+        DEFAULT_TTL (int): Time to live in seconds of endpoints not matched by TTLS.
+        DEFAULT_MAX_BYTES (int): The default size bound of the cache.
+    """
+
+    TTLS = [
+        (r"/v2/users/[^/]+$", 7 * 24 * 3600),
+        (r"/v2/campus/\d+/users$", 24 * 3600),
+        (r"/scale_teams", 3600),
+        (r"/projects_users$", 3600),
+    ]
+    DEFAULT_TTL = 3600
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttls: Optional[list[tuple[str, int]]] = None,
+    ):
+        """
+        Initializes a new instance of the ResponseCache class.
+
+        Args:
+            path (str, optional): The path of the SQLite database. Defaults to responses.sqlite3 in the cache directory.
+            max_bytes (int, optional): The maximum size of the stored response bodies. Defaults to 256 MiB.
+            ttls (list[tuple[str, int]], optional): Overrides the time to live per endpoint. Defaults to ResponseCache.TTLS.
+        """
+        self.path = path or os.path.join(get_cache_dir(), "responses.sqlite3")
+        self.max_bytes = max_bytes
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls or self.TTLS)]
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[dict]) -> str:
+        """
+        Builds the cache key of a request.
+
+        Args:
+            url (str): The URL of the request.
+            params (dict, optional): The query parameters of the request.
+
+        Returns:
+            str: The URL followed by the sorted query parameters.
+        """
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted((str(k), str(v)) for k, v in params.items()))}"
+
+    def get_ttl(self, url: str) -> int:
+        """
+        Returns the time to live of the responses of an endpoint.
+
+        Args:
+            url (str): The URL of the request.
+
+        Returns:
+            int: The time to live in seconds.
+        """
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return self.DEFAULT_TTL
+
+    def lookup(
+        self, url: str, params: Optional[dict]
+    ) -> tuple[Optional[requests.Response], bool]:
+        """
+        Looks up a cached response.
+
+        Args:
+            url (str): The URL of the request.
+            params (dict, optional): The query parameters of the request.
+
+        Returns:
+            tuple[requests.Response, bool]: The cached response (None on a miss), and whether it is still fresh.
+        """
+        key = self.make_key(url, params)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, body, stored_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None, False
+            self._db.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._db.commit()
+
+        status, headers, body, stored_at = row
+        fresh = time.time() - stored_at < self.get_ttl(url)
+        return self._build_response(url, status, headers, body), fresh
+
+    def store(self, url: str, params: Optional[dict], response: requests.Response):
+        """
+        Stores a response, then evicts the least recently used responses if the cache is too large.
+
+        Only successful responses are stored.
+
+        Args:
+            url (str): The URL of the request.
+            params (dict, optional): The query parameters of the request.
+            response (requests.Response): The response to store.
+        """
+        if response.status_code != 200 or self.get_ttl(url) <= 0:
+            return
+
+        body = zlib.compress(response.content)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.make_key(url, params),
+                    response.status_code,
+                    json.dumps(dict(response.headers)),
+                    body,
+                    response.headers.get("ETag"),
+                    len(body),
+                    now,
+                    now,
+                ),
+            )
+            self._evict()
+            self._db.commit()
+
+    def revalidated(self, url: str, params: Optional[dict]):
+        """
+        Marks a cached response as fresh again after the API answered 304 Not Modified.
+
+        Args:
+            url (str): The URL of the request.
+            params (dict, optional): The query parameters of the request.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, self.make_key(url, params)),
+            )
+            self._db.commit()
+
+    def clear(self):
+        """
+        Removes every cached response.
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def _evict(self):
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+
+        rows = self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    @staticmethod
+    def _build_response(
+        url: str, status: int, headers: str, body: bytes
+    ) -> requests.Response:
+        response = requests.Response()
+        response.url = url
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        response._content = zlib.decompress(body)
+        response.encoding = "utf-8"
+        return response
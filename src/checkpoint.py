@@ -0,0 +1,301 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional
+
+from src.config import get_cache_dir
+
+
+class Checkpoint:
+    """
+    The progress of bulk fetch jobs, backed by SQLite, so a job that stopped can resume where it was.
+
+    A job is a list of tasks, each fetching every page of one endpoint for one user.
+    The parameters of a task are saved when it starts, so the run resuming it fetches
+    its remaining pages with the same filter, and the error of a task that failed is kept
+    until it is finished. The pages of a task are saved as they
+    arrive, along with the page count, and dropped once the task is finished and its records have been stored elsewhere.
+    Every write is committed right away, so at most the pages in flight are lost when
+    the process dies.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initializes a new instance of the Checkpoint class.
+
+        Args:
+            path (str, optional): The path of the SQLite database, or ":memory:" for checkpoints
+                                  that only live as long as the process. Defaults to jobs.sqlite3
+                                  in the cache directory.
+        """
+        self.path = path or os.path.join(get_cache_dir(), "jobs.sqlite3")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                job TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                endpoint TEXT NOT NULL,
+                pages INTEGER,
+                params TEXT,
+                error TEXT,
+                done INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (job, user_id, endpoint)
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                job TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                endpoint TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                records TEXT NOT NULL,
+                PRIMARY KEY (job, user_id, endpoint, page)
+            );
+            """)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(tasks)")]
+        for column in ("params", "error"):
+            if column not in columns:
+                # Checkpoints written before the column was added.
+                self._db.execute(f"ALTER TABLE tasks ADD COLUMN {column} TEXT")
+        self._db.commit()
+
+    def add_tasks(self, job: str, tasks: Iterable[tuple[int, str]]):
+        """
+        Adds tasks to a job. Tasks it already has are left as they are.
+
+        Args:
+            job (str): The name of the job.
+            tasks (Iterable[tuple[int, str]]): The (user ID, endpoint) of each task.
+        """
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO tasks (job, user_id, endpoint) VALUES (?, ?, ?)",
+                [(job, user_id, endpoint) for user_id, endpoint in tasks],
+            )
+            self._db.commit()
+
+    def get_tasks(self, job: str) -> list[tuple[int, str]]:
+        """
+        Args:
+            job (str): The name of the job.
+
+        Returns:
+            list[tuple[int, str]]: The (user ID, endpoint) of the tasks not finished yet.
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT user_id, endpoint FROM tasks WHERE job = ? AND done = 0 ORDER BY user_id, endpoint",
+                (job,),
+            ).fetchall()
+
+    def is_done(self, job: str, user_id: int, endpoint: str) -> bool:
+        """
+        Args:
+            job (str): The name of the job.
+            user_id (int): The user of the task.
+            endpoint (str): The endpoint of the task.
+
+        Returns:
+            bool: Whether the task is finished.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT done FROM tasks WHERE job = ? AND user_id = ? AND endpoint = ?",
+                (job, user_id, endpoint),
+            ).fetchone()
+        return bool(row and row[0])
+
+    def get_progress(self, job: str) -> tuple[int, int]:
+        """
+        Args:
+            job (str): The name of the job.
+
+        Returns:
+            tuple[int, int]: The number of finished tasks, and the number of tasks.
+        """
+        with self._lock:
+            done, total = self._db.execute(
+                "SELECT COALESCE(SUM(done), 0), COUNT(*) FROM tasks WHERE job = ?",
+                (job,),
+            ).fetchone()
+        return done, total
+
+    def get_failed(self, job: str) -> int:
+        """
+        Args:
+            job (str): The name of the job.
+
+        Returns:
+            int: The number of tasks not finished whose last run failed.
+        """
+        with self._lock:
+            (failed,) = self._db.execute(
+                "SELECT COUNT(*) FROM tasks WHERE job = ? AND done = 0 AND error IS NOT NULL",
+                (job,),
+            ).fetchone()
+        return failed
+
+    def get_params(self, job: str, user_id: int, endpoint: str) -> Optional[dict]:
+        """
+        Args:
+            job (str): The name of the job.
+            user_id (int): The user of the task.
+            endpoint (str): The endpoint of the task.
+
+        Returns:
+            dict: The parameters the task was started with, or None if it has not started yet.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT params FROM tasks WHERE job = ? AND user_id = ? AND endpoint = ?",
+                (job, user_id, endpoint),
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def set_params(self, job: str, user_id: int, endpoint: str, params: dict):
+        """
+        Args:
+            job (str): The name of the job.
+            user_id (int): The user of the task.
+            endpoint (str): The endpoint of the task.
+            params (dict): The parameters every page of the task is fetched with.
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE tasks SET params = ? WHERE job = ? AND user_id = ? AND endpoint = ?",
+                (json.dumps(params), job, user_id, endpoint),
+            )
+            self._db.commit()
+
+    def get_page_count(self, job: str, user_id: int, endpoint: str) -> Optional[int]:
+        """
+        Args:
+            job (str): The name of the job.
+            user_id (int): The user of the task.
+            endpoint (str): The endpoint of the task.
+
+        Returns:
+            int: The number of pages of the task, or None if it is not known yet.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT pages FROM tasks WHERE job = ? AND user_id = ? AND endpoint = ?",
+                (job, user_id, endpoint),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_page_count(self, job: str, user_id: int, endpoint: str, pages: int):
+        """
+        Args:
+            job (str): The name of the job.
+            user_id (int): The user of the task.
+            endpoint (str): The endpoint of the task.
+            pages (int): The number of pages of the task.
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE tasks SET pages = ? WHERE job = ? AND user_id = ? AND endpoint = ?",
+                (pages, job, user_id, endpoint),
+            )
+            self._db.commit()
+
+    def get_saved_pages(self, job: str, user_id: int, endpoint: str) -> set[int]:
+        """
+        Args:
+            job (str): The name of the job.
+            user_id (int): The user of the task.
+            endpoint (str): The endpoint of the task.
+
+        Returns:
+            set[int]: The numbers of the pages saved for the task.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT page FROM pages WHERE job = ? AND user_id = ? AND endpoint = ?",
+                (job, user_id, endpoint),
+            ).fetchall()
+        return {page for (page,) in rows}
+
+    def save_page(
+        self, job: str, user_id: int, endpoint: str, page: int, records: list
+    ):
+        """
+        Args:
+            job (str): The name of the job.
+            user_id (int): The user of the task.
+            endpoint (str): The endpoint of the task.
+            page (int): The number of the page.
+            records (list): The records of the page, as returned by the API.
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (job, user_id, endpoint, page, records) VALUES (?, ?, ?, ?, ?)",
+                (job, user_id, endpoint, page, json.dumps(records)),
+            )
+            self._db.commit()
+
+    def load_records(self, job: str, user_id: int, endpoint: str) -> list:
+        """
+        Args:
+            job (str): The name of the job.
+            user_id (int): The user of the task.
+            endpoint (str): The endpoint of the task.
+
+        Returns:
+            list: The records of the pages saved for the task, in page order.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT records FROM pages WHERE job = ? AND user_id = ? AND endpoint = ? ORDER BY page",
+                (job, user_id, endpoint),
+            ).fetchall()
+        return [record for (records,) in rows for record in json.loads(records)]
+
+    def finish_task(self, job: str, user_id: int, endpoint: str):
+        """
+        Marks a task as finished and drops its pages.
+
+        Args:
+            job (str): The name of the job.
+            user_id (int): The user of the task.
+            endpoint (str): The endpoint of the task.
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE tasks SET done = 1, error = NULL WHERE job = ? AND user_id = ? AND endpoint = ?",
+                (job, user_id, endpoint),
+            )
+            self._db.execute(
+                "DELETE FROM pages WHERE job = ? AND user_id = ? AND endpoint = ?",
+                (job, user_id, endpoint),
+            )
+            self._db.commit()
+
+    def fail_task(self, job: str, user_id: int, endpoint: str, error: str):
+        """
+        Records that a task failed. It stays in `get_tasks`, so the next run retries it.
+
+        Args:
+            job (str): The name of the job.
+            user_id (int): The user of the task.
+            endpoint (str): The endpoint of the task.
+            error (str): Why it failed.
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE tasks SET error = ? WHERE job = ? AND user_id = ? AND endpoint = ?",
+                (error, job, user_id, endpoint),
+            )
+            self._db.commit()
+
+    def reset(self, job: str):
+        """
+        Forgets a job, so it starts over the next time it runs.
+
+        Args:
+            job (str): The name of the job.
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM tasks WHERE job = ?", (job,))
+            self._db.execute("DELETE FROM pages WHERE job = ?", (job,))
+            self._db.commit()
@@ -0,0 +1,81 @@
+import os
+import re
+from urllib.parse import urlparse
+
+DEFAULT_API_URL = "https://api.intra.42.fr"
+
+
+def get_cache_dir() -> str:
+    """
+    Returns the directory used for local caches, creating it if needed.
+
+    The location can be changed with the STATS_CACHE_DIR environment variable,
+    and defaults to ~/.cache/42-stats. When API_URL points at another server, e.g. a
+    mock of the API, its caches are kept apart in hosts/<host> within it, so the logins,
+    evaluations and tokens of one server are never served for the other.
+
+    Returns:
+        str: The path of the cache directory.
+    """
+    path = os.getenv("STATS_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "42-stats"
+    )
+    api_url = get_api_url()
+    if api_url != DEFAULT_API_URL:
+        host = re.sub(r"[^\w.-]", "_", urlparse(api_url).netloc or api_url)
+        path = os.path.join(path, "hosts", host)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_api_url() -> str:
+    """
+    Returns the base URL of the intra API.
+
+    It can be changed with the API_URL environment variable, e.g. to point the
+    app at a local mock of the API, and defaults to DEFAULT_API_URL.
+
+    Returns:
+        str: The base URL, without a trailing slash.
+    """
+    return (os.getenv("API_URL") or DEFAULT_API_URL).rstrip("/")
+
+
+def get_env_int(name: str, default: int) -> int:
+    """
+    Reads an integer from the environment.
+
+    Args:
+        name (str): The name of the environment variable.
+        default (int): The value returned if the variable is not set.
+
+    Returns:
+        int: The value of the environment variable.
+
+    Raises:
+        Exception: If the variable is set but is not an integer.
+    """
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise Exception(f"{name} must be an integer, got {value!r}")
+
+
+def get_env_flag(name: str, default: bool = False) -> bool:
+    """
+    Reads a boolean flag from the environment ("1", "true", "yes" and "on" are truthy).
+
+    Args:
+        name (str): The name of the environment variable.
+        default (bool, optional): The value returned if the variable is not set. Defaults to False.
+
+    Returns:
+        bool: The value of the flag.
+    """
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
@@ -0,0 +1,262 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Optional
+
+import requests
+from oauthlib.oauth2 import OAuth2Error
+
+from src.request import IntraSession
+
+
+class PoolMember:
+    """
+    A credential of a CredentialPool, with the counters the scheduler and eviction work on.
+
+    Attributes:
+        session (IntraSession): The authenticated session of the credential, with its own token and rate limiter.
+        client_id (str): The UID of the intra application.
+        in_flight (int): The number of requests currently sent with the credential.
+        requests (int): The number of requests sent with the credential.
+        throttled (int): The number of 429s received in a row.
+        benched (int): The number of times the credential was taken out of rotation for its 429s.
+        benched_until (float): The time.monotonic() value until which the credential is out of rotation.
+        disabled (bool): Whether the credential was rejected, for good.
+    """
+
+    def __init__(self, session: IntraSession):
+        """
+        Initializes a new instance of the PoolMember class.
+
+        Args:
+            session (IntraSession): The authenticated session of the credential.
+        """
+        self.session = session
+        self.client_id = session.credentials[0]
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.benched = 0
+        self.benched_until = 0.0
+        self.disabled = False
+
+    def is_available(self, now: float) -> bool:
+        """
+        Args:
+            now (float): The current time.monotonic() value.
+
+        Returns:
+            bool: Whether the credential is in rotation.
+        """
+        return not self.disabled and self.benched_until <= now
+
+    def load(self) -> float:
+        """
+        Returns:
+            float: The estimated seconds before a new request can be sent with the credential:
+                   the wait for its rate limits, plus the time its requests in flight take
+                   at its per-second rate.
+        """
+        rate_limiter = self.session.rate_limiter
+        return (
+            rate_limiter.wait_time()
+            + self.in_flight / rate_limiter.buckets["secondly"].rate
+        )
+
+
+class CredentialPool:
+    """
+    Spreads requests over several intra applications, each with its own access token
+    and rate limit budget, so throughput grows with the number of applications.
+
+    The pool is used like an IntraSession: `get` picks a credential, least loaded
+    (the one whose rate limits and requests in flight let it send soonest) or
+    round-robin, and sends the request with it. On a 429 the request is
+    sent again right away with another credential that is in rotation.
+
+    A credential that gets MAX_THROTTLED 429s in a row is taken out of rotation for
+    BENCH_SECONDS, twice as long each time it happens again. A credential whose token
+    is rejected and cannot be refreshed is disabled for the rest of the run.
+
+    Attributes:
+        SCHEDULERS (list[str]): The supported scheduling strategies.
+        MAX_THROTTLED (int): The number of 429s in a row after which a credential is benched.
+        BENCH_SECONDS (float): How long a credential is first benched for.
+        members (list[PoolMember]): The credentials of the pool.
+        scheduler (str): One of CredentialPool.SCHEDULERS.
+        logs (logging.Logger): The logger used for logging benched and disabled credentials.
+    """
+
+    SCHEDULERS = ["least-loaded", "round-robin"]
+    MAX_THROTTLED = 3
+    BENCH_SECONDS = 60.0
+
+    def __init__(self, sessions: list[IntraSession], scheduler: str = "least-loaded"):
+        """
+        Initializes a new instance of the CredentialPool class.
+
+        Args:
+            sessions (list[IntraSession]): The authenticated sessions, one per credential.
+            scheduler (str, optional): One of CredentialPool.SCHEDULERS. Defaults to "least-loaded".
+        """
+        if not sessions:
+            raise Exception("a credential pool needs at least one session")
+        if scheduler not in self.SCHEDULERS:
+            raise Exception(f"unknown scheduler: {scheduler}")
+
+        self.members = [PoolMember(session) for session in sessions]
+        self.scheduler = scheduler
+        self.logs = logging.getLogger("logs")
+        self._lock = threading.Lock()
+        self._next = itertools.cycle(range(len(self.members)))
+
+    def pick(self, exclude: tuple = ()) -> Optional[PoolMember]:
+        """
+        Picks the credential the next request is sent with, and counts the request as in flight.
+
+        Args:
+            exclude (tuple, optional): Credentials not to pick, e.g. those that were just throttled. Defaults to ().
+
+        Returns:
+            PoolMember: The credential, or None if every credential in rotation is excluded.
+
+        Raises:
+            Exception: If every credential is disabled.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                enabled = [member for member in self.members if not member.disabled]
+                if not enabled:
+                    raise Exception("every API credential was rejected")
+                available = [
+                    member
+                    for member in enabled
+                    if member.is_available(now) and member not in exclude
+                ]
+                if available:
+                    member = self._schedule(available)
+                    member.in_flight += 1
+                    member.requests += 1
+                    return member
+                if any(member.is_available(now) for member in enabled):
+                    return None
+                wait = min(member.benched_until for member in enabled) - now
+
+            # Every credential is benched, wait for the first one to be back.
+            time.sleep(wait)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a GET request with a credential picked by the scheduler.
+
+        Args:
+            url (str): The URL of the request.
+            **kwargs: Passed on to IntraSession.get.
+
+        Returns:
+            requests.Response: The response. A 429 is only returned when every credential in rotation was throttled.
+        """
+        tried: list[PoolMember] = []
+        response = None
+        while (member := self.pick(tuple(tried))) is not None:
+            tried.append(member)
+            try:
+                response = member.session.get(url, **kwargs)
+                if response.status_code == 401:
+                    # The token may have been revoked, a fresh one settles it.
+                    member.session.refresh()
+                    response = member.session.get(url, **kwargs)
+            except OAuth2Error as e:
+                self.disable(member, str(e))
+                continue
+            finally:
+                with self._lock:
+                    member.in_flight -= 1
+
+            if response.status_code == 401:
+                self.disable(member, "access token rejected")
+            elif response.status_code == 429:
+                self.throttle(member)
+            else:
+                with self._lock:
+                    member.throttled = 0
+                    member.benched = 0
+                return response
+
+        if response is None:
+            raise Exception(f"Request {url} failed: no API credential left")
+        return response
+
+    def throttle(self, member: PoolMember):
+        """
+        Records a 429 of a credential, and takes it out of rotation after MAX_THROTTLED in a row.
+
+        Args:
+            member (PoolMember): The credential.
+        """
+        with self._lock:
+            member.throttled += 1
+            if member.throttled < self.MAX_THROTTLED:
+                return
+            seconds = self.BENCH_SECONDS * 2**member.benched
+            member.benched_until = time.monotonic() + seconds
+            member.benched += 1
+            member.throttled = 0
+        self.logs.warning(
+            f"API credential {member.client_id} is rate limited, out of rotation for {seconds:g} seconds"
+        )
+
+    def disable(self, member: PoolMember, reason: str):
+        """
+        Takes a credential out of rotation for good.
+
+        Args:
+            member (PoolMember): The credential.
+            reason (str): Why it is disabled, for the logs.
+        """
+        with self._lock:
+            member.disabled = True
+        self.logs.warning(f"API credential {member.client_id} disabled: {reason}")
+
+    def summary(self) -> str:
+        """
+        Returns:
+            str: The number of requests sent with each credential, and their state.
+        """
+        now = time.monotonic()
+        lines = ["credential                                 requests  state"]
+        for member in self.members:
+            if member.disabled:
+                state = "disabled"
+            elif not member.is_available(now):
+                state = f"benched for {member.benched_until - now:.0f}s"
+            else:
+                state = "active"
+            lines.append(f"{member.client_id[:40]:<42} {member.requests:>8}  {state}")
+        return "\n".join(lines)
+
+    @property
+    def session(self) -> IntraSession:
+        """
+        Returns:
+            IntraSession: The session of the credential the scheduler would pick, for clients that
+                          can only use one, like AsyncIntraClient.from_session.
+        """
+        with self._lock:
+            now = time.monotonic()
+            available = [member for member in self.members if member.is_available(now)]
+            enabled = [member for member in self.members if not member.disabled]
+            if not enabled:
+                raise Exception("every API credential was rejected")
+            return self._schedule(available or enabled).session
+
+    def _schedule(self, available: list[PoolMember]) -> PoolMember:
+        # Must be called with the lock held.
+        if self.scheduler == "round-robin":
+            while True:
+                member = self.members[next(self._next)]
+                if member in available:
+                    return member
+        return min(available, key=PoolMember.load)
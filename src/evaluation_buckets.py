@@ -0,0 +1,201 @@
+import math
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+class EvaluationBuckets:
+    """
+    Monthly aggregates of the evaluations of a user, for querying any time window without
+    going back to the evaluations themselves.
+
+    Every calendar month between the first and the last evaluation has a row, sorted by
+    month, with zeros for the months without evaluations. A row holds the sums needed to
+    combine months: counts, the sum and sum of squares of the marks, and the number of
+    failing marks. Windows and rolling windows are sums over rows, so they cost
+    O(months) whatever the number of evaluations.
+
+    Evaluations are dated by `begin_at`, or `created_at` for those that were never scheduled.
+
+    Attributes:
+        COLUMNS (list[str]): The aggregates of each month.
+        FAIL_MARK (int): The marks below which an evaluation counts as failed.
+        frame (pd.DataFrame): One row per month, indexed by the first day of the month.
+    """
+
+    COLUMNS = ["evaluations", "marked", "mark_sum", "mark_sq_sum", "fails"]
+    FAIL_MARK = 50
+
+    def __init__(self, frame: pd.DataFrame):
+        """
+        Initializes a new instance of the EvaluationBuckets class.
+
+        Args:
+            frame (pd.DataFrame): One row per month, with the columns of EvaluationBuckets.COLUMNS.
+        """
+        self.frame = frame
+
+    @classmethod
+    def from_table(cls, table: pa.Table) -> "EvaluationBuckets":
+        """
+        Aggregates evaluations per month.
+
+        Args:
+            table (pa.Table): The evaluations, with the columns of EvaluationStore.SCHEMA.
+
+        Returns:
+            EvaluationBuckets: The monthly aggregates.
+        """
+        evaluations = table.select(["begin_at", "created_at", "final_mark"]).to_pandas()
+        at = evaluations["begin_at"].fillna(evaluations["created_at"]).dropna()
+        if at.empty:
+            return cls(
+                pd.DataFrame(
+                    {column: pd.Series(dtype=np.int64) for column in cls.COLUMNS},
+                    index=pd.DatetimeIndex([], name="month"),
+                )
+            )
+
+        marks = evaluations["final_mark"].loc[at.index].to_numpy(dtype=np.float64)
+        months = at.dt.tz_localize(None).dt.to_period("M").dt.to_timestamp()
+        frame = (
+            pd.DataFrame(
+                {
+                    "evaluations": 1,
+                    "marked": (~np.isnan(marks)).astype(np.int64),
+                    "mark_sum": np.nan_to_num(marks),
+                    "mark_sq_sum": np.nan_to_num(marks) ** 2,
+                    "fails": (marks < cls.FAIL_MARK).astype(np.int64),
+                },
+                index=pd.DatetimeIndex(months.to_numpy()),
+            )
+            .groupby(level=0)
+            .sum()
+        )
+        frame = frame.reindex(
+            pd.date_range(frame.index[0], frame.index[-1], freq="MS"), fill_value=0
+        )
+        frame.index.name = "month"
+        return cls(frame[cls.COLUMNS])
+
+    @classmethod
+    def from_arrow(cls, table: pa.Table) -> "EvaluationBuckets":
+        """
+        Args:
+            table (pa.Table): Buckets saved with `to_arrow`.
+
+        Returns:
+            EvaluationBuckets: The monthly aggregates.
+        """
+        return cls(table.to_pandas().set_index("month"))
+
+    def to_arrow(self) -> pa.Table:
+        """
+        Returns:
+            pa.Table: The buckets, with the month as a column.
+        """
+        return pa.Table.from_pandas(self.frame.reset_index(), preserve_index=False)
+
+    @staticmethod
+    def summarize(sums: pd.DataFrame) -> pd.DataFrame:
+        """
+        Turns summed aggregates into statistics.
+
+        Args:
+            sums (pd.DataFrame): Rows of summed aggregates, e.g. months or windows of months.
+
+        Returns:
+            pd.DataFrame: The number of evaluations and the mean, standard deviation and
+                          failure rate (between 0 and 1) of their marks, NaN without marks.
+        """
+        marked = sums["marked"].where(sums["marked"] > 0)
+        mean = sums["mark_sum"] / marked
+        variance = (sums["mark_sq_sum"] - marked * mean**2) / (marked - 1)
+        return pd.DataFrame(
+            {
+                "evaluations": sums["evaluations"],
+                "mean": mean,
+                "std": np.sqrt(variance.clip(lower=0)),
+                "failure_rate": sums["fails"] / marked,
+            }
+        )
+
+    def window(
+        self, start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None
+    ) -> pd.Series:
+        """
+        Summarizes the evaluations of the months between `start` and `end`, inclusive.
+
+        Args:
+            start (pd.Timestamp, optional): The first month. Defaults to the first month with evaluations.
+            end (pd.Timestamp, optional): The last month. Defaults to the last month with evaluations.
+
+        Returns:
+            pd.Series: The statistics of `summarize` over the window.
+        """
+        sums = self.frame.loc[start:end].sum().to_frame().T
+        return self.summarize(sums).iloc[0]
+
+    def last(self, months: int, end: Optional[pd.Timestamp] = None) -> pd.Series:
+        """
+        Summarizes the evaluations of the last months.
+
+        Args:
+            months (int): The number of months.
+            end (pd.Timestamp, optional): The last month. Defaults to the current month.
+
+        Returns:
+            pd.Series: The statistics of `summarize` over the months.
+        """
+        if end is None:
+            end = (
+                pd.Timestamp.now(tz="UTC")
+                .tz_localize(None)
+                .to_period("M")
+                .to_timestamp()
+            )
+        return self.window(end - pd.DateOffset(months=months - 1), end)
+
+    def monthly(self) -> pd.DataFrame:
+        """
+        Returns:
+            pd.DataFrame: The statistics of `summarize` for every month.
+        """
+        return self.summarize(self.frame)
+
+    def rolling(self, months: int) -> pd.DataFrame:
+        """
+        Summarizes the evaluations of a sliding window of months, ending at every month.
+
+        Args:
+            months (int): The number of months of the window.
+
+        Returns:
+            pd.DataFrame: The statistics of `summarize` for the window ending at each month.
+        """
+        return self.summarize(self.frame.rolling(months, min_periods=1).sum())
+
+    def trend(self) -> float:
+        """
+        Returns:
+            float: The slope of the monthly mean mark, in points per month, fitted by least
+                   squares weighted by the number of marks of each month. NaN with fewer
+                   than two months with marks.
+        """
+        monthly = self.monthly()
+        marked = self.frame["marked"].to_numpy(dtype=np.float64)
+        mask = marked > 0
+        if mask.sum() < 2:
+            return math.nan
+
+        x = np.arange(len(monthly), dtype=np.float64)[mask]
+        y = monthly["mean"].to_numpy(dtype=np.float64)[mask]
+        weights = marked[mask]
+        x_mean = np.average(x, weights=weights)
+        y_mean = np.average(y, weights=weights)
+        return float(
+            np.sum(weights * (x - x_mean) * (y - y_mean))
+            / np.sum(weights * (x - x_mean) ** 2)
+        )
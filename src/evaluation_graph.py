@@ -0,0 +1,375 @@
+import json
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.evaluation_records import EvaluationRecords
+
+
+class EvaluationGraph:
+    """
+    A directed graph of who evaluated whom, stored as compressed sparse rows.
+
+    Users are indexed by integers. The edges leaving user `i` are
+    `indices[indptr[i]:indptr[i + 1]]`, sorted by target, and each edge carries the
+    number of evaluations from the corrector to the corrected user and the mean
+    final mark given. The arrays are saved as .npy files and memory-mapped on load,
+    so a graph only has to be built once.
+
+    Attributes:
+        ARRAYS (tuple[str, ...]): The names of the CSR arrays.
+        logins (list[str]): The login of each user index.
+        indptr (np.ndarray): The offsets of the edges of each user (int64, n + 1).
+        indices (np.ndarray): The target of each edge (int32).
+        counts (np.ndarray): The number of evaluations of each edge (int32).
+        means (np.ndarray): The mean final mark of each edge, NaN if no evaluation was marked (float32).
+    """
+
+    ARRAYS = ("indptr", "indices", "counts", "means")
+
+    def __init__(
+        self,
+        logins: list[str],
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        counts: np.ndarray,
+        means: np.ndarray,
+    ):
+        """
+        Initializes a new instance of the EvaluationGraph class.
+
+        Args:
+            logins (list[str]): The login of each user index.
+            indptr (np.ndarray): The offsets of the edges of each user.
+            indices (np.ndarray): The target of each edge.
+            counts (np.ndarray): The number of evaluations of each edge.
+            means (np.ndarray): The mean final mark of each edge.
+        """
+        self.logins = logins
+        self.ids = {login: id for id, login in enumerate(logins)}
+        self.indptr = indptr
+        self.indices = indices
+        self.counts = counts
+        self.means = means
+        self._rows: Optional[np.ndarray] = None
+        self._reverse: Optional[tuple[np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def from_evaluations(cls, evaluations: pd.DataFrame) -> "EvaluationGraph":
+        """
+        Builds the graph from normalized scale_teams, with one edge per (corrector, corrected user).
+
+        Scale_teams are deduplicated by id, and those without a visible corrector are skipped.
+
+        Args:
+            evaluations (pd.DataFrame): The scale_teams, with "id", "corrector_login",
+                                        "corrected_logins" and "final_mark" columns.
+
+        Returns:
+            EvaluationGraph: The graph.
+        """
+        edges = (
+            evaluations.drop_duplicates("id")
+            .dropna(subset=["corrector_login"])
+            .explode("corrected_logins")
+            .dropna(subset=["corrected_logins"])
+        )
+
+        codes, logins = pd.factorize(
+            pd.concat([edges["corrector_login"], edges["corrected_logins"]])
+        )
+
+        return cls.from_edges(
+            list(logins),
+            codes[: len(edges)].astype(np.int64),
+            codes[len(edges) :].astype(np.int64),
+            edges["final_mark"].to_numpy(dtype=np.float64, na_value=np.nan),
+        )
+
+    @classmethod
+    def from_records(cls, records: EvaluationRecords) -> "EvaluationGraph":
+        """
+        Builds the graph from compact scale_teams, like `from_evaluations` does from a DataFrame.
+
+        Args:
+            records (EvaluationRecords): The scale_teams.
+
+        Returns:
+            EvaluationGraph: The graph.
+        """
+        _, first = np.unique(records.rows["id"], return_index=True)
+        keep = np.zeros(len(records), dtype=bool)
+        keep[first] = True
+        keep &= records.rows["corrector"] >= 0
+
+        sizes = np.diff(records.corrected_indptr)
+        sources = np.repeat(records.rows["corrector"], sizes)
+        marks = np.repeat(records.rows["final_mark"].astype(np.float64), sizes)
+        targets = records.corrected
+        edges = np.repeat(keep, sizes) & (targets >= 0)
+
+        # Only keep the logins that appear in an edge, in order of first appearance.
+        used = np.concatenate([sources[edges], targets[edges]])
+        codes, uniques = pd.factorize(used)
+        return cls.from_edges(
+            [records.logins[code] for code in uniques],
+            codes[: edges.sum()].astype(np.int64),
+            codes[edges.sum() :].astype(np.int64),
+            marks[edges],
+        )
+
+    @classmethod
+    def from_edges(
+        cls,
+        logins: list[str],
+        sources: np.ndarray,
+        targets: np.ndarray,
+        marks: np.ndarray,
+    ) -> "EvaluationGraph":
+        """
+        Builds the graph from one entry per evaluation, merging parallel edges.
+
+        Args:
+            logins (list[str]): The login of each user index.
+            sources (np.ndarray): The corrector of each evaluation.
+            targets (np.ndarray): The corrected user of each evaluation.
+            marks (np.ndarray): The final mark of each evaluation, NaN if unmarked.
+
+        Returns:
+            EvaluationGraph: The graph.
+        """
+        n = len(logins)
+        keys, inverse = np.unique(sources * n + targets, return_inverse=True)
+
+        counts = np.bincount(inverse, minlength=len(keys))
+        marked = ~np.isnan(marks)
+        sums = np.bincount(inverse[marked], weights=marks[marked], minlength=len(keys))
+        marked_counts = np.bincount(inverse[marked], minlength=len(keys))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / marked_counts
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // n, minlength=n), out=indptr[1:])
+
+        return cls(
+            logins,
+            indptr,
+            (keys % n).astype(np.int32),
+            counts.astype(np.int32),
+            means.astype(np.float32),
+        )
+
+    def save(self, path: str):
+        """
+        Saves the graph as a directory of .npy files and a logins.json file.
+
+        Args:
+            path (str): The directory to save the graph to.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "logins.json"), "w") as f:
+            json.dump(self.logins, f)
+
+    @classmethod
+    def load(cls, path: str) -> "EvaluationGraph":
+        """
+        Loads a graph saved with `save`, memory-mapping its arrays.
+
+        Args:
+            path (str): The directory the graph was saved to.
+
+        Returns:
+            EvaluationGraph: The graph.
+        """
+        with open(os.path.join(path, "logins.json")) as f:
+            logins = json.load(f)
+        arrays = [
+            np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in cls.ARRAYS
+        ]
+        return cls(logins, *arrays)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """
+        Args:
+            path (str): The directory a graph may have been saved to.
+
+        Returns:
+            bool: Whether a saved graph is present.
+        """
+        return os.path.exists(os.path.join(path, "logins.json"))
+
+    @property
+    def rows(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The source of each edge.
+        """
+        if self._rows is None:
+            self._rows = np.repeat(
+                np.arange(len(self.logins), dtype=np.int32), np.diff(self.indptr)
+            )
+        return self._rows
+
+    def reverse_edges(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the reverse of every edge.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Whether each edge has a reverse edge, and the position of that reverse edge.
+        """
+        if self._reverse is None:
+            n = len(self.logins)
+            keys = self.rows.astype(np.int64) * n + self.indices
+            reverse_keys = self.indices.astype(np.int64) * n + self.rows
+            positions = np.searchsorted(keys, reverse_keys)
+            if len(keys):
+                positions = np.minimum(positions, len(keys) - 1)
+                found = keys[positions] == reverse_keys
+            else:
+                found = np.zeros(0, dtype=bool)
+            self._reverse = (found, positions)
+        return self._reverse
+
+    def reciprocity(self) -> float:
+        """
+        Returns:
+            float: The fraction of (corrector, corrected) edges that also exist in the other direction.
+        """
+        found, _ = self.reverse_edges()
+        return float(found.mean()) if len(found) else 0.0
+
+    def top_pairs(self, n: int = 10) -> list[tuple[str, str, int, int, float, float]]:
+        """
+        Finds the pairs of users that evaluated each other the most, in either direction.
+
+        Args:
+            n (int, optional): The number of pairs to return. Defaults to 10.
+
+        Returns:
+            list[tuple[str, str, int, int, float, float]]: (login a, login b, evaluations a -> b,
+                evaluations b -> a, mean mark a -> b, mean mark b -> a), most evaluations first.
+        """
+        found, positions = self.reverse_edges()
+        reverse_counts = np.where(found, self.counts[positions], 0)
+        reverse_means = np.where(found, self.means[positions], np.nan)
+
+        # Keep each pair once: from its lower index if it is mutual.
+        edges = np.nonzero((self.rows < self.indices) | ~found)[0]
+        totals = self.counts[edges] + reverse_counts[edges]
+        edges = edges[np.argsort(-totals, kind="stable")[:n]]
+
+        return [
+            (
+                self.logins[self.rows[edge]],
+                self.logins[self.indices[edge]],
+                int(self.counts[edge]),
+                int(reverse_counts[edge]),
+                float(self.means[edge]),
+                float(reverse_means[edge]),
+            )
+            for edge in edges
+        ]
+
+    def mutual_rings(self, min_count: int = 3) -> list[tuple[list[str], int, float]]:
+        """
+        Finds groups of users that repeatedly evaluate each other.
+
+        Two users are linked if each evaluated the other at least `min_count` times,
+        and a ring is a connected group of linked users.
+
+        Args:
+            min_count (int, optional): The number of evaluations required in each direction. Defaults to 3.
+
+        Returns:
+            list[tuple[list[str], int, float]]: (logins, evaluations within the ring, mean mark within the ring),
+                most evaluations first.
+        """
+        found, positions = self.reverse_edges()
+        mutual = found & (self.counts >= min_count)
+        mutual &= np.where(found, self.counts[positions], 0) >= min_count
+        edges = np.nonzero(mutual)[0]
+
+        parents = {}
+
+        def find(node):
+            while parents.setdefault(node, node) != node:
+                parents[node] = parents[parents[node]]
+                node = parents[node]
+            return node
+
+        for edge in edges:
+            parents[find(int(self.rows[edge]))] = find(int(self.indices[edge]))
+
+        rings = {}
+        for edge in edges:
+            rings.setdefault(find(int(self.rows[edge])), []).append(edge)
+
+        result = []
+        for ring_edges in rings.values():
+            members = sorted(
+                {self.logins[self.rows[e]] for e in ring_edges}
+                | {self.logins[self.indices[e]] for e in ring_edges}
+            )
+            counts = self.counts[ring_edges]
+            means = self.means[ring_edges]
+            marked = ~np.isnan(means)
+            mean = (
+                float(np.average(means[marked], weights=counts[marked]))
+                if marked.any()
+                else float("nan")
+            )
+            result.append((members, int(counts.sum()), mean))
+
+        return sorted(result, key=lambda ring: ring[1], reverse=True)
+
+    def neighbors(self, login: str) -> np.ndarray:
+        """
+        Args:
+            login (str): The login of the user.
+
+        Returns:
+            np.ndarray: The indices of every user who evaluated or was evaluated by the user.
+
+        Raises:
+            Exception: If the user is not in the graph.
+        """
+        if login not in self.ids:
+            raise Exception(f"{login} is not in the graph")
+
+        id = self.ids[login]
+        evaluated = self.indices[self.indptr[id] : self.indptr[id + 1]]
+        evaluators = self.rows[self.indices == id]
+        neighbors = np.union1d(evaluated, evaluators)
+        return neighbors[neighbors != id]
+
+    def clustering(self, login: str) -> float:
+        """
+        Computes the local clustering coefficient of a user, ignoring edge directions:
+        the fraction of pairs of the user's evaluation partners that also evaluated each other.
+
+        Args:
+            login (str): The login of the user.
+
+        Returns:
+            float: The clustering coefficient, between 0 and 1.
+
+        Raises:
+            Exception: If the user is not in the graph.
+        """
+        neighbors = self.neighbors(login)
+        k = len(neighbors)
+        if k < 2:
+            return 0.0
+
+        inside = np.isin(self.rows, neighbors) & np.isin(self.indices, neighbors)
+        low = np.minimum(self.rows[inside], self.indices[inside]).astype(np.int64)
+        high = np.maximum(self.rows[inside], self.indices[inside])
+        links = len(np.unique(low * len(self.logins) + high))
+
+        return 2 * links / (k * (k - 1))
@@ -0,0 +1,243 @@
+import sys
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.evaluation_store import EvaluationStore
+
+
+class EvaluationRecords:
+    """
+    A compact in-memory representation of scale_teams, for holding the evaluations of a whole campus.
+
+    Each scale_team is one row of a NumPy structured array. Logins are interned
+    once in `logins` and referenced by int32 codes, and the corrected users of
+    every row are kept as compressed sparse rows: the corrected users of row `i`
+    are `corrected[corrected_indptr[i]:corrected_indptr[i + 1]]`. Missing IDs and
+    logins are -1, missing marks NaN and missing timestamps NaT. The raw payload
+    returned by the API is only kept if asked for.
+
+    Attributes:
+        DTYPE (np.dtype): The fields of each row.
+        rows (np.ndarray): One row per scale_team, of dtype DTYPE.
+        corrected_indptr (np.ndarray): The offsets of the corrected users of each row (int64, n + 1).
+        corrected (np.ndarray): The login code of each corrected user (int32).
+        corrected_ids (np.ndarray): The ID of each corrected user (int64).
+        logins (list[str]): The login of each code.
+        raw (list, optional): The scale_teams as returned by the API, None if they were not kept.
+    """
+
+    DTYPE = np.dtype(
+        [
+            ("id", np.int64),
+            ("scale_id", np.int64),
+            ("team_id", np.int64),
+            ("project_id", np.int64),
+            ("corrector_id", np.int64),
+            ("corrector", np.int32),
+            ("final_mark", np.float32),
+            ("flag_id", np.int64),
+            ("flag_positive", np.int8),
+            ("begin_at", "datetime64[ms]"),
+            ("filled_at", "datetime64[ms]"),
+            ("created_at", "datetime64[ms]"),
+            ("updated_at", "datetime64[ms]"),
+        ]
+    )
+
+    def __init__(
+        self,
+        rows: np.ndarray,
+        corrected_indptr: np.ndarray,
+        corrected: np.ndarray,
+        corrected_ids: np.ndarray,
+        logins: list[str],
+        raw: Optional[list] = None,
+    ):
+        """
+        Initializes a new instance of the EvaluationRecords class.
+
+        Args:
+            rows (np.ndarray): One row per scale_team, of dtype DTYPE.
+            corrected_indptr (np.ndarray): The offsets of the corrected users of each row.
+            corrected (np.ndarray): The login code of each corrected user.
+            corrected_ids (np.ndarray): The ID of each corrected user.
+            logins (list[str]): The login of each code.
+            raw (list, optional): The scale_teams as returned by the API. Defaults to None.
+        """
+        self.rows = rows
+        self.corrected_indptr = corrected_indptr
+        self.corrected = corrected
+        self.corrected_ids = corrected_ids
+        self.logins = logins
+        self.raw = raw
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def from_scale_teams(
+        cls, records: list, keep_raw: bool = False
+    ) -> "EvaluationRecords":
+        """
+        Parses scale_teams as returned by the API.
+
+        Args:
+            records (list): The scale_teams.
+            keep_raw (bool, optional): Whether to keep `records` as the raw payload. Defaults to False.
+
+        Returns:
+            EvaluationRecords: The parsed scale_teams.
+        """
+        return cls.from_table(
+            EvaluationStore.normalize(records), raw=records if keep_raw else None
+        )
+
+    @classmethod
+    def from_table(
+        cls, table: pa.Table, raw: Optional[list] = None
+    ) -> "EvaluationRecords":
+        """
+        Converts scale_teams normalized into the columns of EvaluationStore.SCHEMA.
+
+        Args:
+            table (pa.Table): The normalized scale_teams, e.g. from EvaluationStore.read_table.
+            raw (list, optional): The raw payload to keep along. Defaults to None.
+
+        Returns:
+            EvaluationRecords: The scale_teams.
+        """
+        rows = np.empty(table.num_rows, dtype=cls.DTYPE)
+        for name in cls.DTYPE.names:
+            if name in ("corrector", "final_mark", "flag_positive"):
+                continue
+            column = table.column(name)
+            if pa.types.is_timestamp(column.type):
+                rows[name] = column.cast(pa.timestamp("ms")).to_numpy(
+                    zero_copy_only=False
+                )
+            else:
+                rows[name] = column.fill_null(-1).to_numpy()
+
+        rows["final_mark"] = table.column("final_mark").to_numpy(zero_copy_only=False)
+        rows["flag_positive"] = (
+            pc.cast(table.column("flag_positive"), pa.int8()).fill_null(-1).to_numpy()
+        )
+
+        corrected_logins = table.column("corrected_logins").combine_chunks()
+        corrected_indptr = (
+            corrected_logins.offsets.to_numpy().astype(np.int64)
+            - corrected_logins.offsets[0].as_py()
+        )
+
+        codes, logins = pd.factorize(
+            np.concatenate(
+                [
+                    table.column("corrector_login").to_numpy(zero_copy_only=False),
+                    corrected_logins.flatten().to_numpy(zero_copy_only=False),
+                ]
+            )
+        )
+        rows["corrector"] = codes[: table.num_rows]
+
+        return cls(
+            rows,
+            corrected_indptr,
+            codes[table.num_rows :].astype(np.int32),
+            table.column("corrected_ids")
+            .combine_chunks()
+            .flatten()
+            .fill_null(-1)
+            .to_numpy(),
+            [sys.intern(login) for login in logins],
+            raw,
+        )
+
+    @classmethod
+    def concat(cls, parts: list["EvaluationRecords"]) -> "EvaluationRecords":
+        """
+        Concatenates records, merging their login tables.
+
+        Args:
+            parts (list[EvaluationRecords]): The records to concatenate.
+
+        Returns:
+            EvaluationRecords: The records of every part, in order. The raw payload is only
+                               kept if every part has one.
+        """
+        codes: dict[str, int] = {}
+        logins: list[str] = []
+        rows, corrected, indptrs = [], [], [np.zeros(1, dtype=np.int64)]
+        offset = 0
+
+        for part in parts:
+            # Maps the codes of the part to the merged table; the extra -1 slot keeps -1 as -1.
+            remap = np.empty(len(part.logins) + 1, dtype=np.int32)
+            remap[-1] = -1
+            for code, login in enumerate(part.logins):
+                if login not in codes:
+                    codes[login] = len(logins)
+                    logins.append(login)
+                remap[code] = codes[login]
+
+            part_rows = part.rows.copy()
+            part_rows["corrector"] = remap[part.rows["corrector"]]
+            rows.append(part_rows)
+            corrected.append(remap[part.corrected])
+            indptrs.append(part.corrected_indptr[1:] + offset)
+            offset += part.corrected_indptr[-1]
+
+        raw = None
+        if parts and all(part.raw is not None for part in parts):
+            raw = [record for part in parts for record in part.raw]
+
+        return cls(
+            np.concatenate(rows) if rows else np.empty(0, dtype=cls.DTYPE),
+            np.concatenate(indptrs),
+            np.concatenate(corrected) if corrected else np.empty(0, dtype=np.int32),
+            (
+                np.concatenate([part.corrected_ids for part in parts])
+                if parts
+                else np.empty(0, dtype=np.int64)
+            ),
+            logins,
+            raw,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns:
+            int: The approximate memory used by the records, without the raw payload.
+        """
+        return (
+            self.rows.nbytes
+            + self.corrected_indptr.nbytes
+            + self.corrected.nbytes
+            + self.corrected_ids.nbytes
+            + sum(sys.getsizeof(login) for login in self.logins)
+        )
+
+    def get_login(self, code: int) -> Optional[str]:
+        """
+        Args:
+            code (int): A login code.
+
+        Returns:
+            str: The login, None for -1.
+        """
+        return self.logins[code] if code >= 0 else None
+
+    def corrected_of(self, row: int) -> list[str]:
+        """
+        Args:
+            row (int): The index of a row.
+
+        Returns:
+            list[str]: The logins of the users corrected in the scale_team.
+        """
+        start, end = self.corrected_indptr[row], self.corrected_indptr[row + 1]
+        return [self.get_login(code) for code in self.corrected[start:end]]
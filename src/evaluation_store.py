@@ -0,0 +1,344 @@
+import os
+import threading
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from src.config import get_cache_dir
+
+# The store is created at startup, but only read by the modules working on evaluations,
+# so numpy, pandas and pyarrow are imported on first use.
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+    from src.evaluation_buckets import EvaluationBuckets
+
+
+class _Schema:
+    """
+    Builds EvaluationStore.SCHEMA on first access, then replaces itself with it.
+    """
+
+    def __get__(self, instance, owner) -> "pa.Schema":
+        import pyarrow as pa
+
+        owner.SCHEMA = pa.schema(
+            [
+                ("id", pa.int64()),
+                ("scale_id", pa.int64()),
+                ("team_id", pa.int64()),
+                ("project_id", pa.int64()),
+                ("corrector_id", pa.int64()),
+                ("corrector_login", pa.string()),
+                ("corrected_ids", pa.list_(pa.int64())),
+                ("corrected_logins", pa.list_(pa.string())),
+                ("final_mark", pa.float64()),
+                ("flag_id", pa.int64()),
+                ("flag_positive", pa.bool_()),
+                ("begin_at", pa.timestamp("ms", tz="UTC")),
+                ("filled_at", pa.timestamp("ms", tz="UTC")),
+                ("created_at", pa.timestamp("ms", tz="UTC")),
+                ("updated_at", pa.timestamp("ms", tz="UTC")),
+            ]
+        )
+        return owner.SCHEMA
+
+
+class EvaluationStore:
+    """
+    A local columnar store of scale_teams, kept as one Parquet file per (user, side).
+
+    Scale_teams are normalized into the typed columns of EvaluationStore.SCHEMA, so
+    reading them back is a column projection on a compact file instead of parsing
+    nested JSON. Each file also records a watermark in its metadata: the most recent
+    `updated_at` seen for the (user, side), which lets callers ask the API only for
+    records that changed since the last sync and merge them into what is stored.
+    Every merge also saves the monthly aggregates of the (user, side), see EvaluationBuckets.
+
+    Attributes:
+        SCHEMA (pa.Schema): The columns stored for each scale_team.
+        root (str): The directory the store is kept in.
+    """
+
+    SCHEMA = _Schema()
+
+    def __init__(self, root: Optional[str] = None):
+        """
+        Initializes a new instance of the EvaluationStore class.
+
+        Args:
+            root (str, optional): The directory of the store. Defaults to evaluations/ in the cache directory.
+        """
+        self.root = root or os.path.join(get_cache_dir(), "evaluations")
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(records: list) -> "pa.Table":
+        """
+        Extracts the typed columns of EvaluationStore.SCHEMA from raw scale_teams.
+
+        Args:
+            records (list): The scale_teams as returned by the API.
+
+        Returns:
+            pa.Table: One row per scale_team.
+        """
+        import pyarrow as pa
+
+        columns = {name: [] for name in EvaluationStore.SCHEMA.names}
+
+        for record in records:
+            corrector = record.get("corrector")
+            if not isinstance(corrector, dict):
+                corrector = {}
+            correcteds = [
+                c for c in record.get("correcteds") or [] if isinstance(c, dict)
+            ]
+            team = record.get("team") or {}
+            flag = record.get("flag") or {}
+
+            columns["id"].append(record["id"])
+            columns["scale_id"].append(record.get("scale_id"))
+            columns["team_id"].append(team.get("id"))
+            columns["project_id"].append(team.get("project_id"))
+            columns["corrector_id"].append(corrector.get("id"))
+            columns["corrector_login"].append(corrector.get("login"))
+            columns["corrected_ids"].append([c.get("id") for c in correcteds])
+            columns["corrected_logins"].append([c.get("login") for c in correcteds])
+            columns["final_mark"].append(record.get("final_mark"))
+            columns["flag_id"].append(flag.get("id"))
+            columns["flag_positive"].append(flag.get("positive"))
+            for name in ("begin_at", "filled_at", "created_at", "updated_at"):
+                columns[name].append(record.get(name))
+
+        arrays = []
+        for field in EvaluationStore.SCHEMA:
+            if pa.types.is_timestamp(field.type):
+                array = pa.array(columns[field.name], pa.string()).cast(field.type)
+            else:
+                array = pa.array(columns[field.name], field.type)
+            arrays.append(array)
+
+        return pa.Table.from_arrays(arrays, schema=EvaluationStore.SCHEMA)
+
+    def load_watermark(self, user_id: int, side: str) -> Optional[str]:
+        """
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+
+        Returns:
+            str: The most recent `updated_at` stored for the user, None if nothing is stored yet.
+        """
+        import pyarrow.parquet as pq
+
+        path = self.get_path(user_id, side)
+        if not os.path.exists(path):
+            return None
+
+        metadata = pq.read_schema(path).metadata or {}
+        watermark = metadata.get(b"watermark")
+        return watermark.decode() if watermark else None
+
+    def read(
+        self, user_id: int, side: str, columns: Optional[list[str]] = None
+    ) -> "pd.DataFrame":
+        """
+        Reads the stored evaluations of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            columns (list[str], optional): The columns to read. Defaults to all of them.
+
+        Returns:
+            pd.DataFrame: The stored evaluations, ordered by id.
+        """
+        return self.read_table(user_id, side, columns).to_pandas()
+
+    def read_table(
+        self, user_id: int, side: str, columns: Optional[list[str]] = None
+    ) -> "pa.Table":
+        """
+        Reads the stored evaluations of a user as an Arrow table.
+
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            columns (list[str], optional): The columns to read. Defaults to all of them.
+
+        Returns:
+            pa.Table: The stored evaluations, ordered by id.
+        """
+        import pyarrow.parquet as pq
+
+        path = self.get_path(user_id, side)
+        if not os.path.exists(path):
+            return self.SCHEMA.empty_table().select(columns or self.SCHEMA.names)
+        return pq.read_table(path, columns=columns, schema=self.SCHEMA)
+
+    def iter_batches(
+        self,
+        user_id: int,
+        side: str,
+        columns: Optional[list[str]] = None,
+        batch_size: int = 10_000,
+    ) -> Iterator["pd.DataFrame"]:
+        """
+        Reads the stored evaluations of a user in batches.
+
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            columns (list[str], optional): The columns to read. Defaults to all of them.
+            batch_size (int, optional): The maximum number of rows per batch. Defaults to 10000.
+
+        Yields:
+            pd.DataFrame: The stored evaluations, one batch at a time, ordered by id.
+        """
+        import pyarrow.parquet as pq
+
+        path = self.get_path(user_id, side)
+        if not os.path.exists(path):
+            return
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size, columns=columns):
+            yield batch.to_pandas()
+
+    def merge(self, user_id: int, side: str, records: list):
+        """
+        Merges freshly fetched evaluations into the store and advances the watermark.
+
+        Records are matched by id, so a record fetched again replaces its stored version.
+
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            records (list): The evaluations fetched from the API.
+        """
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with self._lock:
+            path = self.get_path(user_id, side)
+            watermark = self.load_watermark(user_id, side)
+            if not records and os.path.exists(path):
+                return
+
+            table = self.normalize(records)
+            if os.path.exists(path):
+                table = pa.concat_tables(
+                    [pq.read_table(path, schema=self.SCHEMA), table]
+                )
+
+            # Keep the last version of every id, ordered by id.
+            ids = table.column("id").to_numpy()
+            _, last = np.unique(ids[::-1], return_index=True)
+            table = table.take(len(ids) - 1 - last)
+
+            timestamps = [r["updated_at"] for r in records if r.get("updated_at")]
+            if timestamps:
+                watermark = max([watermark or "", *timestamps])
+            if watermark:
+                table = table.replace_schema_metadata({"watermark": watermark})
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, path)
+            self.write_buckets(user_id, side, table)
+
+    def read_buckets(self, user_id: int, side: str) -> "EvaluationBuckets":
+        """
+        Reads the monthly aggregates of the stored evaluations of a user.
+
+        They are written by every merge. Aggregates missing or older than the evaluations,
+        e.g. from before the store kept them, are computed again and saved.
+
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+
+        Returns:
+            EvaluationBuckets: The monthly aggregates.
+        """
+        import pyarrow.parquet as pq
+
+        from src.evaluation_buckets import EvaluationBuckets
+
+        path = self.get_path(user_id, side)
+        buckets_path = self.get_buckets_path(user_id, side)
+        if os.path.exists(buckets_path) and (
+            not os.path.exists(path)
+            or os.path.getmtime(buckets_path) >= os.path.getmtime(path)
+        ):
+            return EvaluationBuckets.from_arrow(pq.read_table(buckets_path))
+
+        with self._lock:
+            return self.write_buckets(user_id, side, self.read_table(user_id, side))
+
+    def write_buckets(
+        self, user_id: int, side: str, table: "pa.Table"
+    ) -> "EvaluationBuckets":
+        """
+        Computes and saves the monthly aggregates of the evaluations of a user.
+        Must be called with the lock held.
+
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            table (pa.Table): Every stored evaluation of the user.
+
+        Returns:
+            EvaluationBuckets: The monthly aggregates.
+        """
+        import pyarrow.parquet as pq
+
+        from src.evaluation_buckets import EvaluationBuckets
+
+        buckets = EvaluationBuckets.from_table(table)
+        path = self.get_buckets_path(user_id, side)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        pq.write_table(buckets.to_arrow(), tmp_path)
+        os.replace(tmp_path, path)
+        return buckets
+
+    def clear(self, user_id: int, side: str):
+        """
+        Removes the stored evaluations of a user, forcing a full sync next time.
+
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+        """
+        with self._lock:
+            for path in (
+                self.get_path(user_id, side),
+                self.get_buckets_path(user_id, side),
+            ):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def get_path(self, user_id: int, side: str) -> str:
+        """
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+
+        Returns:
+            str: The Parquet file of the (user, side).
+        """
+        return os.path.join(self.root, str(user_id), f"{side}.parquet")
+
+    def get_buckets_path(self, user_id: int, side: str) -> str:
+        """
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+
+        Returns:
+            str: The Parquet file of the monthly aggregates of the (user, side).
+        """
+        return os.path.join(self.root, str(user_id), f"{side}.buckets.parquet")
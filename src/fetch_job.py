@@ -0,0 +1,271 @@
+import contextvars
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+from requests_oauthlib import OAuth2Session
+
+from src.checkpoint import Checkpoint
+from src.config import get_api_url
+from src.tracer import Tracer
+from src.utils import Utils
+
+
+class CampusFetchJob:
+    """
+    Fetches the evaluations of every active user of a campus into Utils.evaluation_store,
+    checkpointing every page so that it can resume where it stopped.
+
+    The job first lists the users of the campus, then fetches both sides of the
+    evaluations of each active user, one task per (user, side). Each page is saved in
+    the checkpoint as soon as it arrives, and a task is merged into the evaluation store
+    once all its pages are in. Users that already are in the store only have the
+    evaluations updated since their last sync fetched, like `Utils.sync_evaluations`.
+
+    Running the job again after it was cancelled, crashed or lost its token skips the
+    finished tasks and the saved pages, whatever the number of workers it runs with.
+
+    Attributes:
+        USERS (str): The endpoint of the task listing the users of the campus.
+        SIDES (list[str]): The endpoints fetched for every active user.
+        api (OAuth2Session): The API client the pages are fetched with.
+        campus_id (int): The campus to fetch.
+        checkpoint (Checkpoint): Where the progress of the job is kept.
+        workers (int): The number of tasks run at the same time.
+        name (str): The name of the job in the checkpoint.
+        logs (logging.Logger): The logger used for logging failed tasks.
+    """
+
+    USERS = "campus_users"
+    SIDES = ["as_corrector", "as_corrected"]
+
+    def __init__(
+        self,
+        api: OAuth2Session,
+        campus_id: int,
+        checkpoint: Optional[Checkpoint] = None,
+        workers: int = 4,
+    ):
+        """
+        Initializes a new instance of the CampusFetchJob class.
+
+        Args:
+            api (OAuth2Session): The API client the pages are fetched with.
+            campus_id (int): The campus to fetch.
+            checkpoint (Checkpoint, optional): Where the progress of the job is kept. Defaults to a
+                                               Checkpoint in the cache directory.
+            workers (int, optional): The number of tasks run at the same time. Defaults to 4.
+        """
+        if Utils.evaluation_store is None:
+            raise Exception("fetching a campus needs the evaluation store")
+
+        self.api = api
+        self.campus_id = campus_id
+        self.checkpoint = checkpoint or Checkpoint()
+        self.workers = workers
+        self.name = f"campus-{campus_id}"
+        self.logs = logging.getLogger("logs")
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """
+        Stops the job after the pages in flight, e.g. from a signal handler. They are
+        saved, so running the job again resumes from there.
+        """
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        Returns:
+            bool: Whether `cancel` was called.
+        """
+        return self._cancelled.is_set()
+
+    def get_url(self, user_id: int, endpoint: str) -> str:
+        """
+        Args:
+            user_id (int): The user of the task, unused for USERS.
+            endpoint (str): The endpoint of the task.
+
+        Returns:
+            str: The URL of the paginated endpoint.
+        """
+        if endpoint == self.USERS:
+            return f"{get_api_url()}/v2/campus/{self.campus_id}/users"
+        return Utils.get_evaluations_url(user_id, endpoint)
+
+    def get_params(self, user_id: int, endpoint: str) -> dict:
+        """
+        Args:
+            user_id (int): The user of the task, unused for USERS.
+            endpoint (str): The endpoint of the task.
+
+        Returns:
+            dict: The parameters of every page. Pages are sorted by ID, which does not
+                  change when a record is updated, so they do not shift between a run and
+                  the one resuming it.
+        """
+        if endpoint == self.USERS:
+            return {"sort": "id"}
+        return {**Utils.get_sync_params(user_id, endpoint), "sort": "id"}
+
+    def fetch_task(self, user_id: int, endpoint: str) -> bool:
+        """
+        Fetches the pages of a task that are not saved yet, saving each one as it arrives.
+
+        Args:
+            user_id (int): The user of the task.
+            endpoint (str): The endpoint of the task.
+
+        Returns:
+            bool: True once every page is saved, False if the job was cancelled before.
+        """
+        url = self.get_url(user_id, endpoint)
+        params = self.checkpoint.get_params(self.name, user_id, endpoint)
+        if params is None:
+            # Saved before the first page, so a resumed task keeps the watermark it started
+            # with even if the store was synced in between.
+            params = self.get_params(user_id, endpoint)
+            self.checkpoint.set_params(self.name, user_id, endpoint, params)
+        params = {**params, "per_page": Utils.PER_PAGE}
+        pages = self.checkpoint.get_page_count(self.name, user_id, endpoint)
+        saved = self.checkpoint.get_saved_pages(self.name, user_id, endpoint)
+
+        page = 1
+        while pages is None or page <= pages:
+            if page in saved:
+                page += 1
+                continue
+            if self.cancelled:
+                return False
+
+            response = Utils.make_request_with_backoff(
+                self.api, url, params={**params, "page": page}
+            )
+            response.raise_for_status()
+            records = response.json()
+            if page == 1:
+                pages = Utils.get_page_count(response)
+                if pages is not None:
+                    self.checkpoint.set_page_count(self.name, user_id, endpoint, pages)
+            if not records:
+                # Without pagination headers, pages are walked until an empty one.
+                break
+            self.checkpoint.save_page(self.name, user_id, endpoint, page, records)
+            page += 1
+
+        return True
+
+    def finish_task(self, user_id: int, endpoint: str):
+        """
+        Stores the records of a task whose pages are all saved, and marks it as finished.
+
+        The users of the campus are added to Utils.user_index, and a task is planned for
+        each side of every active user. Evaluations are merged into Utils.evaluation_store.
+        Both are idempotent, so a task stored again after a crash gives the same result.
+
+        Args:
+            user_id (int): The user of the task.
+            endpoint (str): The endpoint of the task.
+        """
+        records = self.checkpoint.load_records(self.name, user_id, endpoint)
+        if endpoint == self.USERS:
+            if Utils.user_index is not None:
+                Utils.user_index.add(records)
+            self.checkpoint.add_tasks(
+                self.name,
+                [
+                    (user["id"], side)
+                    for user in records
+                    if user.get("active?", False)
+                    for side in self.SIDES
+                ],
+            )
+        else:
+            with Utils.phase("build"):
+                Utils.evaluation_store.merge(user_id, endpoint, records)
+        self.checkpoint.finish_task(self.name, user_id, endpoint)
+
+    def run_task(self, user_id: int, endpoint: str) -> bool:
+        """
+        Args:
+            user_id (int): The user of the task.
+            endpoint (str): The endpoint of the task.
+
+        Returns:
+            bool: Whether the task was finished, False if the job was cancelled before.
+        """
+        with Tracer.module(type(self).__name__):
+            with Utils.phase("fetch"):
+                fetched = self.fetch_task(user_id, endpoint)
+            if fetched:
+                self.finish_task(user_id, endpoint)
+            return fetched
+
+    def run(
+        self, progress: Optional[Callable[[int, int], None]] = None
+    ) -> tuple[int, int]:
+        """
+        Runs the tasks of the job that are not finished, `workers` at a time.
+
+        A task that fails is logged, recorded in the checkpoint and left for the next run.
+        At most `2 * workers` tasks are queued at a time, so cancelling does not have to
+        drain a long queue.
+
+        Args:
+            progress (Callable[[int, int], None], optional): Called with the number of finished
+                                                             tasks and the number of tasks every
+                                                             time a task finishes. Defaults to None.
+
+        Returns:
+            tuple[int, int]: The number of tasks finished and failed during this run.
+        """
+        finished, failed = 0, 0
+        pending: dict[Future, tuple[int, str]] = {}
+
+        def collect(done: set):
+            nonlocal finished, failed
+            for future in done:
+                user_id, endpoint = pending.pop(future)
+                try:
+                    if future.result():
+                        finished += 1
+                except Exception as e:
+                    failed += 1
+                    self.checkpoint.fail_task(self.name, user_id, endpoint, str(e))
+                    self.logs.warning(
+                        f"{self.name}: {endpoint} of user {user_id} failed: {e}"
+                    )
+                if progress is not None:
+                    progress(*self.checkpoint.get_progress(self.name))
+
+        self.checkpoint.add_tasks(self.name, [(0, self.USERS)])
+        if not self.checkpoint.is_done(self.name, 0, self.USERS):
+            # The other tasks are only known once the users are listed.
+            if not self.run_task(0, self.USERS):
+                return finished, failed
+            finished += 1
+
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="job") as executor:
+            try:
+                for task in self.checkpoint.get_tasks(self.name):
+                    if self.cancelled:
+                        break
+                    future = executor.submit(context.copy().run, self.run_task, *task)
+                    pending[future] = task
+                    if len(pending) >= 2 * self.workers:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            except BaseException:
+                # e.g. KeyboardInterrupt: let the tasks in flight save their page and stop.
+                self.cancel()
+                raise
+
+        return finished, failed
@@ -1,12 +1,65 @@
 import logging
+import os
+from typing import Optional
 
 from src.InterfaceResult import InterfaceResult
+from src.session_data import SessionData
+from src.utils import prompt
 
 
 class BaseModule:
-    def __init__(self, api):
+    """
+    The base class of every module of the interface.
+
+    Modules are discovered by src.modules.registry without being imported, so TITLE,
+    COMMAND and POSITION must be assigned literal values in the class body.
+
+    Attributes:
+        FIELDS (list[str]): The fields of the dict returned by `compute`, in output order.
+                            Modules that cannot run without user interaction leave it empty.
+        TITLE (str, optional): The label of the module in the main menu. None keeps it out of the menu.
+        COMMAND (str, optional): The name of its batch subcommand. None if it has no batch mode.
+        POSITION (int): The place of the module in the main menu, lowest first.
+        data (SessionData): Where the module gets its data from. Modules given the same
+                            SessionData share what it fetched.
+    """
+
+    FIELDS: list[str] = []
+    TITLE: Optional[str] = None
+    COMMAND: Optional[str] = None
+    POSITION: int = 100
+
+    def __init__(self, api, data: Optional[SessionData] = None):
         self.api = api
+        self.data = data if data is not None else SessionData(api)
         self.logs = logging.getLogger("logs")
 
+    def prompt_login(self, message: str = "login: ") -> str:
+        """
+        Prompts for a login, and starts prefetching its data if the prefetcher is enabled.
+
+        Args:
+            message (str, optional): The message to display. Defaults to "login: ".
+
+        Returns:
+            str: The login entered, or STATS_LOGIN if nothing was entered.
+        """
+        login = prompt(message).strip() or os.getenv("STATS_LOGIN", "")
+        self.data.prefetch(login)
+        return login
+
+    def compute(self, login: str, spinner=None) -> dict:
+        """
+        Computes the result of the module for a login, without any user interaction.
+
+        Args:
+            login (str): The login of the user.
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+
+        Returns:
+            dict: The result, with the keys listed in FIELDS.
+        """
+        raise NotImplementedError
+
     def run(self) -> InterfaceResult.Success:
         raise NotImplementedError
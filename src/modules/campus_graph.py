@@ -0,0 +1,222 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from src.InterfaceResult import InterfaceResult
+from src.Spinner import Spinner
+from src.config import get_cache_dir, get_env_flag, get_env_int
+from src.evaluation_graph import EvaluationGraph
+from src.evaluation_records import EvaluationRecords
+from src.modules.base import BaseModule
+from src.utils import Utils, clear_terminal, prompt, prompt_select
+
+
+class CampusGraph(BaseModule):
+    """
+    A module that analyzes the evaluation network of a whole campus.
+
+    The scale_teams of every active user of the campus are pulled once into an
+    EvaluationGraph, which is saved in the cache directory and memory-mapped on
+    the next runs, so queries do not need to refetch anything.
+
+    Attributes:
+        QUERIES (list[str]): The queries offered in the menu.
+
+    Methods:
+        build_graph: Fetches the evaluations of a campus and builds its graph.
+        build_graph_async: Does the same with an AsyncIntraClient.
+        run: Prompts for a campus and answers queries on its graph.
+    """
+
+    TITLE = "campus evaluation graph"
+    POSITION = 40
+
+    QUERIES = [
+        "top pairs",
+        "reciprocity",
+        "mutual evaluation rings",
+        "clustering of a login",
+        "go back",
+    ]
+
+    @staticmethod
+    def get_graph_path(campus_id: int) -> str:
+        """
+        Args:
+            campus_id (int): The ID of the campus.
+
+        Returns:
+            str: The directory the graph of the campus is saved to.
+        """
+        return os.path.join(get_cache_dir(), "graphs", f"campus_{campus_id}")
+
+    def build_graph(
+        self, campus_id: int, spinner: Optional[Spinner] = None
+    ) -> EvaluationGraph:
+        """
+        Fetches the evaluations given by every active user of a campus and builds the graph.
+
+        With API_ASYNC set, the users are fetched concurrently by an AsyncIntraClient
+        instead of a thread pool.
+
+        Args:
+            campus_id (int): The ID of the campus.
+            spinner (Spinner, optional): The Spinner object for displaying progress. Defaults to None.
+
+        Returns:
+            EvaluationGraph: The graph of the campus.
+        """
+        if get_env_flag("API_ASYNC"):
+            return asyncio.run(self.build_graph_async(campus_id, spinner))
+
+        users = Utils.get_campus_users(self.api, campus_id)
+
+        def fetch(user: dict) -> EvaluationRecords:
+            return Utils.get_evaluation_records(
+                self.api, user["id"], "as_corrector", spinner=spinner
+            )
+
+        evaluations = []
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(Utils.PAGE_WORKERS) as executor:
+            results = executor.map(lambda user: context.copy().run(fetch, user), users)
+            for done, records in enumerate(results, start=1):
+                evaluations.append(records)
+                if spinner is not None:
+                    spinner.status_message(f"{done}/{len(users)} users")
+
+        return self.make_graph(evaluations)
+
+    async def build_graph_async(
+        self, campus_id: int, spinner: Optional[Spinner] = None
+    ) -> EvaluationGraph:
+        """
+        Like `build_graph`, but fetches every user at the same time on one event loop.
+
+        Args:
+            campus_id (int): The ID of the campus.
+            spinner (Spinner, optional): The Spinner object for displaying progress. Defaults to None.
+
+        Returns:
+            EvaluationGraph: The graph of the campus.
+        """
+        # aiohttp is only needed with API_ASYNC set.
+        from src.async_client import AsyncIntraClient
+
+        async with AsyncIntraClient.from_session(
+            self.api, max_connections=get_env_int("API_ASYNC_CONNECTIONS", 100)
+        ) as client:
+            users = await client.get_campus_users(campus_id)
+
+            async def fetch(user: dict) -> EvaluationRecords:
+                return await client.get_evaluation_records(
+                    user["id"], "as_corrector", spinner=spinner
+                )
+
+            evaluations = []
+            tasks = [asyncio.ensure_future(fetch(user)) for user in users]
+            for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+                evaluations.append(await task)
+                if spinner is not None:
+                    spinner.status_message(f"{done}/{len(users)} users")
+
+        return self.make_graph(evaluations)
+
+    @staticmethod
+    def make_graph(evaluations: list[EvaluationRecords]) -> EvaluationGraph:
+        """
+        Args:
+            evaluations (list[EvaluationRecords]): The evaluations of each user.
+
+        Returns:
+            EvaluationGraph: The graph of all evaluations.
+        """
+        with Utils.phase("aggregate"):
+            return EvaluationGraph.from_records(EvaluationRecords.concat(evaluations))
+
+    def format_top_pairs(self, graph: EvaluationGraph) -> str:
+        lines = [
+            f"{'login a':<15} {'login b':<15} {'a -> b':>7} {'b -> a':>7} {'avg a -> b':>11} {'avg b -> a':>11}",
+            "-" * 71,
+        ]
+        for a, b, a_to_b, b_to_a, mean_a, mean_b in graph.top_pairs(20):
+            lines.append(
+                f"{a:<15} {b:<15} {a_to_b:>7} {b_to_a:>7} {mean_a:>11.2f} {mean_b:>11.2f}"
+            )
+        return "\n".join(lines)
+
+    def format_rings(self, graph: EvaluationGraph) -> str:
+        rings = graph.mutual_rings()
+        if not rings:
+            return "No users evaluated each other at least 3 times in both directions."
+
+        lines = [f"{'evaluations':>11} {'average':>8}  logins", "-" * 71]
+        for logins, count, mean in rings[:20]:
+            lines.append(f"{count:>11} {mean:>8.2f}  {', '.join(logins)}")
+        return "\n".join(lines)
+
+    def answer(self, graph: EvaluationGraph, query: str) -> str:
+        """
+        Answers a query on the graph.
+
+        Args:
+            graph (EvaluationGraph): The graph of the campus.
+            query (str): One of CampusGraph.QUERIES.
+
+        Returns:
+            str: The formatted answer.
+        """
+        if query == "top pairs":
+            return self.format_top_pairs(graph)
+        if query == "reciprocity":
+            return f"{graph.reciprocity() * 100:.2f}% of evaluations were returned at least once"
+        if query == "mutual evaluation rings":
+            return self.format_rings(graph)
+
+        login = prompt("login: ")
+        neighbors = graph.neighbors(login)
+        return (
+            f"{login} evaluated with {len(neighbors)} different users, "
+            f"{graph.clustering(login) * 100:.2f}% of whom also evaluated each other"
+        )
+
+    def run(self) -> InterfaceResult:
+        """
+        Prompts for a campus, loads or builds its graph, and answers queries until the user goes back.
+
+        Returns:
+            InterfaceResult: `InterfaceResult.Skip` once the user goes back.
+        """
+        campus_id = prompt("campus id: ")
+        if not campus_id.isdigit():
+            raise Exception(f"invalid campus id: {campus_id}")
+
+        path = self.get_graph_path(int(campus_id))
+        if EvaluationGraph.exists(path) and (
+            prompt_select(["use saved graph", "rebuild graph"]) == "use saved graph"
+        ):
+            graph = EvaluationGraph.load(path)
+        else:
+            with Spinner(f"Fetching evaluations of campus {campus_id}") as spinner:
+                graph = self.build_graph(int(campus_id), spinner)
+                graph.save(path)
+
+        clear_terminal()
+        while True:
+            print(
+                f"Campus {campus_id}: {len(graph.logins)} users, {len(graph.indices)} pairs\n"
+            )
+            query = prompt_select(self.QUERIES)
+            if query == "go back":
+                return InterfaceResult.Skip
+
+            try:
+                with Utils.phase("render"):
+                    answer = self.answer(graph, query)
+            except Exception as e:
+                answer = f"error: {e}"
+
+            clear_terminal()
+            print(f"{answer}\n")
@@ -0,0 +1,345 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+
+import pandas as pd
+
+from src.InterfaceResult import InterfaceResult
+from src.Spinner import Spinner
+from src.config import get_cache_dir
+from src.modules.base import BaseModule
+from src.modules.evaluator_score import EvaluatorScore
+from src.modules.odds_of_failing import OddsOfFailing
+from src.session_data import SessionData
+from src.sharded_aggregator import ShardedAggregator
+from src.utils import Utils, clear_terminal, prompt, prompt_select
+
+
+class CampusLeaderboard(BaseModule):
+    """
+    A module that ranks every active user of a campus by evaluator score, odds of failing
+    and number of evaluations given.
+
+    The users are computed in parallel, each with the same code as EvaluatorScore and
+    OddsOfFailing. The result table is saved in the cache directory, so rankings are
+    served from it without touching the API. Refreshing it recomputes every user, but
+    with Utils.evaluation_store set only the evaluations that changed since the last
+    build are fetched, and the statistics of every user are computed at once from the
+    store on all cores, see ShardedAggregator.
+
+    Attributes:
+        COLUMNS (list[str]): The columns of the result table.
+        RANKINGS (dict[str, tuple[str, bool]]): The column each ranking sorts by, and whether it sorts ascending.
+        MIN_EVALUATIONS (int): The number of evaluations a user needs to appear in an average-based ranking.
+
+    Methods:
+        compute: Computes the leaderboard row of a user.
+        build_table: Computes the rows of every active user of a campus.
+        aggregate: Computes the rows of users from the evaluation store.
+        run: Prompts for a campus and shows its rankings.
+    """
+
+    FIELDS = [
+        "evaluations_given",
+        "average_score",
+        "score_stddev",
+        "evaluations_received",
+        "odds_of_failing",
+    ]
+    COLUMNS = ["user_id", "login", *FIELDS]
+    RANKINGS = {
+        "evaluator score": ("average_score", False),
+        "odds of failing": ("odds_of_failing", True),
+        "evaluation volume": ("evaluations_given", False),
+    }
+    MIN_EVALUATIONS = 5
+    TITLE = "campus leaderboard"
+    POSITION = 50
+
+    def __init__(self, api, data: Optional[SessionData] = None):
+        super().__init__(api, data)
+        # A build goes through every user of the campus: kept in the session, they would
+        # only evict the data of the logins looked up interactively.
+        campus_data = SessionData(api, max_bytes=0)
+        self.evaluator_score = EvaluatorScore(api, campus_data)
+        self.odds_of_failing = OddsOfFailing(api, campus_data)
+
+    @staticmethod
+    def get_table_path(campus_id: int) -> str:
+        """
+        Args:
+            campus_id (int): The ID of the campus.
+
+        Returns:
+            str: The file the leaderboard of the campus is saved to.
+        """
+        return os.path.join(
+            get_cache_dir(), "leaderboards", f"campus_{campus_id}.parquet"
+        )
+
+    def compute(self, login: str, spinner: Optional[Spinner] = None) -> dict:
+        """
+        Computes the leaderboard row of a user.
+
+        Args:
+            login (str): The login of the user.
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+
+        Returns:
+            dict: The evaluator score and the odds of failing of the user, with the number
+                  of marked evaluations each is based on.
+        """
+        given = self.evaluator_score.compute(login, spinner)
+        received = self.odds_of_failing.compute(login, spinner)
+        return {
+            "evaluations_given": given["evaluations"],
+            "average_score": given["average_score"],
+            "score_stddev": given["score_stddev"],
+            "evaluations_received": received["evaluations"],
+            "odds_of_failing": received["odds_of_failing"],
+        }
+
+    def build_table(
+        self,
+        campus_id: int,
+        previous: Optional[pd.DataFrame] = None,
+        spinner: Optional[Spinner] = None,
+    ) -> pd.DataFrame:
+        """
+        Computes the rows of every active user of a campus.
+
+        Users are fetched and aggregated by a pool of Utils.PAGE_WORKERS threads. A user
+        whose row cannot be computed keeps its row from `previous`, if there is one.
+
+        Args:
+            campus_id (int): The ID of the campus.
+            previous (pd.DataFrame, optional): The table of the last build. Defaults to None.
+            spinner (Spinner, optional): The Spinner object for displaying progress. Defaults to None.
+
+        Returns:
+            pd.DataFrame: One row per active user, with the columns of CampusLeaderboard.COLUMNS.
+        """
+        users = Utils.get_campus_users(self.api, campus_id)
+        previous_rows = {}
+        if previous is not None:
+            previous_rows = {row["user_id"]: row for row in previous.to_dict("records")}
+
+        if Utils.evaluation_store is not None:
+            return self.build_table_from_store(users, previous_rows, spinner)
+
+        rows, failed = [], 0
+        with ThreadPoolExecutor(Utils.PAGE_WORKERS) as executor:
+            context = contextvars.copy_context()
+            futures = {
+                executor.submit(context.copy().run, self.compute, user["login"]): user
+                for user in users
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                user = futures[future]
+                try:
+                    rows.append(
+                        {
+                            "user_id": user["id"],
+                            "login": user["login"],
+                            **future.result(),
+                        }
+                    )
+                except Exception as e:
+                    self.logs.warning(f"Failed to compute {user['login']}: {e}")
+                    failed += 1
+                    if user["id"] in previous_rows:
+                        rows.append(previous_rows[user["id"]])
+                if spinner is not None:
+                    spinner.status_message(
+                        f"{done}/{len(users)} users, {failed} failed"
+                    )
+
+        return pd.DataFrame(rows, columns=self.COLUMNS)
+
+    def build_table_from_store(
+        self,
+        users: list,
+        previous_rows: dict,
+        spinner: Optional[Spinner] = None,
+    ) -> pd.DataFrame:
+        """
+        Like `build_table`, but syncs the evaluations of every user into Utils.evaluation_store
+        first, then computes all rows at once with `aggregate`.
+
+        Args:
+            users (list): The active users of the campus.
+            previous_rows (dict): The rows of the last build, by user ID.
+            spinner (Spinner, optional): The Spinner object for displaying progress. Defaults to None.
+
+        Returns:
+            pd.DataFrame: One row per active user, with the columns of CampusLeaderboard.COLUMNS.
+        """
+
+        def sync(user: dict):
+            with Utils.phase("fetch"):
+                for side in ("as_corrector", "as_corrected"):
+                    Utils.sync_evaluations(self.api, user["id"], side)
+
+        synced, kept, failed = [], [], 0
+        with ThreadPoolExecutor(Utils.PAGE_WORKERS) as executor:
+            context = contextvars.copy_context()
+            futures = {
+                executor.submit(context.copy().run, sync, user): user for user in users
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                user = futures[future]
+                try:
+                    future.result()
+                    synced.append(user)
+                except Exception as e:
+                    self.logs.warning(f"Failed to compute {user['login']}: {e}")
+                    failed += 1
+                    if user["id"] in previous_rows:
+                        kept.append(previous_rows[user["id"]])
+                if spinner is not None:
+                    spinner.status_message(
+                        f"{done}/{len(users)} users, {failed} failed"
+                    )
+
+        with Utils.phase("aggregate"):
+            table = self.aggregate([user["id"] for user in synced])
+        table.insert(0, "login", [user["login"] for user in synced])
+        table = table.reset_index()
+        if kept:
+            table = pd.concat([table, pd.DataFrame(kept)], ignore_index=True)
+        return table[self.COLUMNS]
+
+    def aggregate(self, user_ids: list[int]) -> pd.DataFrame:
+        """
+        Computes the rows of users from their evaluations in Utils.evaluation_store, with the
+        same statistics as EvaluatorScore and OddsOfFailing, in a ShardedAggregator.
+
+        Args:
+            user_ids (list[int]): The IDs of the users.
+
+        Returns:
+            pd.DataFrame: The FIELDS of every user, indexed by user ID in the order of `user_ids`.
+        """
+        aggregator = ShardedAggregator()
+        store = Utils.evaluation_store
+        given = aggregator.moments(
+            [
+                (user_id, store.get_path(user_id, "as_corrector"))
+                for user_id in user_ids
+            ],
+            "final_mark",
+        )
+        received = aggregator.moments(
+            [
+                (user_id, store.get_path(user_id, "as_corrected"))
+                for user_id in user_ids
+            ],
+            "final_mark",
+            upper=100,
+        )
+
+        index = pd.Index(user_ids, name="user_id")
+        given = given.reindex(index)
+        received = received.reindex(index)
+        return pd.DataFrame(
+            {
+                "evaluations_given": given["count"].fillna(0).astype(int),
+                "average_score": given["mean"].round(2),
+                "score_stddev": given["std"].round(2),
+                "evaluations_received": received["count"].fillna(0).astype(int),
+                "odds_of_failing": (100 - received["mean"]).round(2),
+            },
+            index=index,
+        )
+
+    def load_table(self, campus_id: int) -> Optional[pd.DataFrame]:
+        """
+        Args:
+            campus_id (int): The ID of the campus.
+
+        Returns:
+            pd.DataFrame: The saved leaderboard of the campus, None if it was never built.
+        """
+        path = self.get_table_path(campus_id)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def save_table(self, campus_id: int, table: pd.DataFrame):
+        """
+        Saves the leaderboard of a campus.
+
+        Args:
+            campus_id (int): The ID of the campus.
+            table (pd.DataFrame): The leaderboard.
+        """
+        path = self.get_table_path(campus_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        table.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def rank(self, table: pd.DataFrame, ranking: str, top_n: int = 20) -> pd.DataFrame:
+        """
+        Sorts the leaderboard by one of the rankings.
+
+        Args:
+            table (pd.DataFrame): The leaderboard.
+            ranking (str): One of CampusLeaderboard.RANKINGS.
+            top_n (int, optional): The number of users to return. Defaults to 20.
+
+        Returns:
+            pd.DataFrame: The top users, with their rank as index.
+        """
+        column, ascending = self.RANKINGS[ranking]
+        if column == "average_score":
+            table = table[table["evaluations_given"] >= self.MIN_EVALUATIONS]
+        elif column == "odds_of_failing":
+            table = table[table["evaluations_received"] >= self.MIN_EVALUATIONS]
+
+        ranked = table.dropna(subset=[column]).sort_values(
+            [column, "login"], ascending=[ascending, True], kind="stable"
+        )
+        ranked.index = range(1, len(ranked) + 1)
+        return ranked.head(top_n)
+
+    def format_ranking(self, table: pd.DataFrame, ranking: str) -> str:
+        column, _ = self.RANKINGS[ranking]
+        lines = [f"{'rank':>4}  {'login':<15} {ranking:>20}", "-" * 41]
+        for rank, row in self.rank(table, ranking).iterrows():
+            lines.append(f"{rank:>4}  {row['login']:<15} {row[column]:>20g}")
+        return "\n".join(lines)
+
+    def run(self) -> InterfaceResult:
+        """
+        Prompts for a campus, loads or builds its leaderboard, and shows rankings until the user goes back.
+
+        Returns:
+            InterfaceResult: `InterfaceResult.Skip` once the user goes back.
+        """
+        campus_id = prompt("campus id: ")
+        if not campus_id.isdigit():
+            raise Exception(f"invalid campus id: {campus_id}")
+        campus_id = int(campus_id)
+
+        table = self.load_table(campus_id)
+        options = [*self.RANKINGS, "refresh", "go back"]
+        clear_terminal()
+        while True:
+            query = "refresh" if table is None else prompt_select(options)
+            if query == "refresh":
+                with Spinner(
+                    f"Computing the leaderboard of campus {campus_id}"
+                ) as spinner:
+                    table = self.build_table(campus_id, table, spinner)
+                    self.save_table(campus_id, table)
+                clear_terminal()
+                print(f"Campus {campus_id}: {len(table)} users\n")
+                continue
+            if query == "go back":
+                return InterfaceResult.Skip
+
+            clear_terminal()
+            with Utils.phase("render"):
+                print(f"{self.format_ranking(table, query)}\n")
@@ -0,0 +1,157 @@
+from typing import Optional
+
+import pandas as pd
+
+from src.InterfaceResult import InterfaceResult
+from src.Spinner import Spinner
+from src.evaluation_buckets import EvaluationBuckets
+from src.modules.base import BaseModule
+from src.utils import Utils, clear_terminal
+
+
+class EvaluationTrends(BaseModule):
+    """
+    A module that shows how the evaluations of a user evolve over time: per month, how many
+    they gave and received, how severe they were as an evaluator, and the trend of the
+    marks on both sides.
+
+    Everything is computed from the monthly aggregates of EvaluationBuckets, kept by the
+    evaluation store, so looking at any window of months does not go back to the evaluations.
+
+    Attributes:
+        RECENT_MONTHS (int): The months, up to the current one, of the recent statistics.
+        ROLLING_MONTHS (int): The months of the rolling mean shown for every month.
+        DISPLAY_MONTHS (int): The number of months shown by `run`.
+
+    Methods:
+        compute: Computes the activity, recent severity and trends of a user.
+        run: Prompts for a login and shows their evaluations month by month.
+    """
+
+    FIELDS = [
+        "evaluations_given",
+        "evaluations_per_month",
+        "recent_given_mean",
+        "recent_given_failure_rate",
+        "given_trend",
+        "received_trend",
+    ]
+    TITLE = "evaluation trends"
+    COMMAND = "evaluation-trends"
+    POSITION = 35
+    RECENT_MONTHS = 6
+    ROLLING_MONTHS = 3
+    DISPLAY_MONTHS = 24
+
+    def get_buckets(
+        self, login: str, spinner: Optional[Spinner] = None
+    ) -> tuple[EvaluationBuckets, EvaluationBuckets]:
+        """
+        Args:
+            login (str): The login of the user.
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+
+        Returns:
+            tuple[EvaluationBuckets, EvaluationBuckets]: The monthly aggregates of the
+                                                         evaluations given and received.
+        """
+        user_id = self.data.get_user_id(login)
+        return (
+            self.data.get_evaluation_buckets(user_id, "as_corrector", spinner),
+            self.data.get_evaluation_buckets(user_id, "as_corrected", spinner),
+        )
+
+    def compute(self, login: str, spinner: Optional[Spinner] = None) -> dict:
+        """
+        Computes the activity, recent severity and trends of a user.
+
+        Args:
+            login (str): The login of the user.
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+
+        Returns:
+            dict: The number of evaluations given and their average per month since the first,
+                  the mean mark given and the share of failing marks given (as a percentage)
+                  over the last RECENT_MONTHS months, and the trends of the marks given and
+                  received, in points per month.
+        """
+        given, received = self.get_buckets(login, spinner)
+
+        with Utils.phase("aggregate"):
+            total = given.window()
+            recent = given.last(self.RECENT_MONTHS)
+            months = len(given.frame)
+            return {
+                "evaluations_given": int(total["evaluations"]),
+                "evaluations_per_month": (
+                    round(total["evaluations"] / months, 2) if months else 0.0
+                ),
+                "recent_given_mean": round(recent["mean"], 2),
+                "recent_given_failure_rate": round(recent["failure_rate"] * 100, 2),
+                "given_trend": round(given.trend(), 2),
+                "received_trend": round(received.trend(), 2),
+            }
+
+    def format_months(
+        self, given: EvaluationBuckets, received: EvaluationBuckets
+    ) -> str:
+        """
+        Args:
+            given (EvaluationBuckets): The monthly aggregates of the evaluations given.
+            received (EvaluationBuckets): The monthly aggregates of the evaluations received.
+
+        Returns:
+            str: A table of the last DISPLAY_MONTHS months, and the trends of both sides.
+        """
+        months = given.frame.index.union(received.frame.index)[-self.DISPLAY_MONTHS :]
+        given_months = given.monthly().reindex(months)
+        received_months = received.monthly().reindex(months)
+        rolling = given.rolling(self.ROLLING_MONTHS).reindex(months)
+
+        def number(value: float, format: str) -> str:
+            return "-" if pd.isna(value) else f"{value:{format}}"
+
+        lines = [
+            f"{'month':<8} {'given':>6} {'avg given':>10} {'failed':>7} "
+            f"{'received':>9} {'avg received':>13} {f'{self.ROLLING_MONTHS}-month avg given':>20}",
+            "-" * 79,
+        ]
+        for month in months:
+            lines.append(
+                f"{month:%Y-%m}  "
+                f"{number(given_months.at[month, 'evaluations'], '.0f'):>6} "
+                f"{number(given_months.at[month, 'mean'], '.2f'):>10} "
+                f"{number(given_months.at[month, 'failure_rate'], '.0%'):>7} "
+                f"{number(received_months.at[month, 'evaluations'], '.0f'):>9} "
+                f"{number(received_months.at[month, 'mean'], '.2f'):>13} "
+                f"{number(rolling.at[month, 'mean'], '.2f'):>20}"
+            )
+
+        lines += [
+            "",
+            f"marks given:    {number(given.trend(), '+.2f')} points per month",
+            f"marks received: {number(received.trend(), '+.2f')} points per month",
+        ]
+        return "\n".join(lines)
+
+    def run(self) -> InterfaceResult:
+        """
+        Prompts for a login and shows their evaluations month by month.
+
+        Returns:
+            InterfaceResult: `InterfaceResult.Success` once the result is shown.
+        """
+        login = self.prompt_login()
+
+        with Spinner(f"Fetching evaluations involving {login}") as spinner:
+            try:
+                given, received = self.get_buckets(login, spinner)
+                with Utils.phase("render"):
+                    return_message = self.format_months(given, received)
+            except Exception as e:
+                return_message = f"error: {e}"
+
+        clear_terminal()
+        print(f"\r{return_message}\n")
+
+        return InterfaceResult.Success
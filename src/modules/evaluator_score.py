@@ -1,7 +1,10 @@
+from typing import Optional
+
 from src.Spinner import Spinner
+from src.aggregators import RunningStats
 from src.InterfaceResult import InterfaceResult
 from src.modules.base import BaseModule
-from src.utils import Utils, clear_terminal, prompt
+from src.utils import Utils, clear_terminal
 
 
 class EvaluatorScore(BaseModule):
@@ -15,26 +18,62 @@ class EvaluatorScore(BaseModule):
         api (API): The API object used for making API requests.
 
     Methods:
+        compute: Computes the average final mark given by a user.
         run: Runs the evaluator score module and returns the result.
     """
 
+    FIELDS = ["evaluations", "average_score", "score_stddev"]
+    TITLE = "average score as an evaluator"
+    COMMAND = "evaluator-score"
+    POSITION = 10
+
+    def compute(self, login: str, spinner: Optional[Spinner] = None) -> dict:
+        """
+        Computes the average final mark given by a user as a corrector.
+
+        Args:
+            login (str): The login of the user.
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+
+        Returns:
+            dict: The number of marked evaluations, their average final mark and its standard deviation.
+        """
+        user_id = self.data.get_user_id(login)
+
+        stats = RunningStats()
+        for evals in self.data.iter_evaluations(
+            user_id=user_id,
+            side="as_corrector",
+            spinner=spinner,
+            columns=["final_mark"],
+        ):
+            with Utils.phase("aggregate"):
+                stats.update(evals["final_mark"])
+            if spinner is not None:
+                spinner.status_message(
+                    f"{stats.count} evaluations, average so far {stats.mean:.2f}%"
+                )
+
+        return {
+            "evaluations": stats.count,
+            "average_score": round(stats.mean, 2),
+            "score_stddev": round(stats.std, 2),
+        }
+
     def run(self) -> str:
-        login = prompt("login: ")
+        login = self.prompt_login()
 
-        with Spinner(f"Fetching evaluations involving {login} as a corrector"):
+        with Spinner(
+            f"Fetching evaluations involving {login} as a corrector"
+        ) as spinner:
             try:
-                user_id = Utils.get_user_id(api=self.api, login=login)
-                evals = Utils.get_evaluations_for_user(
-                    api=self.api, user_id=user_id, side="as_corrector"
-                )
-                evals = evals.dropna(subset=["final_mark"])
-                average = evals["final_mark"].mean()
-                result = average
-                return_message = f"\rresult: {round(result, 2)}%\n"
+                result = self.compute(login, spinner)
+                return_message = f"\rresult: {result['average_score']}%\n"
             except Exception as e:
                 return_message = f"error: {e}"
 
         clear_terminal()
-        print(return_message)
+        with Utils.phase("render"):
+            print(return_message)
 
         return InterfaceResult.Success
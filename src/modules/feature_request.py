@@ -17,6 +17,9 @@ class FeatureRequest(BaseModule):
 
     """
 
+    TITLE = "i have another question"
+    POSITION = 90
+
     def run(self) -> str:
         """
         Executes the feature request module.
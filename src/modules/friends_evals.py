@@ -1,13 +1,11 @@
 from src.InterfaceResult import InterfaceResult
 from src.Spinner import Spinner
+from src.aggregators import GroupedRunningStats
 from src.modules.base import BaseModule
-from src.utils import Utils, clear_terminal, prompt, prompt_select
-from collections import Counter
-from collections import defaultdict
-import numpy as np
+from src.utils import Utils, clear_terminal, prompt_select
 import pandas as pd
 import os
-import json
+from typing import Optional
 
 
 class FriendsEval(BaseModule):
@@ -19,6 +17,18 @@ class FriendsEval(BaseModule):
     and their average evaluation scores.
     """
 
+    FIELDS = [
+        "evaluators",
+        "evaluated",
+        "top_evaluator",
+        "top_evaluator_count",
+        "top_evaluated",
+        "top_evaluated_count",
+    ]
+    TITLE = "evaluation network analysis"
+    COMMAND = "friends-eval"
+    POSITION = 30
+
     def format_result(
         self, corrected: dict, corrector: dict, user_login: str, top_n=None
     ) -> str:
@@ -125,13 +135,15 @@ class FriendsEval(BaseModule):
                              or `InterfaceResult.Success` depending on user interaction.
         """
         os.system("clear")
-        print(self.format_result(corrected_counter, corrector_counter, login, 10))
+        with Utils.phase("render"):
+            print(self.format_result(corrected_counter, corrector_counter, login, 10))
         if prompt_select(["get full list", "go back"]) == "go back":
             clear_terminal()
             return InterfaceResult.Skip
 
         clear_terminal()
-        print(self.format_result(corrected_counter, corrector_counter, login))
+        with Utils.phase("render"):
+            print(self.format_result(corrected_counter, corrector_counter, login))
         return InterfaceResult.Success
 
     def process_as_corrector_data(self, as_corrector_df):
@@ -144,32 +156,20 @@ class FriendsEval(BaseModule):
 
         Args:
             as_corrector_df (pd.DataFrame): A pandas DataFrame containing data of evaluations
-                                            where the user acted as the corrector.
+                                            where the user acted as the corrector, with
+                                            "corrected_logins" and "final_mark" columns.
 
         Returns:
             dict: A dictionary with user logins as keys and tuples of counts and average scores as values.
         """
-        login_marks = {}
-
-        for index, row in as_corrector_df.iterrows():
-            correcteds = row.get("correcteds", [])
-            final_mark = row.get("final_mark", np.nan)
-
-            for corrected in correcteds:
-                login = corrected.get("login")
+        if as_corrector_df.empty:
+            return {}
 
-                if login in login_marks:
-                    login_marks[login].append(final_mark)
-                else:
-                    login_marks[login] = [final_mark]
-
-        repeating_logins = {}
-        for login, marks in login_marks.items():
-            if len(marks) > 0:
-                avg_mark = np.nanmean(marks)
-                repeating_logins[login] = (len(marks), avg_mark)
+        marks = as_corrector_df[["corrected_logins", "final_mark"]].explode(
+            "corrected_logins"
+        )
 
-        return repeating_logins
+        return self.aggregate_marks(marks.rename(columns={"corrected_logins": "login"}))
 
     def process_as_corrected_data(self, as_corrected_df):
         """
@@ -181,31 +181,112 @@ class FriendsEval(BaseModule):
 
         Args:
             as_corrected_df (pd.DataFrame): A pandas DataFrame containing data of evaluations
-                                            where the user was corrected by others.
+                                            where the user was corrected by others, with
+                                            "corrector_login" and "final_mark" columns.
 
         Returns:
             dict: A dictionary with corrector logins as keys and tuples of counts and average scores as values.
         """
-        corrector_marks = {}
+        if as_corrected_df.empty:
+            return {}
+
+        marks = as_corrected_df[["corrector_login", "final_mark"]]
+
+        return self.aggregate_marks(marks.rename(columns={"corrector_login": "login"}))
+
+    @staticmethod
+    def aggregate_marks(marks: pd.DataFrame) -> dict:
+        """
+        Count the evaluations and average the final marks per login.
+
+        Evaluations without a final mark are counted but left out of the average.
+
+        Args:
+            marks (pd.DataFrame): A DataFrame with one row per (login, evaluation),
+                                  with "login" and "final_mark" columns.
+
+        Returns:
+            dict: A dictionary with logins as keys and tuples of counts and average scores as values,
+                  in order of first appearance.
+        """
+        return (
+            GroupedRunningStats()
+            .update(marks["login"], marks["final_mark"])
+            .to_counters()
+        )
+
+    def fetch_counters(
+        self, login: str, spinner: Optional[Spinner] = None
+    ) -> tuple[dict, dict]:
+        """
+        Fetch the evaluations involving a user and aggregate them per login.
 
-        for index, row in as_corrected_df.iterrows():
-            corrector = row.get("corrector", {})
-            corrector_login = corrector.get("login")
-            final_mark = row.get("final_mark", np.nan)
+        Args:
+            login (str): The login of the user.
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
 
-            if corrector_login:
-                if corrector_login in corrector_marks:
-                    corrector_marks[corrector_login].append(final_mark)
-                else:
-                    corrector_marks[corrector_login] = [final_mark]
+        Returns:
+            tuple[dict, dict]: The corrected data (per evaluator of the user) and the corrector data
+                               (per user evaluated by the user), as returned by
+                               `process_as_corrected_data` and `process_as_corrector_data`.
+        """
+        user_id = self.data.get_user_id(login)
+
+        corrected_stats = GroupedRunningStats()
+        for as_corrected_df in self.data.iter_evaluations(
+            user_id,
+            side="as_corrected",
+            spinner=spinner,
+            columns=["corrector_login", "final_mark"],
+        ):
+            with Utils.phase("aggregate"):
+                corrected_stats.update(
+                    as_corrected_df["corrector_login"], as_corrected_df["final_mark"]
+                )
+
+        corrector_stats = GroupedRunningStats()
+        for as_corrector_df in self.data.iter_evaluations(
+            user_id,
+            side="as_corrector",
+            spinner=spinner,
+            columns=["corrected_logins", "final_mark"],
+        ):
+            with Utils.phase("aggregate"):
+                marks = as_corrector_df.explode("corrected_logins")
+                corrector_stats.update(marks["corrected_logins"], marks["final_mark"])
 
-        corrector_stats = {}
-        for corrector, marks in corrector_marks.items():
-            if len(marks) > 0:
-                avg_mark = np.nanmean(marks)
-                corrector_stats[corrector] = (len(marks), avg_mark)
+        return corrected_stats.to_counters(), corrector_stats.to_counters()
 
-        return corrector_stats
+    def compute(self, login: str, spinner: Optional[Spinner] = None) -> dict:
+        """
+        Summarize the evaluation network of a user.
+
+        Args:
+            login (str): The login of the user.
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+
+        Returns:
+            dict: The number of distinct evaluators and evaluated users, and the login
+                  and number of evaluations of the most frequent of each.
+        """
+        corrected_counter, corrector_counter = self.fetch_counters(login, spinner)
+
+        def top(counter: dict) -> tuple:
+            if not counter:
+                return None, 0
+            login, (count, _) = max(counter.items(), key=lambda x: x[1][0])
+            return login, count
+
+        top_evaluator, top_evaluator_count = top(corrected_counter)
+        top_evaluated, top_evaluated_count = top(corrector_counter)
+        return {
+            "evaluators": len(corrected_counter),
+            "evaluated": len(corrector_counter),
+            "top_evaluator": top_evaluator,
+            "top_evaluator_count": top_evaluator_count,
+            "top_evaluated": top_evaluated,
+            "top_evaluated_count": top_evaluated_count,
+        }
 
     def run(self) -> str:
         """
@@ -217,21 +298,13 @@ class FriendsEval(BaseModule):
         Returns:
             str: The formatted result of the evaluation network analysis.
         """
-        login = prompt("Login: ")
+        login = self.prompt_login("Login: ")
 
         with Spinner(f"Fetching all evaluations involving {login}") as spinner:
             try:
-                user_id = Utils.get_user_id(self.api, login)
-                as_corrected_df = Utils.get_evaluations_for_user(
-                    self.api, user_id, side="as_corrected", spinner=spinner
-                )
-                as_corrector_df = Utils.get_evaluations_for_user(
-                    self.api, user_id, side="as_corrector", spinner=spinner
+                corrected_counter, corrector_counter = self.fetch_counters(
+                    login, spinner
                 )
-
-                corrector_counter = self.process_as_corrector_data(as_corrector_df)
-                corrected_counter = self.process_as_corrected_data(as_corrected_df)
-
             except Exception as e:
                 raise Exception(f"An error occurred: {e}")
 
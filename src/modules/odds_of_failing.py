@@ -1,7 +1,10 @@
+from typing import Optional
+
 from src.InterfaceResult import InterfaceResult
 from src.Spinner import Spinner
+from src.aggregators import RunningStats
 from src.modules.base import BaseModule
-from src.utils import Utils, clear_terminal, prompt
+from src.utils import Utils, clear_terminal
 
 
 class OddsOfFailing(BaseModule):
@@ -15,9 +18,47 @@ class OddsOfFailing(BaseModule):
         api: The API object used for making API requests.
 
     Methods:
+        compute: Computes the odds of failing of a user.
         run: Runs the module and returns the result as a string.
     """
 
+    FIELDS = ["evaluations", "odds_of_failing"]
+    TITLE = "odds of failing next project"
+    COMMAND = "odds-of-failing"
+    POSITION = 20
+
+    def compute(self, login: str, spinner: Optional[Spinner] = None) -> dict:
+        """
+        Computes the odds of failing of a user from the marks they received.
+
+        Args:
+            login (str): The login of the user.
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+
+        Returns:
+            dict: The number of marked evaluations and the odds of failing as a percentage.
+        """
+        user_id = self.data.get_user_id(login)
+
+        stats = RunningStats()
+        for evals in self.data.iter_evaluations(
+            user_id=user_id,
+            side="as_corrected",
+            spinner=spinner,
+            columns=["final_mark"],
+        ):
+            with Utils.phase("aggregate"):
+                stats.update(evals["final_mark"].clip(upper=100))
+            if spinner is not None:
+                spinner.status_message(
+                    f"{stats.count} evaluations, odds so far {100 - stats.mean:.2f}%"
+                )
+
+        return {
+            "evaluations": stats.count,
+            "odds_of_failing": round(100 - stats.mean, 2),
+        }
+
     def run(self) -> str:
         """
         Runs the module and returns the result as a string.
@@ -25,22 +66,17 @@ class OddsOfFailing(BaseModule):
         Returns:
             A string representing the result of the module.
         """
-        login = prompt("login: ")
+        login = self.prompt_login()
 
         with Spinner(f"Fetching groups for {login}") as spinner:
             try:
-                user_id = Utils.get_user_id(api=self.api, login=login)
-                evals = Utils.get_evaluations_for_user(
-                    api=self.api, user_id=user_id, side="as_corrected", spinner=spinner
-                )
-                evals = evals.dropna(subset=["final_mark"])
-                average = evals["final_mark"].clip(upper=100).mean()
-                result = 100 - average
-                return_message = f"\rresult: {round(result, 2)}%\n"
+                result = self.compute(login, spinner)
+                return_message = f"\rresult: {result['odds_of_failing']}%\n"
             except Exception as e:
                 return_message = f"error: {e}"
 
         clear_terminal()
-        print(return_message)
+        with Utils.phase("render"):
+            print(return_message)
 
         return InterfaceResult.Success
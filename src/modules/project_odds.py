@@ -0,0 +1,373 @@
+import contextvars
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+
+import pandas as pd
+
+from src.InterfaceResult import InterfaceResult
+from src.Spinner import Spinner
+from src.config import get_cache_dir, get_env_int
+from src.modules.base import BaseModule
+from src.session_data import SessionData
+from src.utils import Utils, clear_terminal, prompt
+
+
+class ProjectOdds(BaseModule):
+    """
+    A module that predicts the odds of a user failing a project, from their projects_users
+    history and how their campus did on each project.
+
+    The results of a campus are aggregated into one row per project, from the projects_users
+    of every active user, and saved in the cache directory for PROJECT_STATS_MAX_AGE seconds
+    (a week by default). A prediction then only fetches the history of the user.
+
+    The odds start from the failure rate of the campus on the project, smoothed toward its
+    failure rate on every project when the project has few attempts. They are then shifted,
+    on the logit scale, by how many attempts per project the user failed less or more than
+    their campus on the projects they finished.
+
+    Attributes:
+        COLUMNS (list[str]): The columns of the per-project table.
+        IN_PROGRESS (list[str]): The statuses of a project the user is working on.
+        PRIOR_ATTEMPTS (int): The attempts at the campus-wide failure rate added to every project.
+        PRIOR_PROJECTS (int): The projects at the campus failure rate added to the history of every user.
+        SKILL_WEIGHT (float): The logit shift for a user failing one attempt per project less than their campus.
+
+    Methods:
+        compute: Predicts the odds of a user failing a project.
+        build_table: Aggregates the projects_users of a campus per project.
+        run: Prompts for a login and a project and shows the prediction.
+    """
+
+    FIELDS = ["project", "attempts", "campus_failure_rate", "odds_of_failing"]
+    COLUMNS = [
+        "project_id",
+        "project",
+        "users",
+        "attempts",
+        "passes",
+        "failure_rate",
+        "mean_retries",
+        "mean_final_mark",
+    ]
+    IN_PROGRESS = [
+        "in_progress",
+        "waiting_for_correction",
+        "searching_a_group",
+        "creating_group",
+    ]
+    PRIOR_ATTEMPTS = 5
+    PRIOR_PROJECTS = 3
+    SKILL_WEIGHT = 3.0
+    TITLE = "odds of failing a project"
+    COMMAND = "project-odds"
+    POSITION = 25
+
+    def __init__(self, api, data: Optional[SessionData] = None):
+        super().__init__(api, data)
+        self._tables: dict[int, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_table_path(campus_id: int) -> str:
+        """
+        Args:
+            campus_id (int): The ID of the campus.
+
+        Returns:
+            str: The file the per-project table of the campus is saved to.
+        """
+        return os.path.join(get_cache_dir(), "projects", f"campus_{campus_id}.parquet")
+
+    @staticmethod
+    def get_attempts(projects_users: list) -> list[dict]:
+        """
+        Extracts the finished projects of a user.
+
+        Args:
+            projects_users (list): The projects_users of the user, as returned by the API.
+
+        Returns:
+            list[dict]: For each finished project, its ID and name, the number of attempts
+                        (retries included), whether it was validated and the final mark.
+        """
+        attempts = []
+        for project_user in projects_users:
+            project = project_user.get("project") or {}
+            if project_user.get("status") != "finished" or project.get("id") is None:
+                continue
+            attempts.append(
+                {
+                    "project_id": project["id"],
+                    "project": project.get("name"),
+                    "attempts": (project_user.get("occurrence") or 0) + 1,
+                    "passed": bool(project_user.get("validated?")),
+                    "final_mark": project_user.get("final_mark"),
+                }
+            )
+        return attempts
+
+    def build_table(
+        self, campus_id: int, spinner: Optional[Spinner] = None
+    ) -> pd.DataFrame:
+        """
+        Aggregates the finished projects of every active user of a campus per project.
+
+        Users are fetched by a pool of Utils.PAGE_WORKERS threads. A user whose projects
+        cannot be fetched is left out.
+
+        Args:
+            campus_id (int): The ID of the campus.
+            spinner (Spinner, optional): The Spinner object for displaying progress. Defaults to None.
+
+        Returns:
+            pd.DataFrame: One row per project, with the columns of ProjectOdds.COLUMNS.
+        """
+        users = Utils.get_campus_users(self.api, campus_id)
+
+        def fetch(user: dict) -> list[dict]:
+            return self.get_attempts(Utils.get_teams_for_user(self.api, user["id"]))
+
+        attempts, failed = [], 0
+        with ThreadPoolExecutor(Utils.PAGE_WORKERS) as executor:
+            context = contextvars.copy_context()
+            futures = {
+                executor.submit(context.copy().run, fetch, user): user for user in users
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    attempts += future.result()
+                except Exception as e:
+                    self.logs.warning(
+                        f"Failed to fetch the projects of {futures[future]['login']}: {e}"
+                    )
+                    failed += 1
+                if spinner is not None:
+                    spinner.status_message(
+                        f"{done}/{len(users)} users, {failed} failed"
+                    )
+
+        with Utils.phase("aggregate"):
+            if not attempts:
+                return pd.DataFrame(columns=self.COLUMNS)
+            table = (
+                pd.DataFrame(attempts)
+                .groupby("project_id", sort=True)
+                .agg(
+                    project=("project", "first"),
+                    users=("attempts", "size"),
+                    attempts=("attempts", "sum"),
+                    passes=("passed", "sum"),
+                    mean_final_mark=("final_mark", "mean"),
+                )
+                .reset_index()
+            )
+            table["failure_rate"] = 1 - table["passes"] / table["attempts"]
+            table["mean_retries"] = table["attempts"] / table["users"] - 1
+            return table[self.COLUMNS]
+
+    def load_table(self, campus_id: int) -> Optional[pd.DataFrame]:
+        """
+        Args:
+            campus_id (int): The ID of the campus.
+
+        Returns:
+            pd.DataFrame: The saved table of the campus, None if it was never built or is
+                          older than PROJECT_STATS_MAX_AGE seconds.
+        """
+        path = self.get_table_path(campus_id)
+        max_age = get_env_int("PROJECT_STATS_MAX_AGE", 7 * 24 * 3600)
+        if not os.path.exists(path) or time.time() - os.path.getmtime(path) > max_age:
+            return None
+        return pd.read_parquet(path)
+
+    def save_table(self, campus_id: int, table: pd.DataFrame):
+        """
+        Saves the per-project table of a campus.
+
+        Args:
+            campus_id (int): The ID of the campus.
+            table (pd.DataFrame): The table.
+        """
+        path = self.get_table_path(campus_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        table.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def get_table(
+        self, campus_id: int, spinner: Optional[Spinner] = None
+    ) -> pd.DataFrame:
+        """
+        Returns the per-project table of a campus, from memory, from the cache directory,
+        or built and saved if neither has it. Concurrent callers wait for a single build.
+
+        Args:
+            campus_id (int): The ID of the campus.
+            spinner (Spinner, optional): The Spinner object for displaying progress. Defaults to None.
+
+        Returns:
+            pd.DataFrame: The table, with the columns of ProjectOdds.COLUMNS.
+        """
+        with self._lock:
+            if campus_id not in self._tables:
+                table = self.load_table(campus_id)
+                if table is None:
+                    if spinner is not None:
+                        spinner.status_message(
+                            f"Computing the project stats of campus {campus_id}"
+                        )
+                    table = self.build_table(campus_id, spinner)
+                    self.save_table(campus_id, table)
+                self._tables[campus_id] = table
+            return self._tables[campus_id]
+
+    def find_project(
+        self, table: pd.DataFrame, projects_users: list, project: Optional[str]
+    ) -> tuple[int, str]:
+        """
+        Finds the project to predict.
+
+        Args:
+            table (pd.DataFrame): The per-project table of the campus.
+            projects_users (list): The projects_users of the user.
+            project (str, optional): The ID or name of the project. Defaults to the project
+                                     the user started most recently among those in progress.
+
+        Returns:
+            tuple[int, str]: The ID and name of the project.
+
+        Raises:
+            Exception: If the project is not found, or if none is given and none is in progress.
+        """
+        if project is None:
+            in_progress = [
+                project_user
+                for project_user in projects_users
+                if project_user.get("status") in self.IN_PROGRESS
+                and (project_user.get("project") or {}).get("id") is not None
+            ]
+            if not in_progress:
+                raise Exception("no project in progress")
+            latest = max(
+                in_progress,
+                key=lambda project_user: project_user.get("created_at") or "",
+            )
+            return latest["project"]["id"], latest["project"].get("name")
+
+        names = {
+            *zip(table["project_id"], table["project"]),
+            *(
+                (project_user["project"]["id"], project_user["project"].get("name"))
+                for project_user in projects_users
+                if (project_user.get("project") or {}).get("id") is not None
+            ),
+        }
+        for project_id, name in sorted(names, key=lambda pair: pair[0]):
+            if project == str(project_id) or project.lower() == str(name).lower():
+                return project_id, name
+        raise Exception(f"project not found: {project}")
+
+    def predict(
+        self, table: pd.DataFrame, projects_users: list, project_id: int
+    ) -> tuple[float, float]:
+        """
+        Predicts the odds of a user failing an attempt at a project.
+
+        Args:
+            table (pd.DataFrame): The per-project table of the campus.
+            projects_users (list): The projects_users of the user.
+            project_id (int): The ID of the project.
+
+        Returns:
+            tuple[float, float]: The smoothed failure rate of the campus on the project,
+                                 and the odds of the user failing it, both between 0 and 1.
+        """
+        total = table["attempts"].sum()
+        campus_rate = 1 - table["passes"].sum() / total if total else 0.5
+        rates = (
+            (table["attempts"] - table["passes"] + self.PRIOR_ATTEMPTS * campus_rate)
+            / (table["attempts"] + self.PRIOR_ATTEMPTS)
+        ).set_axis(table["project_id"])
+        base = float(rates.get(project_id, campus_rate))
+
+        past = [
+            attempt
+            for attempt in self.get_attempts(projects_users)
+            if attempt["project_id"] != project_id
+        ]
+        skill = sum(
+            rates.get(attempt["project_id"], campus_rate)
+            - (1 - attempt["passed"] / attempt["attempts"])
+            for attempt in past
+        ) / (len(past) + self.PRIOR_PROJECTS)
+
+        base = min(max(base, 0.001), 0.999)
+        logit = math.log(base / (1 - base)) - self.SKILL_WEIGHT * skill
+        return base, 1 / (1 + math.exp(-logit))
+
+    def compute(
+        self,
+        login: str,
+        spinner: Optional[Spinner] = None,
+        project: Optional[str] = None,
+    ) -> dict:
+        """
+        Predicts the odds of a user failing a project.
+
+        Args:
+            login (str): The login of the user.
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+            project (str, optional): The ID or name of the project. Defaults to the project
+                                     the user started most recently among those in progress.
+
+        Returns:
+            dict: The name of the project, the number of attempts of the campus at it,
+                  the failure rate of the campus and the odds of failing, as percentages.
+        """
+        user_id = self.data.get_user_id(login)
+        table = self.get_table(self.data.get_campus_id(user_id), spinner)
+        projects_users = self.data.get_projects_users(user_id)
+
+        with Utils.phase("aggregate"):
+            project_id, name = self.find_project(table, projects_users, project)
+            base, odds = self.predict(table, projects_users, project_id)
+            attempts = table.loc[table["project_id"] == project_id, "attempts"].sum()
+
+        return {
+            "project": name,
+            "attempts": int(attempts),
+            "campus_failure_rate": round(base * 100, 2),
+            "odds_of_failing": round(odds * 100, 2),
+        }
+
+    def run(self) -> InterfaceResult:
+        """
+        Prompts for a login and a project, and shows the odds of failing it.
+
+        Returns:
+            InterfaceResult: `InterfaceResult.Success` once the result is shown.
+        """
+        login = self.prompt_login()
+        project = prompt("project (empty for the one in progress): ").strip()
+
+        with Spinner(f"Fetching the projects of {login}") as spinner:
+            try:
+                result = self.compute(login, spinner, project or None)
+                return_message = (
+                    f"\r{result['project']}: {result['odds_of_failing']}% odds of failing\n"
+                    f"campus failure rate: {result['campus_failure_rate']}% "
+                    f"over {result['attempts']} attempts\n"
+                )
+            except Exception as e:
+                return_message = f"error: {e}"
+
+        clear_terminal()
+        with Utils.phase("render"):
+            print(return_message)
+
+        return InterfaceResult.Success
@@ -0,0 +1,136 @@
+import ast
+import importlib
+import os
+from typing import Optional
+
+from src.modules.base import BaseModule
+from src.session_data import SessionData
+
+
+class ModuleSpec:
+    """
+    A module found by `discover`, described without importing it.
+
+    Attributes:
+        path (str): The import path of the Python module defining the class, e.g. "src.modules.evaluator_score".
+        name (str): The name of the class.
+        title (str, optional): The label of the module in the main menu, see BaseModule.TITLE.
+        command (str, optional): The name of its batch subcommand, see BaseModule.COMMAND.
+        position (int): Its place in the main menu, see BaseModule.POSITION.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        name: str,
+        title: Optional[str],
+        command: Optional[str],
+        position: int,
+    ):
+        self.path = path
+        self.name = name
+        self.title = title
+        self.command = command
+        self.position = position
+
+    def load(self) -> type[BaseModule]:
+        """
+        Imports the module, along with the dependencies it needs.
+
+        Returns:
+            type[BaseModule]: The class of the module.
+        """
+        return getattr(importlib.import_module(self.path), self.name)
+
+
+class LazyModule:
+    """
+    Stands in for a module in the interface until it is selected, so its dependencies
+    are only imported when it is used.
+
+    Attributes:
+        spec (ModuleSpec): The module to create.
+        api (IntraSession): The API client passed to the module.
+        data (SessionData, optional): The data layer passed to the module.
+    """
+
+    def __init__(self, spec: ModuleSpec, api, data: Optional[SessionData] = None):
+        self.spec = spec
+        self.api = api
+        self.data = data
+        self._module: Optional[BaseModule] = None
+
+    def get(self) -> BaseModule:
+        """
+        Returns:
+            BaseModule: The module, created on the first call.
+        """
+        if self._module is None:
+            self._module = self.spec.load()(self.api, self.data)
+        return self._module
+
+
+def get_class_attributes(node: ast.ClassDef) -> dict:
+    """
+    Args:
+        node (ast.ClassDef): A class definition.
+
+    Returns:
+        dict: The class attributes assigned a literal value, by name.
+    """
+    attributes = {}
+    for statement in node.body:
+        if isinstance(statement, ast.Assign):
+            targets, value = statement.targets, statement.value
+        elif isinstance(statement, ast.AnnAssign) and statement.value is not None:
+            targets, value = [statement.target], statement.value
+        else:
+            continue
+        for target in targets:
+            if isinstance(target, ast.Name):
+                try:
+                    attributes[target.id] = ast.literal_eval(value)
+                except ValueError:
+                    pass
+    return attributes
+
+
+def discover(directory: Optional[str] = None) -> list[ModuleSpec]:
+    """
+    Finds the modules of the interface by parsing the source files of src/modules.
+
+    Every class deriving from BaseModule by name is a module. Its TITLE, COMMAND and
+    POSITION are read from the source, so nothing is imported until a module is used.
+
+    Args:
+        directory (str, optional): The directory to search. Defaults to the directory of this file.
+
+    Returns:
+        list[ModuleSpec]: The modules, ordered by POSITION.
+    """
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    specs = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".py") or filename.startswith("_"):
+            continue
+        with open(os.path.join(directory, filename)) as f:
+            tree = ast.parse(f.read(), filename)
+
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef) or not any(
+                isinstance(base, ast.Name) and base.id == BaseModule.__name__
+                for base in node.bases
+            ):
+                continue
+            attributes = get_class_attributes(node)
+            specs.append(
+                ModuleSpec(
+                    f"{__package__}.{filename[:-3]}",
+                    node.name,
+                    attributes.get("TITLE", BaseModule.TITLE),
+                    attributes.get("COMMAND", BaseModule.COMMAND),
+                    attributes.get("POSITION", BaseModule.POSITION),
+                )
+            )
+
+    return sorted(specs, key=lambda spec: spec.position)
@@ -0,0 +1,75 @@
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from src.session_data import SessionData
+from src.tracer import Tracer
+
+
+class Prefetcher:
+    """
+    Fetches the data of a login into a SessionData in background threads, while the
+    user is still in the menus, so the modules picked next find it in memory.
+
+    For a login, it resolves the user ID, then fetches both sides of their evaluations,
+    their projects_users and their campus. A module asking for the same data while it
+    is in flight waits for it instead of fetching it again. Failures are only logged:
+    the module asking for the data later fetches it again and reports the error.
+
+    Attributes:
+        data (SessionData): The data layer filled by the prefetcher.
+        logs (logging.Logger): The logger used for logging failed prefetches.
+    """
+
+    def __init__(self, data: SessionData, workers: int = 3):
+        """
+        Initializes a new instance of the Prefetcher class.
+
+        Args:
+            data (SessionData): The data layer to fill.
+            workers (int, optional): The number of datasets fetched at the same time. Defaults to 3.
+        """
+        self.data = data
+        self.logs = logging.getLogger("logs")
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="prefetch")
+
+    def submit(self, task: Callable, *args):
+        """
+        Runs a task in the background, attributed to the prefetcher in traces.
+
+        Args:
+            task (Callable): The task.
+            *args: The arguments of the task.
+        """
+
+        def run():
+            with Tracer.module(type(self).__name__):
+                try:
+                    task(*args)
+                except Exception as e:
+                    self.logs.debug(f"prefetch {task.__name__}{args} failed: {e}")
+
+        self._executor.submit(contextvars.copy_context().run, run)
+
+    def prefetch(self, login: str):
+        """
+        Starts fetching the data of a login, and returns right away.
+
+        Args:
+            login (str): The login of the user.
+        """
+        self.submit(self.prefetch_user, login)
+
+    def prefetch_user(self, login: str):
+        user_id = self.data.get_user_id(login)
+        self.submit(self.data.get_evaluation_table, user_id, "as_corrector")
+        self.submit(self.data.get_evaluation_table, user_id, "as_corrected")
+        self.submit(self.data.get_projects_users, user_id)
+        self.submit(self.data.get_campus_id, user_id)
+
+    def close(self):
+        """
+        Cancels the prefetches that have not started, without waiting for the others.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,209 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously at a fixed rate.
+
+    This class is not thread-safe on its own, it is meant to be used through RateLimiter.
+
+    Attributes:
+        rate (float): The number of tokens added per second.
+        capacity (float): The maximum number of tokens in the bucket.
+        tokens (float): The number of tokens currently available.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initializes a new, full instance of the TokenBucket class.
+
+        Args:
+            rate (float): The number of tokens added per second.
+            capacity (float): The maximum number of tokens in the bucket.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        """
+        Adds the tokens accumulated since the last refill.
+
+        Args:
+            now (float): The current time.monotonic() value.
+        """
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def wait_time(self) -> float:
+        """
+        Returns:
+            float: The number of seconds until a token is available.
+        """
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """
+        Removes a token from the bucket.
+        """
+        self.tokens -= 1
+
+    def configure(self, limit: float, period: float):
+        """
+        Changes the quota of the bucket, keeping the tokens already used.
+
+        Args:
+            limit (float): The number of requests allowed per period.
+            period (float): The length of the period in seconds.
+        """
+        used = self.capacity - self.tokens
+        self.capacity = limit
+        self.rate = limit / period
+        self.tokens = max(0, limit - used)
+
+    def cap(self, remaining: float):
+        """
+        Lowers the number of available tokens to what the server reports as remaining.
+
+        Args:
+            remaining (float): The number of requests the server still allows.
+        """
+        self.tokens = min(self.tokens, remaining)
+
+
+class RateLimiter:
+    """
+    A proactive client-side rate limiter for the intra API.
+
+    Every request takes one token from a per-second and a per-hour bucket, waiting
+    until both have one available. The buckets are kept in sync with the rate limit
+    headers returned by the API, and a 429 pauses every caller until the Retry-After delay has passed.
+
+    Attributes:
+        HEADERS (dict[str, tuple[str, str, float]]): The (limit, remaining) headers of each bucket and its period in seconds.
+    """
+
+    HEADERS = {
+        "secondly": ("X-Secondly-RateLimit-Limit", "X-Secondly-RateLimit-Remaining", 1),
+        "hourly": ("X-Hourly-RateLimit-Limit", "X-Hourly-RateLimit-Remaining", 3600),
+    }
+
+    def __init__(self, per_second: float = 2, per_hour: float = 1200):
+        """
+        Initializes a new instance of the RateLimiter class.
+
+        Args:
+            per_second (float, optional): The number of requests allowed per second. Defaults to 2.
+            per_hour (float, optional): The number of requests allowed per hour. Defaults to 1200.
+        """
+        self.buckets = {
+            "secondly": TokenBucket(per_second, per_second),
+            "hourly": TokenBucket(per_hour / 3600, per_hour),
+        }
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+    def acquire(self) -> float:
+        """
+        Blocks until a request is allowed, then takes a token from every bucket.
+
+        Returns:
+            float: The number of seconds spent waiting.
+        """
+        waited = 0.0
+        while (wait := self._try_take()) > 0:
+            time.sleep(wait)
+            waited += wait
+        return waited
+
+    async def acquire_async(self) -> float:
+        """
+        Like `acquire`, but waits with asyncio.sleep so the event loop keeps running.
+
+        Returns:
+            float: The number of seconds spent waiting.
+        """
+        waited = 0.0
+        while (wait := self._try_take()) > 0:
+            await asyncio.sleep(wait)
+            waited += wait
+        return waited
+
+    def update(self, headers: dict):
+        """
+        Synchronizes the buckets with the rate limit headers of a response.
+
+        Args:
+            headers (dict): The headers of the response.
+        """
+        with self._lock:
+            for name, (limit_header, remaining_header, period) in self.HEADERS.items():
+                bucket = self.buckets[name]
+                limit = headers.get(limit_header)
+                if limit is not None and float(limit) != bucket.capacity:
+                    bucket.configure(float(limit), period)
+                remaining = headers.get(remaining_header)
+                if remaining is not None:
+                    bucket.cap(float(remaining))
+
+    def pause(self, seconds: float):
+        """
+        Stops every caller from making requests for a while, e.g. after a 429.
+
+        Args:
+            seconds (float): The number of seconds to pause for.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    @staticmethod
+    def get_retry_after(headers: dict) -> Optional[float]:
+        """
+        Reads the Retry-After header of a response.
+
+        Args:
+            headers (dict): The headers of the response.
+
+        Returns:
+            float: The number of seconds to wait, or None if the header is missing or not a number.
+        """
+        try:
+            return float(headers["Retry-After"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def wait_time(self) -> float:
+        """
+        Returns:
+            float: The number of seconds until a request is allowed, without taking a token.
+        """
+        with self._lock:
+            return self._wait_time()
+
+    def _wait_time(self) -> float:
+        # Must be called with the lock held.
+        now = time.monotonic()
+        for bucket in self.buckets.values():
+            bucket.refill(now)
+        return max(
+            self._paused_until - now,
+            *(bucket.wait_time() for bucket in self.buckets.values()),
+        )
+
+    def _try_take(self) -> float:
+        # Takes a token from every bucket and returns 0, or returns how long to wait.
+        with self._lock:
+            wait = self._wait_time()
+            if wait <= 0:
+                for bucket in self.buckets.values():
+                    bucket.take()
+                return 0
+            return wait
@@ -1,34 +1,220 @@
+import logging
+import re
 import sys
+import threading
+import time
+from typing import Optional
 from oauthlib.oauth2 import BackendApplicationClient
+from requests.adapters import HTTPAdapter
 from requests_oauthlib import OAuth2Session
+from urllib3.util.retry import Retry
 import os
 import dotenv
+from src.config import get_api_url, get_env_flag, get_env_int
+from src.rate_limiter import RateLimiter
+from src.token_cache import TokenCache
+
+
+class IntraSession(OAuth2Session):
+    """
+    An OAuth2Session that sends every request through a shared rate limiter and keeps its access token fresh.
+
+    Once `authenticate` has been called, the token is refreshed in a background
+    thread shortly before it expires, and synchronously before a request if the
+    background refresh did not happen in time (e.g. after the machine slept).
+
+    Attributes:
+        TOKEN_PATH (str): The path access tokens are fetched from, relative to the API URL.
+        REFRESH_MARGIN (int): How many seconds before expiry the token is refreshed.
+        rate_limiter (RateLimiter): The rate limiter every request waits on.
+        token_cache (TokenCache, optional): The cache tokens are loaded from and saved to.
+    """
+
+    TOKEN_PATH = "/oauth/token"
+    REFRESH_MARGIN = 300
+
+    def __init__(
+        self,
+        rate_limiter: RateLimiter,
+        token_cache: Optional[TokenCache] = None,
+        **kwargs,
+    ):
+        """
+        Initializes a new instance of the IntraSession class.
+
+        Args:
+            rate_limiter (RateLimiter): The rate limiter every request waits on.
+            token_cache (TokenCache, optional): The cache tokens are loaded from and saved to. Defaults to None.
+            **kwargs: Passed on to OAuth2Session.
+        """
+        super().__init__(**kwargs)
+        self.rate_limiter = rate_limiter
+        self.token_cache = token_cache
+        self._credentials: Optional[tuple[str, str]] = None
+        self._token_from_cache = False
+        self._refresh_lock = threading.Lock()
+        self._refresh_timer: Optional[threading.Timer] = None
+        self._timer_lock = threading.Lock()
+
+    def authenticate(self, client_id: str, client_secret: str):
+        """
+        Gets an access token, from the token cache if it holds a valid one, and schedules its refresh.
+
+        Args:
+            client_id (str): The UID of the intra application.
+            client_secret (str): The secret of the intra application.
+        """
+        self._credentials = (client_id, client_secret)
+
+        token = self.token_cache.load(client_id) if self.token_cache else None
+        if token is None:
+            self.refresh()
+        else:
+            self.token = token
+            self._token_from_cache = True
+            self._schedule_refresh()
+
+    @property
+    def credentials(self) -> Optional[tuple[str, str]]:
+        """
+        Returns:
+            tuple[str, str]: The UID and secret passed to `authenticate`, or None before it was called.
+        """
+        return self._credentials
+
+    def refresh(self):
+        """
+        Fetches a new access token with the client credentials, saves it, and schedules the next refresh.
+        """
+        with self._refresh_lock:
+            self._fetch_token()
+        self._schedule_refresh()
+
+    def request(self, method, url, *args, **kwargs):
+        """
+        Waits for the rate limiter, makes the request, and feeds the rate limit
+        headers of the response back into the rate limiter.
+
+        A 401 to a token loaded from the cache (e.g. revoked since) drops it from the
+        cache, and the request is sent again with a new token.
+        """
+        if (
+            not url.endswith(self.TOKEN_PATH)
+            and self._expires_in() < self.REFRESH_MARGIN / 10
+        ):
+            with self._refresh_lock:
+                # Another thread may have refreshed it while we waited for the lock.
+                if self._expires_in() < self.REFRESH_MARGIN / 10:
+                    self._fetch_token()
+            self._schedule_refresh()
+
+        self.rate_limiter.acquire()
+        response = super().request(method, url, *args, **kwargs)
+
+        self.rate_limiter.update(response.headers)
+        if response.status_code == 429:
+            retry_after = RateLimiter.get_retry_after(response.headers)
+            self.rate_limiter.pause(retry_after if retry_after is not None else 1)
+
+        if (
+            response.status_code == 401
+            and self._token_from_cache
+            and not url.endswith(self.TOKEN_PATH)
+        ):
+            with self._refresh_lock:
+                # Other threads may have got a 401 with the same token and replaced it.
+                if self._token_from_cache:
+                    self.token_cache.drop(self._credentials[0])
+                    self._fetch_token()
+            self._schedule_refresh()
+            return self.request(method, url, *args, **kwargs)
+
+        return response
+
+    def _fetch_token(self):
+        client_id, client_secret = self._credentials
+        token = self.fetch_token(
+            token_url=f"{get_api_url()}{self.TOKEN_PATH}",
+            client_id=client_id,
+            client_secret=client_secret,
+        )
+        self._token_from_cache = False
+        if self.token_cache is not None:
+            self.token_cache.save(client_id, token)
+
+    def _expires_in(self) -> float:
+        if self._credentials is None or not self.token:
+            return float("inf")
+        return self.token.get("expires_at", float("inf")) - time.time()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logging.getLogger("logs").warning(f"Failed to refresh access token: {e}")
+            self._schedule_refresh(delay=30)
+
+    def _schedule_refresh(self, delay: Optional[float] = None):
+        with self._timer_lock:
+            if self._refresh_timer is not None:
+                self._refresh_timer.cancel()
+                self._refresh_timer = None
+
+            if delay is None:
+                delay = max(self._expires_in() - self.REFRESH_MARGIN, 0)
+            if delay == float("inf"):
+                return
+
+            self._refresh_timer = threading.Timer(delay, self._background_refresh)
+            self._refresh_timer.daemon = True
+            self._refresh_timer.start()
+
+
+class ServerErrorRetry(Retry):
+    """
+    The transport-level retries of the API session, on connection errors and server errors.
+
+    urllib3 also retries any 429 that has a Retry-After header, whatever the status_forcelist,
+    sleeping inside the transport where neither the rate limiter nor CredentialPool see it.
+    Only 503 keeps that behavior here, 429s are returned to the caller.
+    """
+
+    RETRY_AFTER_STATUS_CODES = frozenset({503})
 
 
 class Request:
     """
     Represents a request object used to interact with an API.
+
+    Attributes:
+        RETRY_STATUSES (tuple[int, ...]): The server errors retried at the transport level.
+                                          429 is left to the rate limiter and make_request_with_backoff.
     """
 
+    RETRY_STATUSES = (500, 502, 503, 504)
+
     def __init__(self):
         self.api = self.set_api()
 
     def set_api(self):
         """
-        Sets up the API client and fetches the access token.
+        Sets up the API client and gets an access token, reusing the cached one if it is still valid.
+
+        With several credentials (see `get_credentials`), every one gets its own session,
+        token and rate limiter, and the client is a CredentialPool spreading requests
+        over them, with the API_SCHEDULER strategy ("least-loaded" by default).
 
         Returns:
-            api (OAuth2Session): The API client with the access token.
+            api (IntraSession | CredentialPool): The API client with the access token.
         """
         dotenv.load_dotenv()
 
-        client_secret = os.getenv("API_SECRET")
-        client_id = os.getenv("API_UID")
-        if client_secret is None or client_id is None:
+        credentials = self.get_credentials()
+        if not credentials:
             missing_vars = []
-            if client_secret is None:
+            if not os.getenv("API_SECRET"):
                 missing_vars.append("API_SECRET")
-            if client_id is None:
+            if not os.getenv("API_UID"):
                 missing_vars.append("API_UID")
             missing_vars = ", ".join(missing_vars)
 
@@ -36,19 +222,118 @@ class Request:
 
             sys.exit(1)
 
-        client = BackendApplicationClient(client_id=client_id)
-        api = OAuth2Session(client=client)
-
-        try:
-            api.fetch_token(
-                token_url="https://api.intra.42.fr/oauth/token",
-                client_id=client_id,
-                client_secret=client_secret,
-            )
-        except:
-            print(
-                "Failed to get access token.\nAre you sure that you provided the correct Id and Secret?"
+        # One cache for every credential: they all rewrite the same file, under its lock.
+        token_cache = None if get_env_flag("STATS_NO_CACHE") else TokenCache()
+        sessions = []
+        for client_id, client_secret in credentials:
+            api = self.create_session(
+                client_id,
+                pool_size=get_env_int("API_POOL_SIZE", 32),
+                retries=get_env_int("API_RETRIES", 3),
+                token_cache=token_cache,
             )
 
+            try:
+                api.authenticate(client_id, client_secret)
+            except:
+                if len(credentials) > 1:
+                    print(f"Failed to get access token for {client_id}, skipping it.")
+                    continue
+                print(
+                    "Failed to get access token.\nAre you sure that you provided the correct Id and Secret?"
+                )
+
+                sys.exit(1)
+            sessions.append(api)
+
+        if not sessions:
+            print("Failed to get an access token with any of the credentials.")
             sys.exit(1)
+        if len(sessions) == 1:
+            return sessions[0]
+
+        from src.credential_pool import CredentialPool
+
+        return CredentialPool(sessions, os.getenv("API_SCHEDULER") or "least-loaded")
+
+    @staticmethod
+    def get_credentials() -> list[tuple[str, str]]:
+        """
+        Reads the credentials of the intra applications from the environment: API_UID and
+        API_SECRET, then any number of numbered pairs (API_UID_1 and API_SECRET_1, API_UID_2
+        and API_SECRET_2, ...). Incomplete pairs are ignored.
+
+        Returns:
+            list[tuple[str, str]]: The UID and secret of every application.
+        """
+        suffixes = [""] + sorted(
+            (
+                name[len("API_UID") :]
+                for name in os.environ
+                if re.fullmatch(r"API_UID_\d+", name)
+            ),
+            key=lambda suffix: int(suffix[1:]),
+        )
+        credentials = []
+        for suffix in suffixes:
+            client_id = os.getenv(f"API_UID{suffix}")
+            client_secret = os.getenv(f"API_SECRET{suffix}")
+            if client_id and client_secret and client_id not in dict(credentials):
+                credentials.append((client_id, client_secret))
+        return credentials
+
+    @staticmethod
+    def create_session(
+        client_id: str,
+        pool_size: int = 32,
+        retries: int = 3,
+        token_cache: Optional[TokenCache] = None,
+    ) -> IntraSession:
+        """
+        Creates the API client, with a pooled keep-alive transport and retries on server errors.
+
+        All requests to the API share one HTTPAdapter, so concurrent fetchers reuse
+        open connections instead of paying a TLS handshake per request. The pool should
+        be at least as large as the number of threads making requests at the same time.
+
+        Args:
+            client_id (str): The UID of the intra application.
+            pool_size (int, optional): The maximum number of connections kept open. Defaults to 32.
+            retries (int, optional): The number of retries on connection errors and 5xx responses. Defaults to 3.
+            token_cache (TokenCache, optional): The cache access tokens are loaded from and saved to. Defaults to None.
+
+        Returns:
+            IntraSession: The API client, without an access token.
+        """
+        rate_limiter = RateLimiter(
+            per_second=get_env_int("API_RATE_PER_SECOND", 2),
+            per_hour=get_env_int("API_RATE_PER_HOUR", 1200),
+        )
+        api = IntraSession(
+            rate_limiter=rate_limiter,
+            token_cache=token_cache,
+            client=BackendApplicationClient(client_id=client_id),
+        )
+
+        retry = ServerErrorRetry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=0.5,
+            status_forcelist=Request.RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+        # API_URL may point to a plain HTTP server, e.g. the mock API of the benchmarks.
+        api.mount("https://", adapter)
+        api.mount("http://", adapter)
+        api.headers.update(
+            {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+        )
+
         return api
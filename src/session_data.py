@@ -0,0 +1,284 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Callable, Hashable, Iterator, Optional
+
+from requests_oauthlib import OAuth2Session
+
+from src.Spinner import Spinner
+from src.config import get_env_int
+from src.utils import Utils
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+    from src.evaluation_buckets import EvaluationBuckets
+    from src.prefetcher import Prefetcher
+
+
+class SessionData:
+    """
+    The data the modules work on, fetched through Utils once per session and shared between them.
+
+    Datasets are memoized in memory, per (user, side) for evaluations and their monthly
+    aggregates and per user for projects_users. The least recently used ones are evicted
+    once they take more than `max_bytes`. A dataset requested while another thread is
+    already loading it is not fetched again: the caller waits for the pending load and
+    gets its result.
+
+    Attributes:
+        RECORD_BYTES (int): The memory assumed for one raw API record, for sizing lists of records.
+        api (OAuth2Session): The API client the data is fetched with.
+        max_bytes (int): The memory the memoized datasets may take.
+        hits (int): The number of datasets served from memory.
+        misses (int): The number of datasets loaded.
+        coalesced (int): The number of datasets served from a load that was already in flight.
+        prefetcher (Prefetcher, optional): Fetches the data of the logins passed to `prefetch`
+                                           in the background. Disabled when None.
+    """
+
+    RECORD_BYTES = 2048
+
+    def __init__(self, api: OAuth2Session, max_bytes: Optional[int] = None):
+        """
+        Initializes a new instance of the SessionData class.
+
+        Args:
+            api (OAuth2Session): The API client the data is fetched with.
+            max_bytes (int, optional): The memory the memoized datasets may take.
+                                       Defaults to SESSION_CACHE_MB megabytes (256).
+        """
+        self.api = api
+        self.max_bytes = (
+            max_bytes
+            if max_bytes is not None
+            else get_env_int("SESSION_CACHE_MB", 256) * 2**20
+        )
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.prefetcher: Optional["Prefetcher"] = None
+        self._values: OrderedDict[Hashable, tuple[object, int]] = OrderedDict()
+        self._pending: dict[Hashable, Future] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def load(
+        self, key: Hashable, loader: Callable[[], object], size: Callable
+    ) -> object:
+        """
+        Returns the dataset memoized under `key`, loading it if needed.
+
+        Args:
+            key (Hashable): The key of the dataset.
+            loader (Callable): Loads the dataset.
+            size (Callable): Returns the memory taken by the dataset, in bytes.
+
+        Returns:
+            object: The dataset.
+        """
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return self._values[key][0]
+            future = self._pending.get(key)
+            loading = future is None
+            if loading:
+                future = self._pending[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not loading:
+            return future.result()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._pending[key]
+            self.store(key, value, size(value))
+        future.set_result(value)
+        return value
+
+    def peek(self, key: Hashable) -> Optional[object]:
+        """
+        Args:
+            key (Hashable): The key of the dataset.
+
+        Returns:
+            object: The dataset memoized under `key`, or None if it is not, without loading it.
+        """
+        with self._lock:
+            if key not in self._values:
+                return None
+            self._values.move_to_end(key)
+            self.hits += 1
+            return self._values[key][0]
+
+    def store(self, key: Hashable, value: object, nbytes: int):
+        """
+        Memoizes a dataset, evicting the least recently used ones to stay within `max_bytes`.
+        Must be called with the lock held.
+
+        Args:
+            key (Hashable): The key of the dataset.
+            value (object): The dataset.
+            nbytes (int): The memory taken by the dataset. Datasets larger than `max_bytes` are not kept.
+        """
+        if nbytes > self.max_bytes:
+            return
+        self._values[key] = (value, nbytes)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._values.popitem(last=False)
+            self._bytes -= evicted
+
+    def clear(self):
+        """
+        Forgets every memoized dataset, e.g. to see changes made since they were fetched.
+        """
+        with self._lock:
+            self._values.clear()
+            self._bytes = 0
+
+    def prefetch(self, login: str):
+        """
+        Starts fetching the data of a login in the background, if the prefetcher is enabled.
+
+        Args:
+            login (str): The login of the user.
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.prefetch(login)
+
+    def get_user_id(self, login: str) -> int:
+        """
+        Args:
+            login (str): The login of the user.
+
+        Returns:
+            int: The ID of the user, see `Utils.get_user_id`.
+        """
+        return self.load(
+            ("user_id", login),
+            lambda: Utils.get_user_id(self.api, login),
+            lambda _: 0,
+        )
+
+    def get_campus_id(self, user_id: int) -> int:
+        """
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            int: The ID of the primary campus of the user, see `Utils.get_campus_id`.
+        """
+        return self.load(
+            ("campus_id", user_id),
+            lambda: Utils.get_campus_id(self.api, user_id),
+            lambda _: 0,
+        )
+
+    def get_projects_users(self, user_id: int) -> list:
+        """
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list: The projects_users of the user, see `Utils.get_teams_for_user`.
+        """
+        return self.load(
+            ("projects_users", user_id),
+            lambda: Utils.get_teams_for_user(self.api, user_id),
+            lambda records: len(records) * self.RECORD_BYTES,
+        )
+
+    def get_evaluation_table(
+        self, user_id: int, side: str, spinner: Optional[Spinner] = None
+    ) -> "pa.Table":
+        """
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+
+        Returns:
+            pa.Table: Every evaluation of the user, see `Utils.get_evaluation_table`.
+        """
+        return self.load(
+            ("evaluations", user_id, side),
+            lambda: Utils.get_evaluation_table(self.api, user_id, side, spinner),
+            lambda table: table.nbytes,
+        )
+
+    def get_evaluation_buckets(
+        self, user_id: int, side: str, spinner: Optional[Spinner] = None
+    ) -> "EvaluationBuckets":
+        """
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+
+        Returns:
+            EvaluationBuckets: The monthly aggregates of the evaluations of the user, read from
+                               Utils.evaluation_store if it is set, or else computed from the
+                               evaluations held in memory.
+        """
+
+        def load() -> "EvaluationBuckets":
+            if Utils.evaluation_store is not None:
+                return Utils.get_evaluation_buckets(self.api, user_id, side, spinner)
+
+            from src.evaluation_buckets import EvaluationBuckets
+
+            table = self.get_evaluation_table(user_id, side, spinner)
+            with Utils.phase("aggregate"):
+                return EvaluationBuckets.from_table(table)
+
+        return self.load(
+            ("buckets", user_id, side),
+            load,
+            lambda buckets: int(buckets.frame.memory_usage().sum()),
+        )
+
+    def iter_evaluations(
+        self,
+        user_id: int,
+        side: str,
+        spinner: Optional[Spinner] = None,
+        columns: Optional[list[str]] = None,
+        batch_size: int = 10_000,
+    ) -> Iterator["pd.DataFrame"]:
+        """
+        Streams the evaluations of a user. When they are memoized they are sliced from memory,
+        otherwise the pages are streamed through `Utils.iter_evaluations` without being kept,
+        so memory stays flat and batches arrive while later pages are being fetched.
+
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+            columns (list[str], optional): The columns to return. Defaults to all of them.
+            batch_size (int, optional): The maximum number of rows per batch sliced from memory. Defaults to 10000.
+
+        Yields:
+            pd.DataFrame: The evaluations, one batch at a time, see `Utils.iter_evaluations`.
+        """
+        table = self.peek(("evaluations", user_id, side))
+        if table is None:
+            yield from Utils.iter_evaluations(self.api, user_id, side, spinner, columns)
+            return
+
+        for batch in table.select(columns or table.column_names).to_batches(batch_size):
+            with Utils.phase("build"):
+                frame = batch.to_pandas()
+            yield frame
@@ -0,0 +1,222 @@
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+import pyarrow as pa
+
+from src.config import get_env_int
+
+# The workers only import this module, pandas is only needed to assemble the results.
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def get_runs(keys: np.ndarray) -> np.ndarray:
+    """
+    Args:
+        keys (np.ndarray): Keys, with equal keys contiguous.
+
+    Returns:
+        np.ndarray: The index where each run of equal keys starts.
+    """
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def key_moments(
+    keys: np.ndarray, values: np.ndarray, upper: Optional[float] = None
+) -> tuple[np.ndarray, ...]:
+    """
+    Reduces values to their moments per key, like RunningStats does per user.
+
+    Args:
+        keys (np.ndarray): The key of each value, with equal keys contiguous.
+        values (np.ndarray): The values (float64). NaN values are counted as rows, but left
+                             out of the moments.
+        upper (float, optional): The value values are clipped to before being reduced. Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, ...]: The keys, and for each key the number of rows, the number of
+                                values, their mean (NaN without values) and their sum of
+                                squared differences from the mean.
+    """
+    if not len(keys):
+        empty = np.array([], np.float64)
+        return keys, keys, keys, empty, empty
+    if upper is not None:
+        values = np.minimum(values, upper)
+    starts = get_runs(keys)
+    rows = np.diff(np.r_[starts, len(keys)])
+    marked = ~np.isnan(values)
+    counts = np.add.reduceat(marked.astype(np.int64), starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.add.reduceat(np.where(marked, values, 0), starts) / counts
+    deviations = np.where(marked, values - np.repeat(means, rows), 0)
+    m2s = np.add.reduceat(deviations**2, starts)
+    return keys[starts], rows, counts, means, m2s
+
+
+def reduce_files(
+    files: list[tuple[int, str]], value: str, upper: Optional[float]
+) -> tuple[np.ndarray, ...]:
+    """
+    Reads one column of Parquet files and runs `key_moments` on it, in a worker.
+
+    Each worker reads its own files, so only the paths are sent to it and only the
+    moments are sent back.
+
+    Args:
+        files (list[tuple[int, str]]): The key of each file and its path. Missing files are skipped.
+        value (str): The column holding the values.
+        upper (float, optional): See `key_moments`.
+
+    Returns:
+        tuple[np.ndarray, ...]: See `key_moments`.
+    """
+    import pyarrow.parquet as pq
+
+    keys, values = [], []
+    for key, path in files:
+        if not os.path.exists(path):
+            continue
+        # ParquetFile skips the dataset discovery of pq.read_table, several times faster
+        # on the small files of a store. The shards already run in parallel.
+        column = (
+            pq.ParquetFile(path).read(columns=[value], use_threads=False).column(value)
+        )
+        # Missing values become NaN, so the column converts to numpy without a mask.
+        values.append(column.cast(pa.float64()).fill_null(np.nan).to_numpy())
+        keys.append(np.full(len(column), key, np.int64))
+    if not keys:
+        return key_moments(np.array([], np.int64), np.array([], np.float64))
+    return key_moments(np.concatenate(keys), np.concatenate(values), upper)
+
+
+class ShardedAggregator:
+    """
+    Reduces campus-scale data on every core, by key (e.g. per user or per project).
+
+    The data is read from Parquet files holding one key each, like the files of
+    EvaluationStore. The files are cut into shards of similar size, and every shard is
+    read and reduced by one worker, so each key is reduced exactly once and the results
+    only have to be concatenated. The time goes into opening each file far more than into
+    its rows, so below MIN_PARALLEL_FILES the workers are threads. From there they are
+    processes, which also run the per-file Python work in parallel, but each takes about
+    0.3s to start.
+
+    Attributes:
+        MIN_PARALLEL_FILES (int): The number of files from which worker processes are used.
+                                  Measured with `python -m benchmarks.suite --aggregation`.
+        SHARDS_PER_WORKER (int): The number of shards per worker, to even out their load.
+        workers (int): The number of workers.
+    """
+
+    MIN_PARALLEL_FILES = 2000
+    SHARDS_PER_WORKER = 4
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Initializes a new instance of the ShardedAggregator class.
+
+        Args:
+            workers (int, optional): The number of workers. Defaults to AGGREGATION_WORKERS,
+                                     or the number of CPUs.
+        """
+        self.workers = workers or get_env_int(
+            "AGGREGATION_WORKERS", os.cpu_count() or 1
+        )
+
+    def get_shards(
+        self, files: list[tuple[int, str]], sizes: list[int]
+    ) -> list[list[tuple[int, str]]]:
+        """
+        Args:
+            files (list[tuple[int, str]]): The key of each file and its path.
+            sizes (list[int]): The size of each file, in bytes.
+
+        Returns:
+            list[list[tuple[int, str]]]: Consecutive runs of files of about the same total size.
+        """
+        shards = self.workers * self.SHARDS_PER_WORKER
+        ends = np.cumsum(sizes)
+        targets = np.linspace(0, ends[-1] if len(ends) else 0, shards + 1)[1:-1]
+        cuts = np.unique(np.r_[0, np.searchsorted(ends, targets) + 1, len(files)])
+        return [
+            files[start:stop]
+            for start, stop in zip(cuts[:-1].tolist(), cuts[1:].tolist())
+            if start < stop
+        ]
+
+    def moments(
+        self,
+        files: list[tuple[int, str]],
+        value: str,
+        upper: Optional[float] = None,
+        key: str = "user_id",
+        processes: Optional[bool] = None,
+    ) -> "pd.DataFrame":
+        """
+        Computes the count, mean and standard deviation of a column per key.
+
+        Args:
+            files (list[tuple[int, str]]): The key of each Parquet file and its path, the
+                                           files of a key next to each other.
+            value (str): The column to reduce, e.g. "final_mark".
+            upper (float, optional): The value values are clipped to first. Defaults to None.
+            key (str, optional): The name of the index of the result. Defaults to "user_id".
+            processes (bool, optional): Whether the workers are processes. Defaults to whether
+                                        there are at least MIN_PARALLEL_FILES files.
+
+        Returns:
+            pd.DataFrame: Indexed by key, the number of rows of each key, and the number of
+                          values ("count"), their mean and their sample standard deviation,
+                          NaN where they are not defined.
+        """
+        import pandas as pd
+
+        sizes = [
+            os.path.getsize(path) if os.path.exists(path) else 0 for _, path in files
+        ]
+        shards = self.get_shards(files, sizes)
+        if processes is None:
+            processes = self.workers > 1 and len(files) >= self.MIN_PARALLEL_FILES
+
+        if len(shards) <= 1:
+            parts = [reduce_files(files, value, upper)]
+        else:
+            with self.get_executor(processes, len(shards)) as executor:
+                parts = list(
+                    executor.map(
+                        reduce_files,
+                        shards,
+                        [value] * len(shards),
+                        [upper] * len(shards),
+                    )
+                )
+
+        keys, rows, counts, means, m2s = map(np.concatenate, zip(*parts))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(np.where(counts > 1, m2s / (counts - 1), np.nan))
+        return pd.DataFrame(
+            {"rows": rows, "count": counts, "mean": means, "std": std},
+            index=pd.Index(keys.astype(np.int64), name=key),
+        )
+
+    def get_executor(self, processes: bool, shards: int) -> Executor:
+        """
+        Args:
+            processes (bool): Whether the workers are processes rather than threads.
+            shards (int): The number of shards to reduce.
+
+        Returns:
+            Executor: The pool the shards are reduced in.
+        """
+        workers = min(self.workers, shards)
+        if not processes:
+            return ThreadPoolExecutor(workers, thread_name_prefix="aggregate")
+        # Workers are spawned rather than forked, the parent has threads running
+        # (token refresh, prefetches) that a fork would copy in an unknown state.
+        return ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn")
+        )
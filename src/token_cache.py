@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from src.config import get_api_url, get_cache_dir
+
+
+class TokenCache:
+    """
+    A local credential cache for access tokens, keyed by API URL and application UID.
+
+    The file is only readable by its owner. Tokens are stored with their absolute
+    expiry time (`expires_at`), and are only handed out while they are still valid
+    for at least `min_validity` seconds.
+    """
+
+    def __init__(self, path: Optional[str] = None, min_validity: int = 60):
+        """
+        Initializes a new instance of the TokenCache class.
+
+        Args:
+            path (str, optional): The path of the cache file. Defaults to token.json in the cache directory.
+            min_validity (int, optional): The number of seconds a cached token must still be valid for. Defaults to 60.
+        """
+        self.path = path or os.path.join(get_cache_dir(), "token.json")
+        self.min_validity = min_validity
+        self._lock = threading.Lock()
+
+    def load(self, client_id: str) -> Optional[dict]:
+        """
+        Loads the cached token of an application.
+
+        Args:
+            client_id (str): The UID of the application.
+
+        Returns:
+            dict: The token, or None if there is no cached token or it expires too soon.
+        """
+        with self._lock:
+            token = self._read().get(self.get_key(client_id))
+
+        if not token or token.get("expires_at", 0) - time.time() < self.min_validity:
+            return None
+        return token
+
+    def save(self, client_id: str, token: dict):
+        """
+        Stores the token of an application.
+
+        Args:
+            client_id (str): The UID of the application.
+            token (dict): The token, as returned by OAuth2Session.fetch_token.
+        """
+        with self._lock:
+            tokens = self._read()
+            tokens[self.get_key(client_id)] = dict(token)
+            self._write(tokens)
+
+    def drop(self, client_id: str):
+        """
+        Removes the token of an application, e.g. once the API rejected it.
+
+        Args:
+            client_id (str): The UID of the application.
+        """
+        with self._lock:
+            tokens = self._read()
+            if tokens.pop(self.get_key(client_id), None) is not None:
+                self._write(tokens)
+
+    @staticmethod
+    def get_key(client_id: str) -> str:
+        """
+        Args:
+            client_id (str): The UID of the application.
+
+        Returns:
+            str: The key of its token, for the API currently in use: a token of one server
+                 is never sent to another.
+        """
+        return f"{get_api_url()} {client_id}"
+
+    def _write(self, tokens: dict):
+        # mkstemp creates the file readable by its owner only.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+        with os.fdopen(fd, "w") as f:
+            json.dump(tokens, f)
+        os.replace(tmp_path, self.path)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
@@ -0,0 +1,199 @@
+import contextlib
+import contextvars
+import json
+import logging
+import re
+import statistics
+import threading
+import time
+from collections import defaultdict
+from typing import Iterator, Optional
+from urllib.parse import urlsplit
+
+
+class Tracer:
+    """
+    Collects timings of API requests and module phases, for an end-of-run summary or a JSON trace.
+
+    Every request made through `Utils.make_request_with_backoff` is recorded with its URL
+    template, page, latency, bytes, status, retries, time slept on 429s and cache outcome.
+    Phases (fetch, build, aggregate, render) are timed with `phase`, and attributed to the
+    module set with `Tracer.module` in the current context. Each record is also logged to the
+    "logs" logger at DEBUG level.
+
+    Attributes:
+        MODULE (contextvars.ContextVar): The module the current context works for. Thread pools
+                                         carry it over by running tasks in a copy of the context.
+        requests (list[dict]): The recorded requests, in completion order.
+        phases (list[dict]): The recorded phases, in completion order.
+    """
+
+    MODULE: contextvars.ContextVar = contextvars.ContextVar("module", default=None)
+
+    def __init__(self):
+        self.requests: list[dict] = []
+        self.phases: list[dict] = []
+        self.started_at = time.time()
+        self.logs = logging.getLogger("logs")
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_template(url: str) -> str:
+        """
+        Replaces the IDs and logins in the path of a URL with placeholders, so requests can be grouped by endpoint.
+
+        Args:
+            url (str): The URL of a request.
+
+        Returns:
+            str: The path template, e.g. "/v2/users/{id}/scale_teams/as_corrector".
+        """
+        path = re.sub(r"/\d+(?=/|$)", "/{id}", urlsplit(url).path)
+        return re.sub(r"^/v2/users/(?!\{id\})[^/]+$", "/v2/users/{login}", path)
+
+    def record_request(
+        self,
+        url: str,
+        params: Optional[dict],
+        status: Optional[int],
+        latency: float,
+        size: int,
+        retries: int = 0,
+        rate_limit_sleep: float = 0.0,
+        cache: str = "miss",
+    ):
+        """
+        Records a request.
+
+        Args:
+            url (str): The URL of the request.
+            params (dict, optional): The query parameters of the request.
+            status (int, optional): The status of the final response, None if there was none.
+            latency (float): The seconds between the start of the request and its result, retries included.
+            size (int): The number of body bytes of the final response.
+            retries (int, optional): The number of retried attempts. Defaults to 0.
+            rate_limit_sleep (float, optional): The seconds slept because of 429s. Defaults to 0.
+            cache (str, optional): "hit", "revalidated" or "miss". Defaults to "miss".
+        """
+        record = {
+            "at": round(time.perf_counter() - self._start, 6),
+            "module": self.MODULE.get(),
+            "template": self.get_template(url),
+            "page": (params or {}).get("page"),
+            "status": status,
+            "latency": round(latency, 6),
+            "bytes": size,
+            "retries": retries,
+            "rate_limit_sleep": round(rate_limit_sleep, 6),
+            "cache": cache,
+        }
+        with self._lock:
+            self.requests.append(record)
+        self.logs.debug(f"request {json.dumps(record)}")
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Times a phase of the current module.
+
+        Args:
+            name (str): The name of the phase, e.g. "fetch", "build", "aggregate" or "render".
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {
+                "at": round(start - self._start, 6),
+                "module": self.MODULE.get(),
+                "phase": name,
+                "seconds": round(time.perf_counter() - start, 6),
+            }
+            with self._lock:
+                self.phases.append(record)
+            self.logs.debug(f"phase {json.dumps(record)}")
+
+    @staticmethod
+    @contextlib.contextmanager
+    def module(name: str) -> Iterator[None]:
+        """
+        Attributes the requests and phases of the current context to a module.
+
+        Args:
+            name (str): The name of the module.
+        """
+        token = Tracer.MODULE.set(name)
+        try:
+            yield
+        finally:
+            Tracer.MODULE.reset(token)
+
+    @staticmethod
+    def percentile(values: list[float], q: float) -> float:
+        """
+        Args:
+            values (list[float]): The values, sorted.
+            q (float): The percentile to compute, between 0 and 100.
+
+        Returns:
+            float: The percentile, interpolated linearly between the closest values like numpy.percentile.
+        """
+        rank = (len(values) - 1) * q / 100
+        low = int(rank)
+        high = min(low + 1, len(values) - 1)
+        return values[low] + (values[high] - values[low]) * (rank - low)
+
+    def summary(self) -> str:
+        """
+        Returns:
+            str: A table of the requests per URL template and of the phases per module.
+        """
+        with self._lock:
+            requests, phases = list(self.requests), list(self.phases)
+
+        lines = [f"run time {time.perf_counter() - self._start:.2f}s", ""]
+
+        by_template = defaultdict(list)
+        for request in requests:
+            by_template[request["template"]].append(request)
+        lines.append(
+            f"{'endpoint':<42} {'requests':>8} {'cached':>6} {'mean':>8} {'p95':>8} "
+            f"{'MB':>7} {'retries':>7} {'429 wait':>9}"
+        )
+        for template, records in sorted(by_template.items()):
+            latencies = sorted(r["latency"] for r in records)
+            lines.append(
+                f"{template:<42} {len(records):>8} "
+                f"{sum(r['cache'] != 'miss' for r in records):>6} "
+                f"{statistics.fmean(latencies):>7.3f}s {self.percentile(latencies, 95):>7.3f}s "
+                f"{sum(r['bytes'] for r in records) / 2**20:>7.2f} "
+                f"{sum(r['retries'] for r in records):>7} "
+                f"{sum(r['rate_limit_sleep'] for r in records):>8.2f}s"
+            )
+
+        by_phase = defaultdict(float)
+        for phase in phases:
+            by_phase[(phase["module"] or "-", phase["phase"])] += phase["seconds"]
+        lines += ["", f"{'module':<30} {'phase':<12} {'time':>9}"]
+        for (module, name), seconds in sorted(by_phase.items()):
+            lines.append(f"{module:<30} {name:<12} {seconds:>8.3f}s")
+
+        return "\n".join(lines)
+
+    def save(self, path: str):
+        """
+        Saves every record as a JSON trace.
+
+        Args:
+            path (str): The file to save the trace to.
+        """
+        with self._lock:
+            trace = {
+                "started_at": self.started_at,
+                "duration": time.perf_counter() - self._start,
+                "requests": list(self.requests),
+                "phases": list(self.phases),
+            }
+        with open(path, "w") as f:
+            json.dump(trace, f, indent=1)
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional
+
+from src.config import get_cache_dir
+
+
+class UserIndex:
+    """
+    A persistent two-way index between user logins and IDs, backed by SQLite.
+
+    Logins and IDs of intra users do not change, so entries never expire.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initializes a new instance of the UserIndex class.
+
+        Args:
+            path (str, optional): The path of the SQLite database, or ":memory:" for an index
+                                  that only lives as long as the process. Defaults to users.sqlite3
+                                  in the cache directory.
+        """
+        self.path = path or os.path.join(get_cache_dir(), "users.sqlite3")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, login TEXT NOT NULL UNIQUE)"
+        )
+        self._db.commit()
+
+    def add(self, users: Iterable[dict]):
+        """
+        Adds users to the index.
+
+        Args:
+            users (Iterable[dict]): User records as returned by the API. Records without both an "id"
+                                    and a "login" are ignored.
+        """
+        rows = [
+            (user["id"], user["login"])
+            for user in users
+            if user.get("id") is not None and user.get("login")
+        ]
+        with self._lock:
+            # A login can be reassigned to a new account, the newest id wins.
+            self._db.executemany(
+                "DELETE FROM users WHERE login = ? AND id != ?",
+                [(login, id) for id, login in rows],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO users (id, login) VALUES (?, ?)", rows
+            )
+            self._db.commit()
+
+    def get_ids(self, logins: Iterable[str]) -> dict[str, int]:
+        """
+        Looks up the IDs of logins.
+
+        Args:
+            logins (Iterable[str]): The logins to look up.
+
+        Returns:
+            dict[str, int]: The IDs of the logins that are in the index.
+        """
+        logins = list(logins)
+        ids = {}
+        with self._lock:
+            for start in range(0, len(logins), 500):
+                chunk = logins[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                ids.update(
+                    self._db.execute(
+                        f"SELECT login, id FROM users WHERE login IN ({placeholders})",
+                        chunk,
+                    ).fetchall()
+                )
+        return ids
+
+    def get_id(self, login: str) -> Optional[int]:
+        """
+        Args:
+            login (str): The login of the user.
+
+        Returns:
+            int: The ID of the user, or None if it is not in the index.
+        """
+        return self.get_ids([login]).get(login)
+
+    def get_login(self, id: int) -> Optional[str]:
+        """
+        Args:
+            id (int): The ID of the user.
+
+        Returns:
+            str: The login of the user, or None if it is not in the index.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT login FROM users WHERE id = ?", (id,)
+            ).fetchone()
+        return row[0] if row else None
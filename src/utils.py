@@ -1,12 +1,32 @@
+import contextlib
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import logging
+import math
 import os
 import sys
-from typing import Optional
+from typing import TYPE_CHECKING, ContextManager, Iterator, Optional
+import requests
 from requests_oauthlib import OAuth2Session
-import pandas as pd
-import json
 import time
-from simple_term_menu import TerminalMenu
+from src.cache import ResponseCache
+from src.config import get_api_url
+from src.evaluation_store import EvaluationStore
+from src.rate_limiter import RateLimiter
 from src.Spinner import Spinner
+from src.tracer import Tracer
+from src.user_index import UserIndex
+
+# pandas and the records pull in numpy and pyarrow, which only the modules working on
+# evaluations need. They are imported where they are used, to keep startup fast.
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+    from src.evaluation_buckets import EvaluationBuckets
+    from src.evaluation_records import EvaluationRecords
 
 
 def clear_terminal():
@@ -44,6 +64,8 @@ def prompt_select(options: list, **kwargs):
     Returns:
         str: The selected option.
     """
+    from simple_term_menu import TerminalMenu
+
     menu = TerminalMenu(
         options,
         menu_cursor="❯ ",
@@ -61,38 +83,63 @@ def prompt_select(options: list, **kwargs):
 
 
 class Utils:
+    """
+    Helpers for fetching data from the 42 intra API.
+
+    Attributes:
+        PER_PAGE (int): The page size requested from paginated endpoints (100 is the API maximum).
+        PAGE_WORKERS (int): The number of pages fetched in parallel. The request rate itself
+                            is bounded by the rate limiter of the session.
+        RANGE_END (str): The upper bound used for open-ended range[...] filters.
+        cache (ResponseCache, optional): The response cache used by make_request_with_backoff.
+                                         Disabled when None.
+        evaluation_store (EvaluationStore, optional): The store used for incremental evaluation
+                                                      syncs. Disabled when None.
+        user_index (UserIndex, optional): The login/ID index used to resolve logins. Disabled when None.
+        tracer (Tracer, optional): Records requests and phase timings. Disabled when None.
+    """
+
+    PER_PAGE = 100
+    PAGE_WORKERS = 4
+    RANGE_END = "2100-01-01T00:00:00.000Z"
+    cache: Optional[ResponseCache] = None
+    evaluation_store: Optional[EvaluationStore] = None
+    user_index: Optional[UserIndex] = None
+    tracer: Optional[Tracer] = None
+
     def __init__(self) -> None:
         pass
 
     @staticmethod
-    def get_active_users_for_campus(api: OAuth2Session, campus_id: int) -> list:
+    def get_campus_users(api: OAuth2Session, campus_id: int) -> list:
         """
-        Retrieves the list of active users for a given campus.
+        Retrieves the active users of a given campus.
 
         Args:
             api (OAuth2Session): The OAuth2Session object for making API requests.
             campus_id (int): The ID of the campus.
 
         Returns:
-            list: The list of active users.
+            list: The active users as returned by the API, including their ID and login.
         """
-        users = []
-        page = 1
-        while True:
-            params = {"page": page, "per_page": 100}
-            response = api.get(
-                f"https://api.intra.42.fr/v2/campus/{campus_id}/users", params=params
-            )
-            data = response.json()
+        data = Utils.get_all_pages(api, f"{get_api_url()}/v2/campus/{campus_id}/users")
+        if Utils.user_index is not None:
+            Utils.user_index.add(data)
+        return [user for user in data if user.get("active?", False)]
 
-            if not data:
-                break
+    @staticmethod
+    def get_active_users_for_campus(api: OAuth2Session, campus_id: int) -> list:
+        """
+        Retrieves the list of active users for a given campus.
 
-            for user in data:
-                if user.get("active?", False):
-                    users.append(user["login"])
+        Args:
+            api (OAuth2Session): The OAuth2Session object for making API requests.
+            campus_id (int): The ID of the campus.
 
-            page += 1
+        Returns:
+            list: The list of active users.
+        """
+        users = [user["login"] for user in Utils.get_campus_users(api, campus_id)]
 
         users = sorted(users)
 
@@ -107,6 +154,8 @@ class Utils:
         """
         Retrieves the ID of a user based on their login.
 
+        The ID is looked up in Utils.user_index first, if set, and added to it when it had to be fetched.
+
         Args:
             api (OAuth2Session): The OAuth2Session object for making API requests.
             login (str): The login of the user.
@@ -119,52 +168,299 @@ class Utils:
         """
         if not login or len(login) < 3:
             raise Exception("user not found")
-        response = api.get(f"https://api.intra.42.fr/v2/users/{login}")
+
+        if Utils.user_index is not None:
+            id = Utils.user_index.get_id(login)
+            if id is not None:
+                return id
+
+        response = Utils.make_request_with_backoff(
+            api, f"{get_api_url()}/v2/users/{login}", params={}
+        )
         user = response.json()
         id = user.get("id")
         if id is None:
             raise Exception("user not found")
+
+        if Utils.user_index is not None:
+            Utils.user_index.add([user])
         return id
 
+    @staticmethod
+    def get_user_ids(api: OAuth2Session, logins: list[str]) -> dict[str, int]:
+        """
+        Retrieves the IDs of many users at once.
+
+        Logins missing from Utils.user_index are resolved with bulk
+        `filter[login]=a,b,c` queries of up to Utils.PER_PAGE logins each.
+
+        Args:
+            api (OAuth2Session): The OAuth2Session object for making API requests.
+            logins (list[str]): The logins of the users.
+
+        Returns:
+            dict[str, int]: The IDs of the logins that exist. Unknown logins are left out.
+        """
+        logins = list(dict.fromkeys(logins))
+        ids = Utils.user_index.get_ids(logins) if Utils.user_index is not None else {}
+
+        missing = [login for login in logins if login not in ids]
+        for start in range(0, len(missing), Utils.PER_PAGE):
+            chunk = missing[start : start + Utils.PER_PAGE]
+            users = Utils.get_all_pages(
+                api,
+                f"{get_api_url()}/v2/users",
+                params={"filter[login]": ",".join(chunk)},
+            )
+            if Utils.user_index is not None:
+                Utils.user_index.add(users)
+            ids.update(
+                (user["login"], user["id"]) for user in users if user["login"] in chunk
+            )
+
+        return ids
+
     @staticmethod
     def get_evaluations_for_user(
-        api: OAuth2Session, user_id: int, side: str, spinner: Optional[Spinner] = None
-    ) -> pd.DataFrame:
+        api: OAuth2Session,
+        user_id: int,
+        side: str,
+        spinner: Optional[Spinner] = None,
+        columns: Optional[list[str]] = None,
+    ) -> "pd.DataFrame":
         """
-        Retrieves the evaluations for a user.
+        Retrieves the evaluations for a user, normalized into the columns of EvaluationStore.SCHEMA.
+
+        If Utils.evaluation_store is set, only the evaluations updated since the
+        last sync of this (user, side) are fetched and merged into the store, and
+        the result is read back from the store.
 
         Args:
             api (OAuth2Session): The OAuth2Session object for making API requests.
             user_id (int): The ID of the user.
-            side (str): The side of the evaluations (e.g., "beginner", "advanced").
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
             spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+            columns (list[str], optional): The columns to return. Defaults to all of them.
 
         Returns:
             pd.DataFrame: The evaluations as a pandas DataFrame.
         """
-        evaluations = []
-        page = 1
+        table = Utils.get_evaluation_table(api, user_id, side, spinner, columns)
+        with Utils.phase("build"):
+            return table.to_pandas()
 
-        while True:
-            response = Utils.make_request_with_backoff(
-                api,
-                f"https://api.intra.42.fr/v2/users/{user_id}/scale_teams/{side}",
-                params={"page": page, "per_page": 100},
-                spinner=spinner,
+    @staticmethod
+    def get_evaluation_table(
+        api: OAuth2Session,
+        user_id: int,
+        side: str,
+        spinner: Optional[Spinner] = None,
+        columns: Optional[list[str]] = None,
+    ) -> "pa.Table":
+        """
+        Retrieves the evaluations for a user as an Arrow table with the columns of EvaluationStore.SCHEMA.
+
+        Like `get_evaluations_for_user`, the evaluations are synced into Utils.evaluation_store
+        and read back from it if it is set.
+
+        Args:
+            api (OAuth2Session): The OAuth2Session object for making API requests.
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+            columns (list[str], optional): The columns to return. Defaults to all of them.
+
+        Returns:
+            pa.Table: The evaluations.
+        """
+        if Utils.evaluation_store is None:
+            with Utils.phase("fetch"):
+                evaluations = Utils.get_all_pages(
+                    api, Utils.get_evaluations_url(user_id, side), spinner=spinner
+                )
+            with Utils.phase("build"):
+                table = EvaluationStore.normalize(evaluations)
+                return table.select(columns or table.column_names)
+
+        with Utils.phase("fetch"):
+            Utils.sync_evaluations(api, user_id, side, spinner)
+        with Utils.phase("build"):
+            return Utils.evaluation_store.read_table(user_id, side, columns)
+
+    @staticmethod
+    def get_evaluation_buckets(
+        api: OAuth2Session,
+        user_id: int,
+        side: str,
+        spinner: Optional[Spinner] = None,
+    ) -> "EvaluationBuckets":
+        """
+        Retrieves the monthly aggregates of the evaluations for a user.
+
+        If Utils.evaluation_store is set, the store is synced and the aggregates it keeps
+        are read back, without reading the evaluations themselves.
+
+        Args:
+            api (OAuth2Session): The OAuth2Session object for making API requests.
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+
+        Returns:
+            EvaluationBuckets: The monthly aggregates.
+        """
+        from src.evaluation_buckets import EvaluationBuckets
+
+        if Utils.evaluation_store is None:
+            table = Utils.get_evaluation_table(api, user_id, side, spinner)
+            with Utils.phase("aggregate"):
+                return EvaluationBuckets.from_table(table)
+
+        with Utils.phase("fetch"):
+            Utils.sync_evaluations(api, user_id, side, spinner)
+        with Utils.phase("build"):
+            return Utils.evaluation_store.read_buckets(user_id, side)
+
+    @staticmethod
+    def get_evaluation_records(
+        api: OAuth2Session,
+        user_id: int,
+        side: str,
+        spinner: Optional[Spinner] = None,
+        keep_raw: bool = False,
+    ) -> "EvaluationRecords":
+        """
+        Retrieves the evaluations for a user as compact EvaluationRecords, for holding many users in memory.
+
+        Args:
+            api (OAuth2Session): The OAuth2Session object for making API requests.
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+            keep_raw (bool, optional): Whether to keep the raw scale_teams too. Only the full history
+                                       has them, so they are not kept when Utils.evaluation_store is set.
+                                       Defaults to False.
+
+        Returns:
+            EvaluationRecords: The evaluations.
+        """
+        from src.evaluation_records import EvaluationRecords
+
+        if Utils.evaluation_store is None:
+            with Utils.phase("fetch"):
+                evaluations = Utils.get_all_pages(
+                    api, Utils.get_evaluations_url(user_id, side), spinner=spinner
+                )
+            with Utils.phase("build"):
+                return EvaluationRecords.from_scale_teams(evaluations, keep_raw)
+
+        with Utils.phase("fetch"):
+            Utils.sync_evaluations(api, user_id, side, spinner)
+        with Utils.phase("build"):
+            return EvaluationRecords.from_table(
+                Utils.evaluation_store.read_table(user_id, side)
             )
-            response.raise_for_status()
 
-            data = response.json()
-            if not data:
-                break
+    @staticmethod
+    def iter_evaluations(
+        api: OAuth2Session,
+        user_id: int,
+        side: str,
+        spinner: Optional[Spinner] = None,
+        columns: Optional[list[str]] = None,
+    ) -> Iterator["pd.DataFrame"]:
+        """
+        Streams the evaluations for a user in batches, normalized into the columns of EvaluationStore.SCHEMA.
 
-            evaluations.extend(data)
-            page += 1
+        Without Utils.evaluation_store, each page is yielded as soon as it arrives. With it,
+        the store is synced first, then read back in batches. Either way only one batch
+        is held in memory at a time.
+
+        Args:
+            api (OAuth2Session): The OAuth2Session object for making API requests.
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+            columns (list[str], optional): The columns to return. Defaults to all of them.
+
+        Yields:
+            pd.DataFrame: The evaluations, one batch at a time.
+        """
+        if Utils.evaluation_store is None:
+            pages = Utils.iter_pages(
+                api, Utils.get_evaluations_url(user_id, side), spinner=spinner
+            )
+            while True:
+                with Utils.phase("fetch"):
+                    page = next(pages, None)
+                if page is None:
+                    return
+                with Utils.phase("build"):
+                    table = EvaluationStore.normalize(page)
+                    batch = table.select(columns or table.column_names).to_pandas()
+                yield batch
+
+        with Utils.phase("fetch"):
+            Utils.sync_evaluations(api, user_id, side, spinner)
+        batches = Utils.evaluation_store.iter_batches(user_id, side, columns)
+        while True:
+            with Utils.phase("build"):
+                batch = next(batches, None)
+            if batch is None:
+                return
+            yield batch
+
+    @staticmethod
+    def sync_evaluations(
+        api: OAuth2Session, user_id: int, side: str, spinner: Optional[Spinner] = None
+    ):
+        """
+        Fetches the evaluations for a user updated since the last sync, and merges them into Utils.evaluation_store.
 
-        with open(f"{side}.json", "w") as f:
-            json.dump(evaluations, f, indent=4)
-        df = pd.DataFrame(evaluations)
-        return df
+        Args:
+            api (OAuth2Session): The OAuth2Session object for making API requests.
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+        """
+        updated = Utils.get_all_pages(
+            api,
+            Utils.get_evaluations_url(user_id, side),
+            params=Utils.get_sync_params(user_id, side),
+            spinner=spinner,
+        )
+        Utils.evaluation_store.merge(user_id, side, updated)
+
+    @staticmethod
+    def get_sync_params(user_id: int, side: str) -> dict:
+        """
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+
+        Returns:
+            dict: The parameters selecting the evaluations updated since the watermark of
+                  Utils.evaluation_store, or no parameters if nothing is stored yet.
+        """
+        watermark = Utils.evaluation_store.load_watermark(user_id, side)
+        if watermark is None:
+            return {}
+        return {
+            "range[updated_at]": f"{watermark},{Utils.RANGE_END}",
+            "sort": "updated_at",
+        }
+
+    @staticmethod
+    def get_evaluations_url(user_id: int, side: str) -> str:
+        """
+        Args:
+            user_id (int): The ID of the user.
+            side (str): The side of the evaluations ("as_corrector" or "as_corrected").
+
+        Returns:
+            str: The URL of the scale_teams of the user.
+        """
+        return f"{get_api_url()}/v2/users/{user_id}/scale_teams/{side}"
 
     @staticmethod
     def get_teams_for_user(api: OAuth2Session, user_id: int) -> list:
@@ -178,24 +474,161 @@ class Utils:
         Returns:
             list: The list of teams.
         """
-        teams = []
-        page = 1
+        teams = Utils.get_all_pages(
+            api, f"{get_api_url()}/v2/users/{user_id}/projects_users"
+        )
 
-        while True:
+        return teams
+
+    @staticmethod
+    def get_campus_id(api: OAuth2Session, user_id: int) -> int:
+        """
+        Retrieves the primary campus of a user.
+
+        Args:
+            api (OAuth2Session): The OAuth2Session object for making API requests.
+            user_id (int): The ID of the user.
+
+        Returns:
+            int: The ID of the campus.
+
+        Raises:
+            Exception: If the user has no campus.
+        """
+        response = Utils.make_request_with_backoff(
+            api, f"{get_api_url()}/v2/users/{user_id}", params={}
+        )
+        campus_users = response.json().get("campus_users") or []
+        for campus_user in sorted(
+            campus_users, key=lambda campus_user: not campus_user.get("is_primary")
+        ):
+            return campus_user["campus_id"]
+        raise Exception("campus not found")
+
+    @staticmethod
+    def get_page_count(response: requests.Response) -> Optional[int]:
+        """
+        Reads the number of pages of a paginated endpoint from the response headers.
+
+        Args:
+            response (requests.Response): Any page of the paginated endpoint.
+
+        Returns:
+            int: The number of pages, or None if the pagination headers are missing.
+        """
+        total = response.headers.get("X-Total")
+        per_page = response.headers.get("X-Per-Page")
+        if total is None or per_page is None or int(per_page) <= 0:
+            return None
+        return math.ceil(int(total) / int(per_page))
+
+    @staticmethod
+    def get_all_pages(
+        api: OAuth2Session,
+        url: str,
+        params: Optional[dict] = None,
+        spinner: Optional[Spinner] = None,
+        max_workers: Optional[int] = None,
+    ) -> list:
+        """
+        Retrieves every record of a paginated endpoint.
+
+        The first page is fetched on its own to read the total count from the
+        X-Total / X-Per-Page headers, the remaining pages are then fetched in
+        parallel. Records are returned in page order. If the API does not send
+        the pagination headers, pages are walked one at a time until an empty
+        page comes back.
+
+        Args:
+            api (OAuth2Session): The OAuth2Session object for making API requests.
+            url (str): The URL of the paginated endpoint.
+            params (dict, optional): Additional parameters for the request. Defaults to None.
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+            max_workers (int, optional): The maximum number of pages fetched at the same time. Defaults to Utils.PAGE_WORKERS.
+
+        Returns:
+            list: The records of all pages.
+        """
+        records = []
+        for page in Utils.iter_pages(api, url, params, spinner, max_workers):
+            records.extend(page)
+
+        return records
+
+    @staticmethod
+    def iter_pages(
+        api: OAuth2Session,
+        url: str,
+        params: Optional[dict] = None,
+        spinner: Optional[Spinner] = None,
+        max_workers: Optional[int] = None,
+    ) -> Iterator[list]:
+        """
+        Streams the pages of a paginated endpoint, in page order.
+
+        Works like `get_all_pages`, but yields each page as soon as it and the pages
+        before it have arrived. Only a bounded number of pages is fetched ahead of
+        the consumer, so memory use does not grow with the size of the endpoint.
+
+        Args:
+            api (OAuth2Session): The OAuth2Session object for making API requests.
+            url (str): The URL of the paginated endpoint.
+            params (dict, optional): Additional parameters for the request. Defaults to None.
+            spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+            max_workers (int, optional): The maximum number of pages fetched at the same time. Defaults to Utils.PAGE_WORKERS.
+
+        Yields:
+            list: The records of each non-empty page.
+        """
+        params = {**(params or {}), "per_page": Utils.PER_PAGE}
+        first_page = Utils.make_request_with_backoff(
+            api, url, params={**params, "page": 1}, spinner=spinner
+        )
+        first_page.raise_for_status()
+        # The pages cached with an older page 1 may not match its X-Total, records would be
+        # duplicated or dropped at page boundaries: they are only reused along with it.
+        revalidate = not getattr(first_page, "from_cache", False)
+
+        def fetch_page(page: int) -> list:
             response = Utils.make_request_with_backoff(
                 api,
-                f"https://api.intra.42.fr/v2/users/{user_id}/projects_users",
-                params={"page": page, "per_page": 100},
+                url,
+                params={**params, "page": page},
+                spinner=spinner,
+                revalidate=revalidate,
             )
             response.raise_for_status()
-
-            data = response.json()
-            if not data:
-                break
-            teams.extend(data)
-            page += 1
-
-        return teams
+            return response.json()
+
+        records = first_page.json()
+        if not records:
+            return
+        yield records
+
+        page_count = Utils.get_page_count(first_page)
+        if page_count is None:
+            page = 2
+            while data := fetch_page(page):
+                yield data
+                page += 1
+            return
+
+        max_workers = max_workers or Utils.PAGE_WORKERS
+        pages = iter(range(2, page_count + 1))
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers) as executor:
+            pending = deque(
+                executor.submit(context.copy().run, fetch_page, page)
+                for page in itertools.islice(pages, 2 * max_workers)
+            )
+            while pending:
+                data = pending.popleft().result()
+                for page in itertools.islice(pages, 1):
+                    pending.append(
+                        executor.submit(context.copy().run, fetch_page, page)
+                    )
+                if data:
+                    yield data
 
     @staticmethod
     def make_request_with_backoff(
@@ -204,9 +637,17 @@ class Utils:
         params: dict,
         max_retries: int = 5,
         spinner: Optional[Spinner] = None,
+        revalidate: bool = False,
     ):
         """
-        Makes a request to the API with exponential backoff for rate limiting.
+        Makes a request to the API with backoff for rate limiting.
+
+        On a 429, waits for the delay given in the Retry-After header, or for an
+        exponentially growing delay if the API did not send one.
+
+        If Utils.cache is set, fresh cached responses are returned without touching
+        the network, with `from_cache` set, and stale ones are revalidated with
+        If-None-Match when possible.
 
         Args:
             api (OAuth2Session): The OAuth2Session object for making API requests.
@@ -214,6 +655,7 @@ class Utils:
             params (dict): The parameters for the request.
             max_retries (int, optional): The maximum number of retries. Defaults to 5.
             spinner (Spinner, optional): The Spinner object for displaying a loading spinner. Defaults to None.
+            revalidate (bool, optional): Whether a fresh cached response is revalidated too. Defaults to False.
 
         Returns:
             requests.Response: The response object.
@@ -221,18 +663,180 @@ class Utils:
         Raises:
             Exception: If the request fails after the maximum number of retries.
         """
+        start = time.perf_counter()
+        cached, fresh = Utils.lookup_cache(url, params, revalidate)
+        if fresh:
+            Utils.trace_request(url, params, cached, start, cache="hit")
+            return cached
+
+        headers = Utils.get_revalidation_headers(cached)
         retry_wait = 1
+        slept = 0.0
         for attempt in range(max_retries):
-            response = api.get(url, params=params)
-            if response.status_code == 429:
-                if spinner is not None:
-                    spinner.status_message(
-                        f"Rate limit hit, retrying in {retry_wait} seconds..."
-                    )
-                else:
-                    print(f"Rate limit hit, retrying in {retry_wait} seconds...")
-                time.sleep(retry_wait)
-                retry_wait *= 2
-            else:
-                return response
+            response = api.get(url, params=params, headers=headers)
+            result = Utils.accept_response(
+                url, params, response, cached, start, attempt, slept
+            )
+            if result is not None:
+                return result
+            wait = Utils.get_backoff(response, retry_wait, spinner)
+            time.sleep(wait)
+            slept += wait
+            retry_wait *= 2
+        Utils.trace_request(url, params, response, start, max_retries - 1, slept)
         raise Exception(f"Request {url} failed after max retries")
+
+    @staticmethod
+    def lookup_cache(
+        url: str, params: Optional[dict], revalidate: bool = False
+    ) -> tuple[Optional[requests.Response], bool]:
+        """
+        Looks a request up in Utils.cache, if it is set.
+
+        Args:
+            url (str): The URL of the request.
+            params (dict, optional): The parameters of the request.
+            revalidate (bool, optional): Whether a fresh response is treated as stale. Defaults to False.
+
+        Returns:
+            tuple[requests.Response, bool]: The cached response, or None, and whether it is fresh
+                                            enough to be returned without touching the network,
+                                            which is also its `from_cache` attribute.
+        """
+        if Utils.cache is None:
+            return None, False
+        cached, fresh = Utils.cache.lookup(url, params)
+        fresh = fresh and not revalidate
+        if cached is not None:
+            cached.from_cache = fresh
+        return cached, fresh
+
+    @staticmethod
+    def get_revalidation_headers(cached: Optional[requests.Response]) -> dict:
+        """
+        Args:
+            cached (requests.Response, optional): The stale cached response of the request, if any.
+
+        Returns:
+            dict: The headers making the request conditional on the cached response being outdated.
+        """
+        if cached is not None and cached.headers.get("ETag"):
+            return {"If-None-Match": cached.headers["ETag"]}
+        return {}
+
+    @staticmethod
+    def accept_response(
+        url: str,
+        params: Optional[dict],
+        response: requests.Response,
+        cached: Optional[requests.Response],
+        start: float,
+        attempt: int,
+        slept: float,
+    ) -> Optional[requests.Response]:
+        """
+        Decides what a request made by make_request_with_backoff returns, and records it in
+        Utils.cache and Utils.tracer.
+
+        Args:
+            url (str): The URL of the request.
+            params (dict, optional): The parameters of the request.
+            response (requests.Response): The response of the attempt.
+            cached (requests.Response, optional): The stale cached response the request was made conditional on.
+            start (float): The time.perf_counter() value at the start of the request.
+            attempt (int): The number of the attempt, from 0.
+            slept (float): The seconds slept because of 429s so far.
+
+        Returns:
+            requests.Response: The response to return: the cached one if it was revalidated,
+                               or None on a 429, when the request must be retried.
+        """
+        if response.status_code == 304 and cached is not None:
+            Utils.cache.revalidated(url, params)
+            Utils.trace_request(
+                url, params, cached, start, attempt, slept, cache="revalidated"
+            )
+            return cached
+        if response.status_code == 429:
+            return None
+        if Utils.cache is not None:
+            Utils.cache.store(url, params, response)
+        Utils.trace_request(url, params, response, start, attempt, slept)
+        return response
+
+    @staticmethod
+    def get_backoff(
+        response: requests.Response,
+        retry_wait: float,
+        spinner: Optional[Spinner] = None,
+    ) -> float:
+        """
+        Computes how long to wait after a 429, and reports it.
+
+        Args:
+            response (requests.Response): The 429 response.
+            retry_wait (float): The delay used if the API did not send a Retry-After header.
+            spinner (Spinner, optional): The Spinner object the wait is shown on. Defaults to logging it.
+
+        Returns:
+            float: The seconds to wait before retrying.
+        """
+        retry_after = RateLimiter.get_retry_after(response.headers)
+        wait = retry_after if retry_after is not None else retry_wait
+        if spinner is not None:
+            spinner.status_message(f"Rate limit hit, retrying in {wait:g} seconds...")
+        else:
+            logging.getLogger("logs").warning(
+                f"Rate limit hit, retrying in {wait:g} seconds..."
+            )
+        return wait
+
+    @staticmethod
+    def trace_request(
+        url: str,
+        params: Optional[dict],
+        response: requests.Response,
+        start: float,
+        retries: int = 0,
+        rate_limit_sleep: float = 0.0,
+        cache: str = "miss",
+    ):
+        """
+        Records a request made by make_request_with_backoff in Utils.tracer, if it is set.
+
+        Args:
+            url (str): The URL of the request.
+            params (dict, optional): The parameters of the request.
+            response (requests.Response): The response returned to the caller.
+            start (float): The time.perf_counter() value at the start of the request.
+            retries (int, optional): The number of retried attempts. Defaults to 0.
+            rate_limit_sleep (float, optional): The seconds slept because of 429s. Defaults to 0.
+            cache (str, optional): "hit", "revalidated" or "miss". Defaults to "miss".
+        """
+        if Utils.tracer is None:
+            return
+        Utils.tracer.record_request(
+            url,
+            params,
+            response.status_code,
+            time.perf_counter() - start,
+            len(response.content),
+            retries,
+            rate_limit_sleep,
+            cache,
+        )
+
+    @staticmethod
+    def phase(name: str) -> ContextManager:
+        """
+        Times a phase of the current module in Utils.tracer, if it is set.
+
+        Args:
+            name (str): The name of the phase ("fetch", "build", "aggregate" or "render").
+
+        Returns:
+            ContextManager: The context the phase runs in.
+        """
+        if Utils.tracer is None:
+            return contextlib.nullcontext()
+        return Utils.tracer.phase(name)
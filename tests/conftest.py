@@ -0,0 +1,61 @@
+import logging
+
+import pytest
+
+from benchmarks.mock_api import MockIntraAPI, make_world
+from src.evaluation_store import EvaluationStore
+from src.request import Request
+from src.utils import Utils
+
+
+@pytest.fixture(autouse=True)
+def utils_state():
+    """
+    Runs every test with the caches of Utils disabled, and puts them back afterwards.
+    """
+    saved = Utils.cache, Utils.evaluation_store, Utils.user_index, Utils.tracer
+    Utils.cache = Utils.evaluation_store = Utils.user_index = Utils.tracer = None
+    yield
+    Utils.cache, Utils.evaluation_store, Utils.user_index, Utils.tracer = saved
+
+
+@pytest.fixture
+def world() -> dict:
+    """
+    The fixtures of a small synthetic campus (campus 1), about 250 evaluations received per user.
+    """
+    return make_world(users=30, evaluations=3000)
+
+
+@pytest.fixture
+def mock(world, tmp_path, monkeypatch):
+    """
+    A mock of the intra API serving `world`, with the app pointed at it and its caches in tmp_path.
+    """
+    logging.getLogger("logs").addHandler(logging.NullHandler())
+    with MockIntraAPI(world) as mock:
+        monkeypatch.setenv("API_URL", mock.url)
+        monkeypatch.setenv("OAUTHLIB_INSECURE_TRANSPORT", "1")
+        monkeypatch.setenv("STATS_CACHE_DIR", str(tmp_path / "cache"))
+        monkeypatch.setenv("API_RATE_PER_SECOND", "10000")
+        monkeypatch.setenv("API_RATE_PER_HOUR", "100000000")
+        yield mock
+
+
+@pytest.fixture
+def api(mock):
+    """
+    An authenticated session connected to the mock.
+    """
+    api = Request.create_session("test")
+    api.authenticate("test", "secret")
+    return api
+
+
+@pytest.fixture
+def store(tmp_path) -> EvaluationStore:
+    """
+    An empty EvaluationStore, set as Utils.evaluation_store.
+    """
+    Utils.evaluation_store = EvaluationStore(str(tmp_path / "evaluations"))
+    return Utils.evaluation_store
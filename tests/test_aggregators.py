@@ -0,0 +1,118 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.aggregators import RunningStats
+from src.evaluation_store import EvaluationStore
+from src.modules.friends_evals import FriendsEval
+
+
+def test_running_stats_match_numpy():
+    rng = np.random.default_rng(0)
+    values = rng.normal(70, 20, 1000)
+    values[rng.random(1000) < 0.1] = np.nan
+
+    stats = RunningStats()
+    for batch in np.array_split(values, 7):
+        stats.update(batch)
+
+    marked = values[~np.isnan(values)]
+    assert stats.count == len(marked)
+    assert math.isclose(stats.mean, marked.mean())
+    assert math.isclose(stats.std, marked.std(ddof=1))
+
+
+def test_merged_moments_match_the_whole():
+    rng = np.random.default_rng(1)
+    values = rng.integers(0, 125, 501).astype(float)
+    left, right = values[:200], values[200:]
+
+    stats = RunningStats().update(left)
+    stats.merge(len(right), right.mean(), float(((right - right.mean()) ** 2).sum()))
+    stats.merge(0, math.nan, 0.0)
+
+    assert stats.count == len(values)
+    assert math.isclose(stats.mean, values.mean())
+    assert math.isclose(stats.variance, values.var(ddof=1))
+
+
+def test_running_stats_without_enough_values():
+    assert math.isnan(RunningStats().mean)
+    assert math.isnan(RunningStats().update([np.nan]).std)
+    assert math.isnan(RunningStats().update([50]).std)
+
+
+def iterrows_corrector_marks(records: list) -> dict:
+    """
+    FriendsEval.process_as_corrector_data before it was vectorized.
+    """
+    login_marks = {}
+    for _, row in pd.DataFrame(records).iterrows():
+        for corrected in row.get("correcteds", []):
+            login_marks.setdefault(corrected.get("login"), []).append(
+                row.get("final_mark", np.nan)
+            )
+    return {
+        login: (len(marks), np.nanmean(np.array(marks, dtype=float)))
+        for login, marks in login_marks.items()
+    }
+
+
+def iterrows_corrected_marks(records: list) -> dict:
+    """
+    FriendsEval.process_as_corrected_data before it was vectorized.
+    """
+    corrector_marks = {}
+    for _, row in pd.DataFrame(records).iterrows():
+        corrector_login = row.get("corrector", {}).get("login")
+        if corrector_login:
+            corrector_marks.setdefault(corrector_login, []).append(
+                row.get("final_mark", np.nan)
+            )
+    return {
+        login: (len(marks), np.nanmean(np.array(marks, dtype=float)))
+        for login, marks in corrector_marks.items()
+    }
+
+
+def assert_same_counters(counters: dict, expected: dict):
+    assert list(counters) == list(expected)
+    for login, (count, mean) in expected.items():
+        assert counters[login][0] == count
+        if math.isnan(mean):
+            assert math.isnan(counters[login][1])
+        else:
+            assert math.isclose(counters[login][1], mean)
+
+
+@pytest.mark.filterwarnings("ignore:Mean of empty slice")
+def test_aggregate_marks_matches_the_iterrows_version(world):
+    records = [
+        *world["/v2/users/3/scale_teams/as_corrector"],
+        *world["/v2/users/3/scale_teams/as_corrected"],
+    ]
+    # Unmarked evaluations are counted but left out of the average, also for a login
+    # with no marked evaluation at all.
+    records = [
+        dict(r, final_mark=None) if i % 5 == 0 else r for i, r in enumerate(records)
+    ]
+    records.append(
+        dict(
+            records[1],
+            id=10**6,
+            final_mark=None,
+            corrector={"id": 999, "login": "unmarked"},
+            correcteds=[{"id": 999, "login": "unmarked"}],
+        )
+    )
+    frame = EvaluationStore.normalize(records).to_pandas()
+    module = FriendsEval(None)
+
+    assert_same_counters(
+        module.process_as_corrector_data(frame), iterrows_corrector_marks(records)
+    )
+    assert_same_counters(
+        module.process_as_corrected_data(frame), iterrows_corrected_marks(records)
+    )
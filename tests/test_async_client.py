@@ -0,0 +1,19 @@
+import asyncio
+
+from src.async_client import AsyncIntraClient
+
+
+def test_revoked_token_is_refreshed_once(api, mock):
+    url = f"{mock.url}/v2/campus/1/users"
+
+    async def fetch_pages() -> list:
+        async with AsyncIntraClient.from_session(api) as client:
+            mock.revoked.add(client.token["access_token"])
+            return await asyncio.gather(
+                *(client.get(url, {"page": page}) for page in range(1, 6))
+            )
+
+    tokens = mock.tokens
+    responses = asyncio.run(fetch_pages())
+    assert [response.status_code for response in responses] == [200] * 5
+    assert mock.tokens == tokens + 1
@@ -0,0 +1,34 @@
+import io
+import json
+
+import requests
+
+from src.batch import BatchWriter, resolve_user_ids, run_batch
+from src.modules.evaluator_score import EvaluatorScore
+from src.user_index import UserIndex
+from src.utils import Utils
+
+
+def test_failed_bulk_lookup_falls_back_to_each_login(api, world, monkeypatch):
+    Utils.user_index = UserIndex(":memory:")
+
+    def fail(api, logins):
+        raise requests.ConnectionError("connection reset")
+
+    monkeypatch.setattr(Utils, "get_user_ids", fail)
+    logins = [user["login"] for user in world["/v2/campus/1/users"][:5]]
+    output = io.StringIO()
+    module = EvaluatorScore(api)
+    writer = BatchWriter(output, "jsonl", ["login", *module.FIELDS, "error"])
+
+    succeeded, failed = run_batch(
+        module, resolve_user_ids(api, [*logins, "nobody"], chunk_size=2), writer, 2
+    )
+
+    rows = {
+        row["login"]: row for row in map(json.loads, output.getvalue().splitlines())
+    }
+    assert (succeeded, failed) == (5, 1)
+    assert sorted(rows) == sorted([*logins, "nobody"])
+    assert all(rows[login]["error"] is None for login in logins)
+    assert rows["nobody"]["error"]
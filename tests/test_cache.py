@@ -0,0 +1,117 @@
+import requests
+
+from src.cache import ResponseCache
+from src.utils import Utils
+
+
+def age(cache: ResponseCache, seconds: float, key: str = None):
+    """
+    Makes cached responses look `seconds` older, all of them or only the one of `key`.
+    """
+    if key is None:
+        cache._db.execute("UPDATE responses SET stored_at = stored_at - ?", (seconds,))
+    else:
+        cache._db.execute(
+            "UPDATE responses SET stored_at = stored_at - ? WHERE key = ?",
+            (seconds, key),
+        )
+    cache._db.commit()
+
+
+def test_ttl_depends_on_the_endpoint(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    assert cache.get_ttl("https://x/v2/users/jdoe") == 7 * 24 * 3600
+    assert cache.get_ttl("https://x/v2/campus/1/users") == 24 * 3600
+    assert cache.get_ttl("https://x/v2/users/1/scale_teams/as_corrector") == 3600
+    assert cache.get_ttl("https://x/v2/other") == ResponseCache.DEFAULT_TTL
+
+
+def test_only_successful_responses_are_stored(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    response = requests.Response()
+    response.status_code = 404
+    response._content = b"{}"
+    cache.store("https://x/v2/users/jdoe", None, response)
+    assert cache.lookup("https://x/v2/users/jdoe", None) == (None, False)
+
+
+def test_fresh_responses_skip_the_network(api, mock, tmp_path):
+    Utils.cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    url = f"{mock.url}/v2/campus/1/users"
+
+    first = Utils.make_request_with_backoff(api, url, {"page": 1})
+    requests_made = mock.requests
+    second = Utils.make_request_with_backoff(api, url, {"page": 1})
+
+    assert mock.requests == requests_made
+    assert second.from_cache
+    assert second.json() == first.json()
+
+
+def test_expired_responses_are_refetched(api, mock, world, tmp_path):
+    Utils.cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    url = f"{mock.url}/v2/campus/1/users"
+    Utils.make_request_with_backoff(api, url, {"page": 1})
+    world["/v2/campus/1/users"][0]["login"] = "renamed"
+
+    age(Utils.cache, 24 * 3600)
+    requests_made = mock.requests
+    response = Utils.make_request_with_backoff(api, url, {"page": 1})
+
+    assert mock.requests == requests_made + 1
+    assert response.json()[0]["login"] == "renamed"
+    assert Utils.cache.lookup(url, {"page": 1})[1]
+
+
+def test_stale_responses_are_revalidated_with_their_etag(api, mock, tmp_path):
+    mock.etags = True
+    Utils.cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    url = f"{mock.url}/v2/campus/1/users"
+    first = Utils.make_request_with_backoff(api, url, {"page": 1})
+    assert first.headers["ETag"]
+
+    age(Utils.cache, 24 * 3600)
+    bytes_sent = mock.bytes_sent
+    revalidated = Utils.make_request_with_backoff(api, url, {"page": 1})
+
+    assert mock.not_modified == 1
+    assert mock.bytes_sent == bytes_sent
+    assert revalidated.status_code == 200
+    assert revalidated.json() == first.json()
+    # The 304 made the cached response fresh again.
+    requests_made = mock.requests
+    Utils.make_request_with_backoff(api, url, {"page": 1})
+    assert mock.requests == requests_made
+
+
+def test_changed_responses_are_not_revalidated(api, mock, world, tmp_path):
+    mock.etags = True
+    Utils.cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    url = f"{mock.url}/v2/campus/1/users"
+    Utils.make_request_with_backoff(api, url, {"page": 1})
+    world["/v2/campus/1/users"][0]["login"] = "renamed"
+
+    age(Utils.cache, 24 * 3600)
+    response = Utils.make_request_with_backoff(api, url, {"page": 1})
+
+    assert mock.not_modified == 0
+    assert response.json()[0]["login"] == "renamed"
+
+
+def test_refetched_first_page_is_not_mixed_with_cached_pages(
+    api, mock, world, tmp_path
+):
+    Utils.cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    path = "/v2/users/3/scale_teams/as_corrected"
+    url = f"{mock.url}{path}"
+    records = world[path]
+    assert len(records) > 2 * Utils.PER_PAGE
+    Utils.get_all_pages(api, url)
+
+    # New records shift every later page, but only page 1 has expired.
+    records[:0] = [dict(record, id=10**6 + i) for i, record in enumerate(records[:7])]
+    first_page = {"per_page": Utils.PER_PAGE, "page": 1}
+    age(Utils.cache, 3600, ResponseCache.make_key(url, first_page))
+
+    fetched = Utils.get_all_pages(api, url)
+    assert [r["id"] for r in fetched] == [r["id"] for r in records]
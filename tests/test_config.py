@@ -0,0 +1,17 @@
+import os
+
+from src.config import get_cache_dir
+
+
+def test_other_servers_get_their_own_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("STATS_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("API_URL", raising=False)
+    assert get_cache_dir() == str(tmp_path)
+
+    monkeypatch.setenv("API_URL", "https://api.intra.42.fr/")
+    assert get_cache_dir() == str(tmp_path)
+
+    monkeypatch.setenv("API_URL", "http://127.0.0.1:8042")
+    mock = get_cache_dir()
+    assert mock == os.path.join(str(tmp_path), "hosts", "127.0.0.1_8042")
+    assert os.path.isdir(mock)
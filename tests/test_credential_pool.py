@@ -0,0 +1,103 @@
+import time
+
+import pytest
+import requests
+from oauthlib.oauth2 import OAuth2Error
+
+from src.credential_pool import CredentialPool
+from src.rate_limiter import RateLimiter
+
+
+class FakeSession:
+    """
+    Stands in for an IntraSession, answering with the given statuses, then 200s.
+    """
+
+    def __init__(self, client_id: str, statuses: list[int] = (), refresh_error=None):
+        self.credentials = (client_id, "secret")
+        self.rate_limiter = RateLimiter(per_second=100, per_hour=10**6)
+        self.statuses = list(statuses)
+        self.refresh_error = refresh_error
+        self.requests = 0
+        self.refreshes = 0
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        self.requests += 1
+        response = requests.Response()
+        response.status_code = self.statuses.pop(0) if self.statuses else 200
+        return response
+
+    def refresh(self):
+        self.refreshes += 1
+        if self.refresh_error is not None:
+            raise self.refresh_error
+
+
+def test_throttled_credential_is_benched_for_longer_each_time():
+    throttled = FakeSession("a", [429] * 6)
+    spare = FakeSession("b")
+    pool = CredentialPool([throttled, spare])
+    pool.BENCH_SECONDS = 0.2
+
+    for _ in range(CredentialPool.MAX_THROTTLED):
+        assert pool.get("url").status_code == 200
+    member = pool.members[0]
+    assert member.benched == 1
+    assert "benched" in pool.summary()
+    # Out of rotation: the next requests go to the spare credential only.
+    pool.get("url")
+    assert throttled.requests == CredentialPool.MAX_THROTTLED
+
+    time.sleep(0.2)
+    for _ in range(CredentialPool.MAX_THROTTLED):
+        pool.get("url")
+    assert member.benched == 2
+    assert member.benched_until - time.monotonic() > 0.3
+
+
+def test_success_resets_the_429_count():
+    session = FakeSession("a", [429, 429, 200, 429, 429])
+    pool = CredentialPool([session, FakeSession("b")], "round-robin")
+    for _ in range(6):
+        pool.get("url")
+    assert pool.members[0].benched == 0
+
+
+def test_rejected_credential_is_disabled():
+    rejected = FakeSession("a", [401, 401])
+    pool = CredentialPool([rejected, FakeSession("b")])
+
+    assert pool.get("url").status_code == 200
+    assert rejected.refreshes == 1
+    assert pool.members[0].disabled
+    assert "disabled" in pool.summary()
+    pool.get("url")
+    assert rejected.requests == 2
+
+
+def test_revoked_token_is_refreshed():
+    revoked = FakeSession("a", [401])
+    pool = CredentialPool([revoked, FakeSession("b")])
+
+    assert pool.get("url").status_code == 200
+    assert revoked.refreshes == 1
+    assert not pool.members[0].disabled
+
+
+def test_credential_that_cannot_refresh_is_disabled():
+    broken = FakeSession("a", [401], refresh_error=OAuth2Error("invalid_client"))
+    pool = CredentialPool([broken, FakeSession("b")])
+
+    assert pool.get("url").status_code == 200
+    assert pool.members[0].disabled
+
+
+def test_429_is_returned_when_every_credential_is_throttled():
+    pool = CredentialPool([FakeSession("a", [429]), FakeSession("b", [429])])
+    assert pool.get("url").status_code == 429
+
+
+def test_no_credential_left():
+    pool = CredentialPool([FakeSession("a", [401, 401]), FakeSession("b", [401, 401])])
+    with pytest.raises(Exception, match="rejected"):
+        pool.get("url")
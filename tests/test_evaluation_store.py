@@ -0,0 +1,65 @@
+from src.utils import Utils
+
+
+def make_record(id: int, updated_at: str, final_mark=100) -> dict:
+    return {
+        "id": id,
+        "final_mark": final_mark,
+        "corrector": {"id": 1, "login": "user1"},
+        "correcteds": [{"id": 2, "login": "user2"}],
+        "created_at": updated_at,
+        "updated_at": updated_at,
+    }
+
+
+def test_merge_keeps_the_last_version_of_every_id(store):
+    store.merge(
+        2,
+        "as_corrected",
+        [
+            make_record(3, "2023-01-03T00:00:00.000Z"),
+            make_record(1, "2023-01-01T00:00:00.000Z", final_mark=50),
+        ],
+    )
+    store.merge(
+        2,
+        "as_corrected",
+        [
+            make_record(1, "2023-02-01T00:00:00.000Z", final_mark=80),
+            make_record(2, "2023-01-02T00:00:00.000Z"),
+        ],
+    )
+
+    table = store.read(2, "as_corrected")
+    assert table["id"].tolist() == [1, 2, 3]
+    assert table["final_mark"].tolist() == [80, 100, 100]
+    assert store.load_watermark(2, "as_corrected") == "2023-02-01T00:00:00.000Z"
+
+
+def test_merge_does_not_move_the_watermark_back(store):
+    store.merge(2, "as_corrected", [make_record(1, "2023-02-01T00:00:00.000Z")])
+    store.merge(2, "as_corrected", [make_record(2, "2023-01-01T00:00:00.000Z")])
+    store.merge(2, "as_corrected", [])
+
+    assert store.read(2, "as_corrected")["id"].tolist() == [1, 2]
+    assert store.load_watermark(2, "as_corrected") == "2023-02-01T00:00:00.000Z"
+
+
+def test_sync_only_fetches_what_changed(api, mock, world, store):
+    path = "/v2/users/3/scale_teams/as_corrected"
+    Utils.sync_evaluations(api, 3, "as_corrected")
+    assert store.read(3, "as_corrected")["id"].tolist() == sorted(
+        r["id"] for r in world[path]
+    )
+
+    updated = world[path][10]
+    updated["final_mark"] = 42
+    updated["updated_at"] = "2024-01-01T00:00:00.000Z"
+    requests = mock.requests
+    Utils.sync_evaluations(api, 3, "as_corrected")
+
+    assert mock.requests - requests == 1
+    stored = store.read(3, "as_corrected").set_index("id")
+    assert len(stored) == len(world[path])
+    assert stored.loc[updated["id"], "final_mark"] == 42
+    assert store.load_watermark(3, "as_corrected") == "2024-01-01T00:00:00.000Z"
@@ -0,0 +1,149 @@
+from src.checkpoint import Checkpoint
+from src.fetch_job import CampusFetchJob
+from src.utils import Utils
+
+
+def get_stored(store, world: dict) -> dict:
+    stored = {}
+    for user in world["/v2/campus/1/users"]:
+        if user["active?"]:
+            for side in CampusFetchJob.SIDES:
+                frame = store.read(user["id"], side)
+                stored[(user["id"], side)] = frame["id"].tolist()
+    return stored
+
+
+def get_expected(world: dict) -> dict:
+    return {
+        (user["id"], side): sorted(
+            r["id"] for r in world[f"/v2/users/{user['id']}/scale_teams/{side}"]
+        )
+        for user in world["/v2/campus/1/users"]
+        if user["active?"]
+        for side in CampusFetchJob.SIDES
+    }
+
+
+def test_resumed_job_fetches_every_page_once(api, mock, world, store, tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "jobs.sqlite3"))
+    job = CampusFetchJob(api, 1, checkpoint, workers=2)
+
+    def cancel_after_some_tasks(done: int, total: int):
+        if done >= 10:
+            job.cancel()
+
+    job.run(cancel_after_some_tasks)
+    done, total = checkpoint.get_progress(job.name)
+    assert 10 <= done < total
+
+    resumed = CampusFetchJob(api, 1, Checkpoint(str(tmp_path / "jobs.sqlite3")))
+    resumed.run()
+    assert resumed.checkpoint.get_progress(job.name) == (total, total)
+    assert get_stored(store, world) == get_expected(world)
+    interrupted = mock.requests
+
+    Utils.evaluation_store.root = str(tmp_path / "fresh")
+    checkpoint.reset(job.name)
+    CampusFetchJob(api, 1, checkpoint).run()
+    # Resuming refetched nothing: both runs together took as many requests as one.
+    assert mock.requests - interrupted == interrupted
+
+
+def fetch_first_page(job: CampusFetchJob, user_id: int, side: str):
+    """
+    Runs one task of `job` until its first page is saved, then cancels the job.
+    """
+    checkpoint = job.checkpoint
+    checkpoint.add_tasks(job.name, [(user_id, side)])
+    save_page = checkpoint.save_page
+
+    def save_first_page_then_stop(*args):
+        save_page(*args)
+        job.cancel()
+
+    checkpoint.save_page = save_first_page_then_stop
+    assert not job.run_task(user_id, side)
+    checkpoint.save_page = save_page
+
+
+def update_all(records: list, year: int):
+    """
+    Updates every record, in id order, so they all changed since the last sync.
+    """
+    for second, record in enumerate(sorted(records, key=lambda r: r["id"])):
+        record["updated_at"] = (
+            f"{year}-01-01T00:{second // 60:02d}:{second % 60:02d}.000Z"
+        )
+        record["final_mark"] = (record["final_mark"] or 0) // 2
+
+
+def test_resume_does_not_skip_records_updated_in_between(api, world, store):
+    user_id, side = 3, "as_corrected"
+    records = world[f"/v2/users/{user_id}/scale_teams/{side}"]
+    Utils.sync_evaluations(api, user_id, side)
+    update_all(records, 2024)
+    assert len(records) > 2 * Utils.PER_PAGE
+
+    job = CampusFetchJob(api, 1, Checkpoint(":memory:"))
+    fetch_first_page(job, user_id, side)
+    # Updating a record of the first page must not shift the pages left to fetch.
+    first = min(records, key=lambda r: r["id"])
+    first["updated_at"] = "2024-06-01T00:00:00.000Z"
+    first["final_mark"] = 42
+    assert CampusFetchJob(api, 1, job.checkpoint).run_task(user_id, side)
+
+    stored = store.read(user_id, side).set_index("id")
+    assert sorted(stored.index) == sorted(r["id"] for r in records)
+    for record in records:
+        if record is not first:
+            assert stored.loc[record["id"], "final_mark"] == record["final_mark"]
+
+    Utils.sync_evaluations(api, user_id, side)
+    assert (
+        store.read(user_id, side).set_index("id").loc[first["id"], "final_mark"] == 42
+    )
+
+
+def test_resume_keeps_the_parameters_of_the_first_run(api, world, store):
+    user_id, side = 3, "as_corrected"
+    Utils.sync_evaluations(api, user_id, side)
+    watermark = store.load_watermark(user_id, side)
+    records = world[f"/v2/users/{user_id}/scale_teams/{side}"]
+    update_all(records, 2024)
+
+    job = CampusFetchJob(api, 1, Checkpoint(":memory:"))
+    fetch_first_page(job, user_id, side)
+    params = job.checkpoint.get_params(job.name, user_id, side)
+    assert params["range[updated_at]"].startswith(watermark)
+
+    # The store moves on before the job resumes.
+    update_all(records, 2025)
+    Utils.sync_evaluations(api, user_id, side)
+    assert store.load_watermark(user_id, side) != watermark
+
+    resumed = CampusFetchJob(api, 1, job.checkpoint)
+    assert resumed.run_task(user_id, side)
+    assert job.checkpoint.get_params(job.name, user_id, side) == params
+
+
+def test_failed_tasks_are_kept_until_they_finish(api, store, monkeypatch, tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "jobs.sqlite3"))
+    merge = store.merge
+
+    def fail_user_3(user_id, side, records):
+        if user_id == 3 and side == "as_corrected":
+            raise Exception("disk full")
+        merge(user_id, side, records)
+
+    monkeypatch.setattr(store, "merge", fail_user_3)
+    finished, failed = CampusFetchJob(api, 1, checkpoint).run()
+    assert failed == 1
+    assert checkpoint.get_failed("campus-1") == 1
+    done, total = checkpoint.get_progress("campus-1")
+    assert done == total - 1 == finished
+
+    # A later run, or a reopened checkpoint, still knows about the failure.
+    assert Checkpoint(str(tmp_path / "jobs.sqlite3")).get_failed("campus-1") == 1
+    monkeypatch.setattr(store, "merge", merge)
+    assert CampusFetchJob(api, 1, checkpoint).run() == (1, 0)
+    assert checkpoint.get_failed("campus-1") == 0
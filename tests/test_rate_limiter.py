@@ -0,0 +1,60 @@
+import time
+
+from src.rate_limiter import RateLimiter
+from src.utils import Utils
+
+
+def test_pause_holds_every_caller_back():
+    limiter = RateLimiter(per_second=1000, per_hour=10**6)
+    limiter.pause(0.2)
+    assert 0.1 < limiter.wait_time() <= 0.2
+
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.15
+
+
+def test_shorter_pause_does_not_cut_a_longer_one():
+    limiter = RateLimiter()
+    limiter.pause(10)
+    limiter.pause(0.1)
+    assert limiter.wait_time() > 9
+
+
+def test_retry_after_is_read_from_the_headers():
+    assert RateLimiter.get_retry_after({"Retry-After": "2.5"}) == 2.5
+    assert RateLimiter.get_retry_after({"Retry-After": "soon"}) is None
+    assert RateLimiter.get_retry_after({}) is None
+
+
+def test_buckets_follow_the_rate_limit_headers():
+    limiter = RateLimiter(per_second=2, per_hour=1200)
+    limiter.update(
+        {
+            "X-Secondly-RateLimit-Limit": "8",
+            "X-Hourly-RateLimit-Limit": "4800",
+            "X-Hourly-RateLimit-Remaining": "0",
+        }
+    )
+    assert limiter.buckets["secondly"].capacity == 8
+    assert limiter.buckets["hourly"].capacity == 4800
+    # No request left this hour: the next one waits for the hourly bucket to refill.
+    assert limiter.wait_time() > 0.5
+
+
+def test_429_pauses_the_session(api, mock):
+    mock.rate_limit_ratio = 1.0
+    mock.retry_after = 0.5
+
+    response = api.get(f"{mock.url}/v2/campus/1/users")
+    assert response.status_code == 429
+    assert 0.3 < api.rate_limiter.wait_time() <= 0.5
+
+
+def test_backoff_gets_every_page_through_429s(api, mock, world):
+    mock.rate_limit_ratio = 0.2
+    mock.retry_after = 0.05
+    path = "/v2/users/3/scale_teams/as_corrected"
+
+    records = Utils.get_all_pages(api, f"{mock.url}{path}")
+    assert [r["id"] for r in records] == [r["id"] for r in world[path]]
@@ -0,0 +1,54 @@
+from src.request import Request
+from src.token_cache import TokenCache
+
+
+def test_tokens_are_kept_per_api(tmp_path, monkeypatch):
+    cache = TokenCache(str(tmp_path / "token.json"))
+    token = {"access_token": "real", "expires_at": 2**40}
+    monkeypatch.setenv("API_URL", "https://api.intra.42.fr")
+    cache.save("uid", token)
+
+    monkeypatch.setenv("API_URL", "http://127.0.0.1:8042")
+    assert cache.load("uid") is None
+    monkeypatch.setenv("API_URL", "https://api.intra.42.fr")
+    assert cache.load("uid") == token
+
+    cache.drop("uid")
+    assert cache.load("uid") is None
+
+
+def test_rejected_cached_token_is_replaced(mock, tmp_path):
+    cache = TokenCache(str(tmp_path / "token.json"))
+    Request.create_session("uid", token_cache=cache).authenticate("uid", "secret")
+    assert mock.tokens == 1
+
+    api = Request.create_session("uid", token_cache=cache)
+    api.authenticate("uid", "secret")
+    assert mock.tokens == 1
+    mock.revoked.add(api.token["access_token"])
+
+    response = api.get(f"{mock.url}/v2/campus/1/users")
+    assert response.status_code == 200
+    assert mock.tokens == 2
+    assert cache.load("uid")["access_token"] == api.token["access_token"]
+    assert api.token["access_token"] not in mock.revoked
+
+
+def test_rejected_fresh_token_is_returned(mock):
+    api = Request.create_session("uid")
+    api.authenticate("uid", "secret")
+    mock.revoked.add(api.token["access_token"])
+
+    assert api.get(f"{mock.url}/v2/campus/1/users").status_code == 401
+    assert mock.tokens == 1
+
+
+def test_429_is_not_retried_by_the_transport(api, mock):
+    mock.rate_limit_ratio = 1.0
+    mock.retry_after = 1
+
+    requests_made = mock.requests
+    response = api.get(f"{mock.url}/v2/campus/1/users")
+
+    assert response.status_code == 429
+    assert mock.requests == requests_made + 1
@@ -0,0 +1,74 @@
+import math
+
+import pandas as pd
+import pytest
+
+from src.aggregators import RunningStats
+from src.modules.campus_leaderboard import CampusLeaderboard
+from src.sharded_aggregator import ShardedAggregator
+from src.utils import Utils
+
+
+@pytest.fixture
+def user_ids(api, world, store) -> list[int]:
+    """
+    The IDs of the active users of the campus, with their evaluations synced into the store.
+    """
+    users = Utils.get_campus_users(api, 1)
+    for user in users:
+        for side in ("as_corrector", "as_corrected"):
+            Utils.sync_evaluations(api, user["id"], side)
+    return [user["id"] for user in users]
+
+
+def assert_close(value: float, expected: float):
+    if math.isnan(expected):
+        assert math.isnan(value)
+    else:
+        assert math.isclose(value, expected)
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_moments_match_running_stats(user_ids, store, processes):
+    # A user without a file is left out.
+    files = [(user_id, store.get_path(user_id, "as_corrected")) for user_id in user_ids]
+    files.append((10**6, store.get_path(10**6, "as_corrected")))
+
+    moments = ShardedAggregator(workers=2).moments(
+        files, "final_mark", upper=100, processes=processes
+    )
+
+    assert moments.index.tolist() == user_ids
+    for user_id in user_ids:
+        marks = store.read(user_id, "as_corrected")["final_mark"]
+        stats = RunningStats().update(marks.clip(upper=100))
+        row = moments.loc[user_id]
+        assert row["rows"] == len(marks)
+        assert row["count"] == stats.count
+        assert_close(row["mean"], stats.mean)
+        assert_close(row["std"], stats.std)
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_leaderboard_matches_the_per_user_path(
+    api, world, user_ids, monkeypatch, processes
+):
+    monkeypatch.setattr(
+        ShardedAggregator, "MIN_PARALLEL_FILES", 0 if processes else 10**9
+    )
+    monkeypatch.setenv("AGGREGATION_WORKERS", "2")
+    leaderboard = CampusLeaderboard(api)
+    table = leaderboard.build_table(1).set_index("user_id")
+    assert sorted(table.index) == sorted(user_ids)
+
+    Utils.evaluation_store = None
+    logins = {user["id"]: user["login"] for user in world["/v2/campus/1/users"]}
+    for user_id in user_ids:
+        expected = leaderboard.compute(logins[user_id])
+        row = table.loc[user_id]
+        assert row["login"] == logins[user_id]
+        for field in CampusLeaderboard.FIELDS:
+            if pd.isna(expected[field]):
+                assert pd.isna(row[field])
+            else:
+                assert row[field] == pytest.approx(expected[field])
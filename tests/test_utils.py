@@ -0,0 +1,49 @@
+import math
+
+import requests
+
+from src.utils import Utils
+
+
+def test_page_count_is_read_from_the_headers():
+    response = requests.Response()
+    response.headers["X-Total"] = "201"
+    response.headers["X-Per-Page"] = "100"
+    assert Utils.get_page_count(response) == 3
+
+    del response.headers["X-Total"]
+    assert Utils.get_page_count(response) is None
+
+
+def test_pages_come_in_order_and_complete(api, mock, world, monkeypatch):
+    monkeypatch.setattr(Utils, "PER_PAGE", 10)
+    # Pages fetched in parallel come back out of order.
+    mock.jitter = 0.02
+    path = "/v2/users/3/scale_teams/as_corrected"
+    records = world[path]
+
+    requests_made = mock.requests
+    pages = list(Utils.iter_pages(api, f"{mock.url}{path}", max_workers=8))
+
+    assert len(pages) == math.ceil(len(records) / 10)
+    assert all(len(page) == 10 for page in pages[:-1])
+    assert [r["id"] for page in pages for r in page] == [r["id"] for r in records]
+    assert mock.requests - requests_made == len(pages)
+
+
+def test_pages_keep_the_parameters(api, mock, world):
+    path = "/v2/users/3/scale_teams/as_corrected"
+    params = {"range[updated_at]": "2023-06-01T00:00:00.000Z,2023-09-01T00:00:00.000Z"}
+
+    records = Utils.get_all_pages(api, f"{mock.url}{path}", params)
+
+    start, end = params["range[updated_at]"].split(",")
+    expected = [r["id"] for r in world[path] if start <= r["updated_at"] <= end]
+    assert expected
+    assert [r["id"] for r in records] == expected
+
+
+def test_empty_endpoint_has_no_pages(api, mock, world):
+    world["/v2/users/999/scale_teams/as_corrector"] = []
+    url = f"{mock.url}/v2/users/999/scale_teams/as_corrector"
+    assert list(Utils.iter_pages(api, url)) == []